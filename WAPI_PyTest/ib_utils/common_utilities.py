@@ -33,11 +33,8 @@ def generate_token_from_file(filepath, filename):
 def get_object_reference(object_type,data):
 	object_type1=object_type
         data = data
-        get_ref = ib_NIOS.wapi_request('GET',object_type=object_type1,fields=json.dumps(data))
-        logging.info(get_ref)
-        res = json.loads(get_ref)
-        ref = json.loads(get_ref)[0]['_ref']
-        print res
+        ref = ib_NIOS.resolve(object_type1,**data)
+        logging.info(ref)
         print ref
         return ref
 
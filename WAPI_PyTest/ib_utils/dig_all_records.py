@@ -4,6 +4,8 @@ import logging
 import subprocess
 import json
 import ib_utils.ib_NIOS as ib_NIOS
+import ib_utils.dns_query as dns_query
+import ib_utils.zone_verify as zone_verify
 import sys
 import config
 import re
@@ -19,17 +21,13 @@ def dig(zone_name,record_type):
     print zone_name
     if record_type is None:
         print("Perform query for all records ")
-        record_list=ib_NIOS.wapi_request('GET',object_type="allrecords?zone="+zone_name['fqdn'])
-        record_list=json.loads(record_list)
+        record_list=ib_NIOS.iter_objects("allrecords?zone="+zone_name['fqdn'])
         #print record_list
-        for i in record_list:
-            dig_cmd = 'dig @'+str(config.grid_vip)+' '+str(i['name'])+str('.'+zone_name['fqdn'])+str(' IN ')+str(i['name'])
-            #print dig_cmd
-            result = subprocess.check_output(dig_cmd,shell=True)
-            #print result
-            record_queried=str(i['name'])+str('.'+zone_name['fqdn'])+str(' IN ')+str(i['name'])
-            assert re.search(record_queried,result)
-            print ("Dig Query Successful for all records")
+        # All the names are queried at once, see zone_verify.
+        diff=zone_verify.verify_records(record_list,zone=zone_name['fqdn'])
+        print diff.report()
+        assert not diff.missing and not diff.errors
+        print ("Dig Query Successful for all records")
     else:
         print("Perform query for requested records ")
         if (record_type in ('rp','hinfo','ipseckey','apl','afsdb','dlv','sshfp','loc','cert','cds')):
@@ -39,34 +37,23 @@ def dig(zone_name,record_type):
             #print record_list 
             #print type(record_list)
             if (str(record_list['name'].split('.')[0]) == str(record_type)):
-                dig_cmd = 'dig @'+str(config.grid_vip)+' '+str(record_list['name'])+str(' IN ')+str(record_type)
-                #print dig_cmd
-                result = subprocess.check_output(dig_cmd,shell=True)
-                print result
-                record_queried=str(record_list['name'])+str(' IN ')+str(record_type)
-                #print (":::::::::::::::::::::",record_queried)
-                #print (type(record_queried))
-                #print type(result)
-                assert re.search(record_queried,result)
+                response=dns_query.query(config.grid_vip,str(record_list['name']),str(record_type))
+                print response.text()
+                assert response.rrset(str(record_list['name']),str(record_type)) is not None
                 print ("Dig Query Successful for requested  records")
             else:
                 print  ("Please check your record name and type")
         else:
-            record_list=ib_NIOS.wapi_request('GET',object_type="record:"+str(record_type)+"?zone="+zone_name['fqdn'])
-            record_list=json.loads(record_list)
+            record_list=ib_NIOS.iter_objects("record:"+str(record_type)+"?zone="+zone_name['fqdn'])
             for i in record_list:
             #record_list=record_list[0]
             #print record_list
             #print type(record_list)
                 print i
-                dig_cmd = 'dig @'+str(config.grid_vip)+' '+str(i['name'])+str('.'+zone_name['fqdn'])+str(' IN ')+str(record_type)
-                result = subprocess.check_output(dig_cmd,shell=True)
-                print result
-                record_queried=str(i['name'])+str('.'+zone_name['fqdn'])+str(' IN ')+str(record_type)
-            #print (":::::::::::::::::::::",record_queried)
-            #print (type(record_queried))
-            #print type(result)
-                assert re.search(record_queried,result)
+                record_queried=str(i['name'])+str('.'+zone_name['fqdn'])
+                response=dns_query.query(config.grid_vip,record_queried,str(record_type))
+                print response.text()
+                assert response.rrset(record_queried,str(record_type)) is not None
                 print ("Dig Query Successful for requested  records")
             
 
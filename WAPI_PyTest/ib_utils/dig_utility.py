@@ -8,6 +8,7 @@
 #
 # Description:
 #     Performs Dig query on the given records.
+#     Queries are sent in-process by ib_utils.dns_query, no dig process is forked.
 #
 #
 # Input Options:
@@ -16,6 +17,7 @@
 #  Output:
 #    0: Test success
 #    1: Test failed
+#    The dns_query.Message of the query is returned
 #
 # Author: Rajeev Patil
 #
@@ -31,49 +33,61 @@ import logging
 import subprocess
 import json
 import ib_utils.ib_NIOS as ib_NIOS
+import ib_utils.dns_query as dns_query
+import ib_utils.zone_snapshot as zone_snapshot
 import sys
 import config
 import re
 
 
 
+class Transfer:
+    '''
+    Every RR of an AXFR, read over all the TCP messages up to the closing
+    SOA, with the rcode and text() of a dns_query.Message.
+    '''
+    def __init__(self,zone,rrs):
+        self.rcode="NOERROR"
+        self.zone=zone
+        self.answer=rrs
+
+    def text(self):
+        lines=[";; rcode: %s, %d records" % (self.rcode,len(self.answer)),";%s\t\tIN\tAXFR" % dns_query.absolute(self.zone)]
+        lines.extend(repr(rr) for rr in self.answer)
+        return '\n'.join(lines)
+
+
+def query(record_name,zone_name,record_type):
+    # An empty record_name queries the zone apex, e.g. for an AXFR.
+    fqdn=str(record_name)+str('.'+zone_name['fqdn']) if record_name else str(zone_name['fqdn'])
+    logging.info ("dig @"+str(config.grid_vip)+" "+fqdn+" IN "+str(record_type))
+    if record_type=='axfr':
+        # One TCP message holds only part of a large zone.
+        response=Transfer(fqdn,list(zone_snapshot.transfer(config.grid_vip,fqdn)))
+    else:
+        response=dns_query.query(config.grid_vip,fqdn,str(record_type))
+    logging.info (response.text())
+    return response
+
+
 def dig(record_name,zone_name,record_type,LookFor):
-    if  record_type in "any":
+    if  record_type=="any":
         logging.info("Perform query by considering record type as ANY ")
-        dig_cmd = 'dig @'+str(config.grid_vip)+' '+str(record_name)+str('.'+zone_name['fqdn'])+str(' IN ')+"ANY"
-        logging.info (dig_cmd)
-        result = subprocess.check_output(dig_cmd,shell=True)
-        logging.info (result)
-        read=re.findall(result,LookFor)
-        for read in result:
-            assert True
+        response=query(record_name,zone_name,"ANY")
+        assert re.search(LookFor,response.text(),re.I)
         logging.info ("Dig Query Successful for your records")
     elif (record_type in ('rp','hinfo','ipseckey','apl','afsdb','dlv','sshfp','loc','cert','cds')):
         logging.info("Perform query by considering your record type")
-        dig_cmd = 'dig @'+str(config.grid_vip)+' '+str(record_name)+str('.'+zone_name['fqdn'])+str(' IN ')+str(record_type)
-        logging.info (dig_cmd)
-        result = subprocess.check_output(dig_cmd,shell=True)
-        logging.info (result)
-        status="NOERROR"
-        noerror=re.findall(result,status)
-        for noerror in result:
-            read=re.findall(result,LookFor)
-            for read in result:
-                assert True
+        response=query(record_name,zone_name,record_type)
+        assert response.rcode=="NOERROR"
+        assert re.search(LookFor,response.text(),re.I)
         logging.info ("Dig Query Successful for your record type")
     elif (record_type in ('ns','soa','a','aaaa','cname','dname','mx','srv','naptr','txt','ptr','axfr','nsec','rrsig','dnskey')):
-        dig_cmd = 'dig @'+str(config.grid_vip)+' '+str(record_name)+str('.'+zone_name['fqdn'])+str(' IN ')+str(record_type)
-        logging.info (dig_cmd)
-        result = subprocess.check_output(dig_cmd,shell=True)
-        logging.info (result)
-        status="NOERROR"
-        noerror=re.findall(result,status)
-        read=re.findall(result,LookFor)
-        for noerror in result:
-            for read in result:
-                assert True
+        response=query(record_name,zone_name,record_type)
+        assert response.rcode=="NOERROR"
+        assert re.search(LookFor,response.text(),re.I)
         logging.info ("Dig Query Successful for your requested record type")
     else:
-          logging.info ("Database Type Error","Validation type not recognized, please use either \"ns\", \"soa\", \"a\", \"aaaa\",\"cname\",\"dname\",\"mx\",,\"srv\",\"txt\",\"naptr\",\"ptr\",\"NSEC\",\"RRSIG\",\"axfr")        
-
-
+          logging.info ("Database Type Error","Validation type not recognized, please use either \"ns\", \"soa\", \"a\", \"aaaa\",\"cname\",\"dname\",\"mx\",,\"srv\",\"txt\",\"naptr\",\"ptr\",\"NSEC\",\"RRSIG\",\"axfr")
+          return None
+    return response
@@ -0,0 +1,746 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: dns_query.py
+#
+# Description:
+#     In-process DNS client. Builds the wire format query, sends it over
+#     UDP (TCP when the answer is truncated or on request) and parses the
+#     response into RR objects grouped in RRsets, no dig process and no
+#     text scraping. The rdata codec is table driven (RDATA_FIELDS), types
+#     without an entry are shown in the RFC 3597 '\# <length> <hex>' form.
+#
+#
+# Input Options:
+#        import ib_utils.dns_query as dns_query
+#        response = dns_query.query(config.grid_vip, "arec.zone106.com", "A")
+#        response.rcode                            -> 'NOERROR'
+#        response.rrset("arec.zone106.com", "A").rdatas -> ['10.0.0.1']
+#        response = dns_query.query(config.grid_vip, "zone106.com", "DNSKEY", dnssec=True)
+#        responses = dns_query.query_many(config.grid_vip, [("a.zone106.com", "A"), ("zone106.com", "MX")])
+#  Output:
+#    Message object (header flags, rcode, question, answer, authority
+#    and additional sections), query_many returns one Message or
+#    DNSError per question
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import base64
+import calendar
+import errno
+import logging
+import random
+import select
+import socket
+import struct
+import time
+
+PORT = 53
+TIMEOUT = 5
+RETRIES = 2
+PAYLOAD = 4096
+SOCKETS = 4
+WINDOW = 256
+
+TYPES = {
+    'A': 1, 'NS': 2, 'CNAME': 5, 'SOA': 6, 'PTR': 12, 'HINFO': 13, 'MX': 15, 'TXT': 16,
+    'RP': 17, 'AFSDB': 18, 'AAAA': 28, 'LOC': 29, 'SRV': 33, 'NAPTR': 35, 'CERT': 37,
+    'DNAME': 39, 'OPT': 41, 'APL': 42, 'DS': 43, 'SSHFP': 44, 'IPSECKEY': 45, 'RRSIG': 46,
+    'NSEC': 47, 'DNSKEY': 48, 'NSEC3': 50, 'NSEC3PARAM': 51, 'TLSA': 52, 'CDS': 59,
+    'CDNSKEY': 60, 'SPF': 99, 'TKEY': 249, 'TSIG': 250, 'IXFR': 251, 'AXFR': 252,
+    'ANY': 255, 'CAA': 257, 'DLV': 32769,
+}
+TYPE_NAMES = dict((code, name) for name, code in TYPES.items())
+
+CLASSES = {'IN': 1, 'CH': 3, 'HS': 4, 'NONE': 254, 'ANY': 255}
+CLASS_NAMES = dict((code, name) for name, code in CLASSES.items())
+
+RCODES = ['NOERROR', 'FORMERR', 'SERVFAIL', 'NXDOMAIN', 'NOTIMP', 'REFUSED',
+          'YXDOMAIN', 'YXRRSET', 'NXRRSET', 'NOTAUTH', 'NOTZONE']
+OPCODES = {'QUERY': 0, 'NOTIFY': 4, 'UPDATE': 5}
+
+FLAGS = [('qr', 0x8000), ('aa', 0x0400), ('tc', 0x0200), ('rd', 0x0100),
+         ('ra', 0x0080), ('ad', 0x0020), ('cd', 0x0010)]
+DO_BIT = 0x8000
+
+# Field kinds of the rdata of every known type, in wire order.
+RDATA_FIELDS = {
+    'A': ['ipv4'], 'AAAA': ['ipv6'],
+    'NS': ['name'], 'CNAME': ['name'], 'DNAME': ['name'], 'PTR': ['name'],
+    'MX': ['u16', 'name'], 'AFSDB': ['u16', 'name'], 'RP': ['name', 'name'],
+    'SOA': ['name', 'name', 'u32', 'u32', 'u32', 'u32', 'u32'],
+    'TXT': ['strings'], 'SPF': ['strings'], 'HINFO': ['string', 'string'],
+    'SRV': ['u16', 'u16', 'u16', 'name'],
+    'NAPTR': ['u16', 'u16', 'string', 'string', 'string', 'name'],
+    'CAA': ['u8', 'word', 'rest'],
+    'DS': ['u16', 'u8', 'u8', 'hex'], 'CDS': ['u16', 'u8', 'u8', 'hex'], 'DLV': ['u16', 'u8', 'u8', 'hex'],
+    'DNSKEY': ['u16', 'u8', 'u8', 'base64'], 'CDNSKEY': ['u16', 'u8', 'u8', 'base64'],
+    'RRSIG': ['type', 'u8', 'u8', 'u32', 'time', 'time', 'u16', 'name', 'base64'],
+    'NSEC': ['name', 'bitmap'],
+    'NSEC3': ['u8', 'u8', 'u16', 'salt', 'hash', 'bitmap'],
+    'NSEC3PARAM': ['u8', 'u8', 'u16', 'salt'],
+    'SSHFP': ['u8', 'u8', 'hex'], 'TLSA': ['u8', 'u8', 'u8', 'hex'],
+    # The gateway format depends on the gateway type, the second field.
+    'IPSECKEY': ['u8', 'u8', 'u8', 'gateway', 'base64'],
+}
+GATEWAYS = {1: 'ipv4', 2: 'ipv6', 3: 'name'}
+
+# Types whose embedded names are lowercased in the canonical form.
+CANONICAL_NAMES = set(['NS', 'CNAME', 'SOA', 'PTR', 'MX', 'RP', 'AFSDB',
+                       'SRV', 'NAPTR', 'DNAME', 'RRSIG'])
+
+FIXED = {'u8': '!B', 'u16': '!H', 'u32': '!I', 'time': '!I'}
+
+BASE32HEX = '0123456789ABCDEFGHIJKLMNOPQRSTUV'
+
+
+class DNSError(Exception):
+    pass
+
+
+def type_code(rtype):
+    if isinstance(rtype, int):
+        return rtype
+    rtype = rtype.upper()
+    if rtype in TYPES:
+        return TYPES[rtype]
+    if rtype.startswith('TYPE') and rtype[4:].isdigit():
+        return int(rtype[4:])
+    raise DNSError('Unknown record type %s' % rtype)
+
+
+def type_name(code):
+    return TYPE_NAMES.get(code, 'TYPE%d' % code)
+
+
+def class_code(rclass):
+    if isinstance(rclass, int):
+        return rclass
+    return CLASSES[rclass.upper()]
+
+
+def class_name(code):
+    return CLASS_NAMES.get(code, 'CLASS%d' % code)
+
+
+def absolute(name):
+    return name if name.endswith('.') else name + '.'
+
+
+def encode_name(name):
+    '''
+    Uncompressed wire form of a domain name (escaped dots not supported).
+    '''
+    name = absolute(name)
+    wire = []
+    if name != '.':
+        for label in name[:-1].split('.'):
+            if not label or len(label) > 63:
+                raise DNSError('Invalid label in %s' % name)
+            wire.append(chr(len(label)) + label)
+    wire.append('\0')
+    return ''.join(wire)
+
+
+def decode_name(message, offset):
+    '''
+    (name, offset after the name) following compression pointers.
+    '''
+    labels = []
+    end = None
+    jumps = 0
+    while True:
+        length = ord(message[offset])
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = struct.unpack('!H', message[offset:offset + 2])[0] & 0x3FFF
+            jumps += 1
+            if jumps > 127:
+                raise DNSError('Compression loop')
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(message[offset:offset + length])
+        offset += length
+    return '.'.join(labels) + '.', end if end is not None else offset
+
+
+def decode_bitmap(data):
+    types = []
+    offset = 0
+    while offset < len(data):
+        window, length = ord(data[offset]), ord(data[offset + 1])
+        for index, byte in enumerate(data[offset + 2:offset + 2 + length]):
+            for bit in range(8):
+                if ord(byte) & (0x80 >> bit):
+                    types.append(type_name(window * 256 + index * 8 + bit))
+        offset += 2 + length
+    return ' '.join(types)
+
+
+def base32hex(data):
+    bits = ''.join('{0:08b}'.format(ord(char)) for char in data)
+    bits += '0' * (-len(bits) % 5)
+    return ''.join(BASE32HEX[int(bits[i:i + 5], 2)] for i in range(0, len(bits), 5))
+
+
+def quote(string):
+    return '"%s"' % string.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def format_time(value):
+    return time.strftime('%Y%m%d%H%M%S', time.gmtime(value))
+
+
+def parse_time(text):
+    if len(text) == 14 and text.isdigit():
+        return calendar.timegm(time.strptime(text, '%Y%m%d%H%M%S'))
+    return int(text)
+
+
+def unbase32hex(text):
+    bits = ''.join('{0:05b}'.format(BASE32HEX.index(char)) for char in text.upper())
+    return ''.join(chr(int(bits[i:i + 8], 2)) for i in range(0, len(bits) - len(bits) % 8, 8))
+
+
+def encode_bitmap(types):
+    windows = {}
+    for rtype in types:
+        code = type_code(rtype)
+        window = windows.setdefault(code >> 8, [0] * 32)
+        window[(code & 0xFF) >> 3] |= 0x80 >> (code & 7)
+    wire = ''
+    for number, window in sorted(windows.items()):
+        while not window[-1]:
+            window.pop()
+        wire += chr(number) + chr(len(window)) + ''.join(chr(byte) for byte in window)
+    return wire
+
+
+def tokenize(text):
+    '''
+    Split presentation format rdata on blanks, keeping quoted strings
+    (with \\ and \" escapes) as one token.
+    '''
+    tokens = []
+    index = 0
+    while index < len(text):
+        if text[index].isspace():
+            index += 1
+            continue
+        if text[index] == '"':
+            token = ''
+            index += 1
+            while index < len(text) and text[index] != '"':
+                if text[index] == '\\' and index + 1 < len(text):
+                    index += 1
+                token += text[index]
+                index += 1
+            tokens.append(token)
+            index += 1
+        else:
+            start = index
+            while index < len(text) and not text[index].isspace():
+                index += 1
+            tokens.append(text[start:index])
+    return tokens
+
+
+def parse_rdata(rtype, text):
+    '''
+    Rdata fields of rtype from its presentation format, the reverse of
+    rdata_text. Unknown types need the '\\# <length> <hex>' form.
+    '''
+    tokens = tokenize(text)
+    if tokens[:1] == ['\\#']:
+        return None, ''.join(tokens[2:]).decode('hex')
+    kinds = RDATA_FIELDS.get(rtype)
+    if kinds is None:
+        raise DNSError('No codec for %s, use the \\# <length> <hex> form' % rtype)
+    fields = []
+    for position, kind in enumerate(kinds):
+        if kind in ('strings', 'hex', 'base64', 'bitmap'):
+            rest, tokens = tokens, []
+            if kind == 'strings':
+                fields.append(rest)
+            elif kind == 'hex':
+                fields.append(''.join(rest).decode('hex'))
+            elif kind == 'base64':
+                fields.append(base64.b64decode(''.join(rest)))
+            else:
+                fields.append(encode_bitmap(rest))
+            continue
+        if not tokens:
+            raise DNSError('Missing fields in %s rdata %r' % (rtype, text))
+        token = tokens.pop(0)
+        if kind == 'time':
+            fields.append(parse_time(token))
+        elif kind in FIXED:
+            fields.append(int(token))
+        elif kind == 'name' or (kind == 'gateway' and GATEWAYS.get(fields[1]) == 'name'):
+            fields.append(absolute(token))
+        elif kind == 'salt':
+            fields.append('' if token == '-' else token.decode('hex'))
+        elif kind == 'hash':
+            fields.append(unbase32hex(token))
+        else:
+            fields.append(token)
+    if tokens:
+        raise DNSError('Extra fields in %s rdata %r' % (rtype, text))
+    return fields, None
+
+
+def char_string(string):
+    if len(string) > 255:
+        raise DNSError('Character string longer than 255 bytes')
+    return chr(len(string)) + string
+
+
+def encode_rdata(rtype, fields, canonical=False):
+    '''
+    Uncompressed wire form of rdata fields. canonical lowercases the
+    embedded names as DNSSEC signing does (RFC 4034 6.2).
+    '''
+    wire = []
+    for kind, value in zip(RDATA_FIELDS[rtype], fields):
+        if kind == 'gateway':
+            kind = GATEWAYS.get(fields[1])
+            if kind is None:
+                continue
+        if kind in FIXED:
+            wire.append(struct.pack(FIXED[kind], value))
+        elif kind == 'type':
+            wire.append(struct.pack('!H', type_code(value)))
+        elif kind == 'name':
+            wire.append(encode_name(value.lower() if canonical and rtype in CANONICAL_NAMES else value))
+        elif kind == 'ipv4':
+            wire.append(socket.inet_pton(socket.AF_INET, value))
+        elif kind == 'ipv6':
+            wire.append(socket.inet_pton(socket.AF_INET6, value))
+        elif kind in ('string', 'word', 'salt', 'hash'):
+            wire.append(char_string(value))
+        elif kind == 'strings':
+            wire.extend(char_string(string) for string in value)
+        else:
+            wire.append(value)
+    return ''.join(wire)
+
+
+def rdata_wire(rtype, text):
+    '''
+    Wire form of rdata given in presentation format.
+    '''
+    fields, wire = parse_rdata(rtype.upper(), text)
+    return wire if fields is None else encode_rdata(rtype.upper(), fields)
+
+
+def decode_rdata(message, offset, length, rtype):
+    '''
+    List of the rdata fields of rtype, None for unknown types.
+    Names are decompressed against the whole message.
+    '''
+    kinds = RDATA_FIELDS.get(rtype)
+    if kinds is None:
+        return None
+    end = offset + length
+    fields = []
+    for kind in kinds:
+        if kind == 'gateway':
+            kind = GATEWAYS.get(fields[1])
+            if kind is None:
+                fields.append('.')
+                continue
+        if kind in FIXED:
+            size = struct.calcsize(FIXED[kind])
+            fields.append(struct.unpack(FIXED[kind], message[offset:offset + size])[0])
+            offset += size
+        elif kind == 'type':
+            fields.append(type_name(struct.unpack('!H', message[offset:offset + 2])[0]))
+            offset += 2
+        elif kind == 'name':
+            name, offset = decode_name(message, offset)
+            fields.append(name)
+        elif kind == 'ipv4':
+            fields.append(socket.inet_ntop(socket.AF_INET, message[offset:offset + 4]))
+            offset += 4
+        elif kind == 'ipv6':
+            fields.append(socket.inet_ntop(socket.AF_INET6, message[offset:offset + 16]))
+            offset += 16
+        elif kind in ('string', 'word', 'salt', 'hash'):
+            size = ord(message[offset])
+            fields.append(message[offset + 1:offset + 1 + size])
+            offset += 1 + size
+        elif kind == 'strings':
+            strings = []
+            while offset < end:
+                size = ord(message[offset])
+                strings.append(message[offset + 1:offset + 1 + size])
+                offset += 1 + size
+            fields.append(strings)
+        else:
+            # rest, hex, base64 and bitmap take what is left.
+            fields.append(message[offset:end])
+            offset = end
+    return fields
+
+
+def rdata_text(rtype, fields, wire):
+    if fields is None:
+        return '\\# %d %s' % (len(wire), wire.encode('hex').upper())
+    words = []
+    for kind, value in zip(RDATA_FIELDS[rtype], fields):
+        if kind == 'string' or kind == 'rest':
+            words.append(quote(value))
+        elif kind == 'strings':
+            words.append(' '.join(quote(string) for string in value))
+        elif kind == 'time':
+            words.append(format_time(value))
+        elif kind == 'hex':
+            words.append(value.encode('hex').upper())
+        elif kind == 'base64':
+            words.append(base64.b64encode(value))
+        elif kind == 'bitmap':
+            words.append(decode_bitmap(value))
+        elif kind == 'salt':
+            words.append(value.encode('hex').upper() or '-')
+        elif kind == 'hash':
+            words.append(base32hex(value))
+        else:
+            words.append(str(value))
+    return ' '.join(word for word in words if word)
+
+
+class RR:
+    '''
+    One resource record. fields holds the decoded rdata fields, wire the
+    rdata exactly as received.
+    '''
+    def __init__(self, name, rtype, rclass, ttl, wire, fields=None):
+        self.name = name
+        self.type = rtype
+        self.rclass = rclass
+        self.ttl = ttl
+        self.wire = wire
+        self.fields = fields
+        self.rdata = rdata_text(rtype, fields, wire)
+
+    def __repr__(self):
+        return '%s\t%d\t%s\t%s\t%s' % (self.name, self.ttl, self.rclass, self.type, self.rdata)
+
+
+class RRset:
+    '''
+    The records sharing name, type and class.
+    '''
+    def __init__(self, name, rtype, rclass, ttl):
+        self.name = name
+        self.type = rtype
+        self.rclass = rclass
+        self.ttl = ttl
+        self.rrs = []
+
+    @property
+    def rdatas(self):
+        return [rr.rdata for rr in self.rrs]
+
+    def __len__(self):
+        return len(self.rrs)
+
+    def __repr__(self):
+        return '<RRset %s %s %s %s>' % (self.name, self.rclass, self.type, self.rdatas)
+
+
+def group_rrsets(rrs):
+    rrsets = []
+    index = {}
+    for rr in rrs:
+        key = (rr.name.lower(), rr.type, rr.rclass)
+        if key not in index:
+            index[key] = RRset(rr.name, rr.type, rr.rclass, rr.ttl)
+            rrsets.append(index[key])
+        index[key].rrs.append(rr)
+        index[key].ttl = min(index[key].ttl, rr.ttl)
+    return rrsets
+
+
+class Message:
+    '''
+    Parsed DNS message.
+    '''
+    def __init__(self, wire):
+        self.wire = wire
+        self.id, flags, qdcount, ancount, nscount, arcount = struct.unpack('!6H', wire[:12])
+        self.flags = set(name for name, bit in FLAGS if flags & bit)
+        self.opcode = (flags >> 11) & 0xF
+        rcode = flags & 0xF
+        offset = 12
+        self.question = []
+        for i in range(qdcount):
+            name, offset = decode_name(wire, offset)
+            qtype, qclass = struct.unpack('!HH', wire[offset:offset + 4])
+            self.question.append((name, type_name(qtype), class_name(qclass)))
+            offset += 4
+        self.tsig = None
+        self.tsig_start = None
+        self.answer, offset = self.parse_section(offset, ancount)
+        self.authority, offset = self.parse_section(offset, nscount)
+        self.additional, offset = self.parse_section(offset, arcount)
+        self.edns = None
+        for rr in list(self.additional):
+            if rr.type == 'OPT':
+                # The extended rcode lives in the OPT TTL.
+                rcode |= (rr.ttl >> 24) << 4
+                self.edns = rr
+                self.additional.remove(rr)
+            elif rr.type == 'TSIG':
+                self.tsig = rr
+                self.additional.remove(rr)
+        self.rcode = RCODES[rcode] if rcode < len(RCODES) else 'RCODE%d' % rcode
+
+    def parse_section(self, offset, count):
+        rrs = []
+        for i in range(count):
+            start = offset
+            name, offset = decode_name(self.wire, offset)
+            rtype, rclass, ttl, length = struct.unpack('!HHIH', self.wire[offset:offset + 10])
+            offset += 10
+            rtype = type_name(rtype)
+            if rtype == 'TSIG':
+                # The signature covers the message up to the TSIG record.
+                self.tsig_start = start
+            # OPT abuses the class as payload size.
+            rclass = rclass if rtype == 'OPT' else class_name(rclass)
+            fields = decode_rdata(self.wire, offset, length, rtype)
+            rrs.append(RR(name, rtype, rclass, ttl, self.wire[offset:offset + length], fields))
+            offset += length
+        return rrs, offset
+
+    def rrsets(self, section='answer'):
+        return group_rrsets(getattr(self, section))
+
+    def rrset(self, name, rtype, section='answer'):
+        '''
+        RRset of name and rtype in section, None when absent.
+        '''
+        name = absolute(name).lower()
+        for rrset in self.rrsets(section):
+            if rrset.name.lower() == name and rrset.type == rtype.upper():
+                return rrset
+        return None
+
+    def text(self):
+        '''
+        dig like dump, for the logs.
+        '''
+        lines = [';; rcode: %s, flags: %s' % (self.rcode, ' '.join(sorted(self.flags)))]
+        for name, qtype, qclass in self.question:
+            lines.append(';%s\t\t%s\t%s' % (name, qclass, qtype))
+        for section in ('answer', 'authority', 'additional'):
+            rrs = getattr(self, section)
+            if rrs:
+                lines.append(';; %s SECTION:' % section.upper())
+                lines.extend(repr(rr) for rr in rrs)
+        return '\n'.join(lines)
+
+
+def make_query(qname, qtype='A', qclass='IN', recursion=True, dnssec=False, payload=PAYLOAD, query_id=None):
+    '''
+    Wire format query, with an EDNS OPT record when payload is set.
+    '''
+    query_id = random.randint(0, 0xFFFF) if query_id is None else query_id
+    flags = 0x0100 if recursion else 0
+    arcount = 1 if payload else 0
+    wire = struct.pack('!6H', query_id, flags, 1, 0, 0, arcount)
+    wire += encode_name(qname) + struct.pack('!HH', type_code(qtype), class_code(qclass))
+    if payload:
+        wire += '\0' + struct.pack('!HHIH', TYPES['OPT'], payload, DO_BIT if dnssec else 0, 0)
+    return wire
+
+
+def recv_exact(sock, size):
+    data = ''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise DNSError('Connection closed by server')
+        data += chunk
+    return data
+
+
+def send_tcp(sock, wire):
+    sock.sendall(struct.pack('!H', len(wire)) + wire)
+
+
+def recv_tcp(sock):
+    length = struct.unpack('!H', recv_exact(sock, 2))[0]
+    return recv_exact(sock, length)
+
+
+def family(server):
+    return socket.AF_INET6 if ':' in server else socket.AF_INET
+
+
+def is_local_address(address):
+    '''
+    True when address belongs to this host, i.e. a socket can be bound to it.
+    '''
+    sock = socket.socket(family(address), socket.SOCK_DGRAM)
+    try:
+        sock.bind((address, 0))
+        return True
+    except socket.error:
+        return False
+    finally:
+        sock.close()
+
+
+def udp_exchange(server, wire, port=PORT, timeout=TIMEOUT, retries=RETRIES, source=None):
+    sock = socket.socket(family(server), socket.SOCK_DGRAM)
+    sock.settimeout(timeout)
+    try:
+        if source:
+            sock.bind((source, 0))
+        for attempt in range(retries + 1):
+            sock.sendto(wire, (server, port))
+            try:
+                while True:
+                    data, peer = sock.recvfrom(65535)
+                    # Drop late answers of a previous attempt.
+                    if data[:2] == wire[:2]:
+                        return data
+            except socket.timeout:
+                if attempt == retries:
+                    raise DNSError('No answer from %s after %d tries' % (server, retries + 1))
+    finally:
+        sock.close()
+
+
+def tcp_exchange(server, wire, port=PORT, timeout=TIMEOUT, source=None):
+    sock = socket.create_connection((server, port), timeout, (source, 0) if source else None)
+    try:
+        send_tcp(sock, wire)
+        return recv_tcp(sock)
+    finally:
+        sock.close()
+
+
+def exchange(server, wire, port=PORT, timeout=TIMEOUT, tcp=False, source=None):
+    '''
+    Send a wire format message, return the parsed answer. UDP answers with
+    the TC flag are retried over TCP. source is the local address to send
+    from (default chosen by the system).
+    '''
+    server = str(server)
+    if not tcp:
+        response = Message(udp_exchange(server, wire, port, timeout, source=source))
+        if 'tc' not in response.flags:
+            return response
+    return Message(tcp_exchange(server, wire, port, timeout, source))
+
+
+def query(server, qname, qtype='A', qclass='IN', port=PORT, timeout=TIMEOUT, tcp=False,
+          recursion=True, dnssec=False, payload=PAYLOAD):
+    '''
+    Query server for qname/qtype, return the response Message.
+    '''
+    wire = make_query(qname, qtype, qclass, recursion, dnssec, payload)
+    response = exchange(server, wire, port, timeout, tcp)
+    logging.info('%s %s @%s: %s, %d answers' % (qname, qtype, server, response.rcode, len(response.answer)))
+    return response
+
+
+def query_many(server, questions, port=PORT, timeout=TIMEOUT, retries=RETRIES, sockets=SOCKETS,
+               window=WINDOW, recursion=True, dnssec=False, payload=PAYLOAD):
+    '''
+    Send all (qname, qtype) questions concurrently over a few non-blocking
+    UDP sockets, at most window of them in flight. Unanswered queries are
+    resent retries times, truncated answers are asked again over TCP.
+    Return one Message, or DNSError, per question in the same order.
+    '''
+    server = str(server)
+    results = [None] * len(questions)
+    pending = list(range(len(questions)))
+    pending.reverse()
+    socks = [socket.socket(family(server), socket.SOCK_DGRAM) for i in range(max(1, sockets))]
+    owner = dict((sock.fileno(), index) for index, sock in enumerate(socks))
+    inflight = {}
+    truncated = []
+    sent = 0
+    try:
+        for sock in socks:
+            sock.setblocking(0)
+        while pending or inflight:
+            now = time.time()
+            while pending and len(inflight) < window:
+                index = pending.pop()
+                slot = sent % len(socks)
+                sent += 1
+                query_id = random.randint(0, 0xFFFF)
+                while (slot, query_id) in inflight:
+                    query_id = random.randint(0, 0xFFFF)
+                qname, qtype = questions[index]
+                wire = make_query(qname, qtype, 'IN', recursion, dnssec, payload, query_id)
+                # Sent by the retry pass below, deadline already reached.
+                inflight[(slot, query_id)] = [index, wire, now, -1]
+            for key, entry in list(inflight.items()):
+                if entry[2] > now:
+                    continue
+                if entry[3] >= retries:
+                    del inflight[key]
+                    results[entry[0]] = DNSError('No answer from %s after %d tries' % (server, retries + 1))
+                    continue
+                try:
+                    socks[key[0]].sendto(entry[1], (server, port))
+                except socket.error as error:
+                    if error.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.ENOBUFS):
+                        raise
+                entry[2] = now + timeout
+                entry[3] += 1
+            if not inflight:
+                continue
+            wait = max(0, min(entry[2] for entry in inflight.values()) - time.time())
+            readable = select.select(socks, [], [], wait)[0]
+            for sock in readable:
+                while True:
+                    try:
+                        data = sock.recv(65535)
+                    except socket.error as error:
+                        if error.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                            break
+                        raise
+                    if len(data) < 12:
+                        continue
+                    key = (owner[sock.fileno()], struct.unpack('!H', data[:2])[0])
+                    entry = inflight.pop(key, None)
+                    if entry is None:
+                        # Duplicate answer to a resent query.
+                        continue
+                    try:
+                        response = Message(data)
+                    except Exception as error:
+                        results[entry[0]] = DNSError('Malformed answer: %s' % error)
+                        continue
+                    if 'tc' in response.flags:
+                        truncated.append(entry[0])
+                    else:
+                        results[entry[0]] = response
+    finally:
+        for sock in socks:
+            sock.close()
+    for index in truncated:
+        qname, qtype = questions[index]
+        try:
+            results[index] = exchange(server, make_query(qname, qtype, 'IN', recursion, dnssec, payload),
+                                      port, timeout, tcp=True)
+        except (socket.error, DNSError) as error:
+            results[index] = DNSError(str(error))
+    logging.info('%d queries @%s, %d over TCP' % (len(questions), server, len(truncated)))
+    return results
@@ -0,0 +1,231 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: dns_update.py
+#
+# Description:
+#     In-process dynamic DNS updates (RFC 2136). Adds and deletes are
+#     packed into one UPDATE message per zone (split every max_changes
+#     changes), optionally signed with TSIG (RFC 8945), and the messages
+#     are sent concurrently. Replaces nsupdate sessions driven by pexpect.
+#
+#
+# Input Options:
+#        import ib_utils.dns_update as dns_update
+#        update = dns_update.Update("zone106.com")
+#        update.add("arec", 300, "A", "10.0.0.1")
+#        update.delete("old", "A")
+#        response = dns_update.send(config.grid_vip, update)
+#        response = dns_update.send(config.grid_vip, update, source=config.client_ip)
+#
+#        key = dns_update.Key("tsig-key", "c2VjcmV0", "hmac-sha256")
+#        changes = [("add", "h%d" % i, 300, "A", "10.1.0.%d" % i) for i in range(200)]
+#        dns_update.send_all(config.grid_vip, dns_update.batch("zone106.com", changes), key=key)
+#  Output:
+#    Response Message (rcode NOERROR when applied), send_all returns one
+#    Message or exception per update
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import base64
+import hashlib
+import hmac
+import logging
+import random
+import struct
+import time
+import config
+import ib_utils.dns_query as dns_query
+from multiprocessing.pool import ThreadPool
+
+MAX_CHANGES = 500
+CONCURRENCY = getattr(config, 'dns_update_concurrency', 8)
+FUDGE = 300
+UDP_SIZE = 512
+
+ALGORITHMS = {
+    'hmac-md5.sig-alg.reg.int.': hashlib.md5,
+    'hmac-sha1.': hashlib.sha1,
+    'hmac-sha224.': hashlib.sha224,
+    'hmac-sha256.': hashlib.sha256,
+    'hmac-sha384.': hashlib.sha384,
+    'hmac-sha512.': hashlib.sha512,
+}
+TSIG_ERRORS = {16: 'BADSIG', 17: 'BADKEY', 18: 'BADTIME', 22: 'BADTRUNC'}
+
+
+class Key:
+    '''
+    TSIG key, secret in base64 as in named.conf.
+    '''
+    def __init__(self, name, secret, algorithm='hmac-sha256'):
+        self.name = dns_query.absolute(name).lower()
+        self.secret = base64.b64decode(secret)
+        self.algorithm = dns_query.absolute(algorithm.lower())
+        if self.algorithm == 'hmac-md5.':
+            self.algorithm = 'hmac-md5.sig-alg.reg.int.'
+        if self.algorithm not in ALGORITHMS:
+            raise dns_query.DNSError('Unsupported TSIG algorithm %s' % algorithm)
+
+    def variables(self, time_signed, fudge, error=0, other=''):
+        return (dns_query.encode_name(self.name) + struct.pack('!HI', dns_query.CLASSES['ANY'], 0) +
+                dns_query.encode_name(self.algorithm) + struct.pack('!HIH', time_signed >> 32,
+                time_signed & 0xFFFFFFFF, fudge) + struct.pack('!HH', error, len(other)) + other)
+
+    def mac(self, data):
+        return hmac.new(self.secret, data, ALGORITHMS[self.algorithm]).digest()
+
+    def sign(self, wire, fudge=FUDGE):
+        '''
+        (signed message, request MAC) for an unsigned message.
+        '''
+        time_signed = int(time.time())
+        mac = self.mac(wire + self.variables(time_signed, fudge))
+        rdata = (dns_query.encode_name(self.algorithm) + struct.pack('!HIH', time_signed >> 32,
+                 time_signed & 0xFFFFFFFF, fudge) + struct.pack('!H', len(mac)) + mac +
+                 wire[:2] + struct.pack('!HH', 0, 0))
+        record = dns_query.encode_name(self.name) + struct.pack('!HHIH', dns_query.TYPES['TSIG'],
+                                                               dns_query.CLASSES['ANY'], 0, len(rdata)) + rdata
+        arcount = struct.unpack('!H', wire[10:12])[0] + 1
+        return wire[:10] + struct.pack('!H', arcount) + wire[12:] + record, mac
+
+    def verify(self, response, request_mac):
+        '''
+        Check the TSIG of a response to a request signed with request_mac.
+        '''
+        if response.tsig is None:
+            raise dns_query.DNSError('Response is not signed (rcode %s)' % response.rcode)
+        rdata = response.tsig.wire
+        algorithm, offset = dns_query.decode_name(rdata, 0)
+        high, low, fudge, size = struct.unpack('!HIHH', rdata[offset:offset + 10])
+        mac = rdata[offset + 10:offset + 10 + size]
+        offset += 10 + size
+        original_id, error, other_size = struct.unpack('!HHH', rdata[offset:offset + 6])
+        other = rdata[offset + 6:offset + 6 + other_size]
+        if error:
+            raise dns_query.DNSError('TSIG error %s' % TSIG_ERRORS.get(error, error))
+        wire = response.wire[:response.tsig_start]
+        arcount = struct.unpack('!H', wire[10:12])[0] - 1
+        wire = struct.pack('!H', original_id) + wire[2:10] + struct.pack('!H', arcount) + wire[12:]
+        expected = self.mac(struct.pack('!H', len(request_mac)) + request_mac + wire +
+                            self.variables((high << 32) + low, fudge, error, other))
+        if not hmac.compare_digest(mac, expected):
+            raise dns_query.DNSError('TSIG signature of the response does not match')
+
+
+def default_key():
+    '''
+    Key from config (tsig_key_name, tsig_key_secret, tsig_algorithm), None
+    when not configured.
+    '''
+    name = getattr(config, 'tsig_key_name', None)
+    if not name:
+        return None
+    return Key(name, config.tsig_key_secret, getattr(config, 'tsig_algorithm', 'hmac-sha256'))
+
+
+class Update:
+    '''
+    One UPDATE message for zone. Names not ending with a dot and outside
+    the zone are taken relative to it.
+    '''
+    def __init__(self, zone):
+        self.zone = dns_query.absolute(zone)
+        self.records = []
+
+    def owner(self, name):
+        name = str(name)
+        if name.endswith('.'):
+            return name
+        if name.lower() == self.zone[:-1].lower() or name.lower().endswith('.' + self.zone[:-1].lower()):
+            return name + '.'
+        return name + '.' + self.zone
+
+    def record(self, name, rtype, rclass, ttl, rdata=''):
+        self.records.append(dns_query.encode_name(self.owner(name)) +
+                            struct.pack('!HHIH', dns_query.type_code(rtype), dns_query.class_code(rclass),
+                                        int(ttl), len(rdata)) + rdata)
+        return self
+
+    def add(self, name, ttl, rtype, rdata):
+        return self.record(name, rtype, 'IN', ttl, dns_query.rdata_wire(rtype, str(rdata)))
+
+    def delete(self, name, rtype='ANY', rdata=None):
+        '''
+        Delete one record (rdata given), an RRset (rtype given) or every
+        RRset of name.
+        '''
+        if rdata is None:
+            return self.record(name, rtype, 'ANY', 0)
+        return self.record(name, rtype, 'NONE', 0, dns_query.rdata_wire(rtype, str(rdata)))
+
+    def __len__(self):
+        return len(self.records)
+
+    def to_wire(self, query_id=None):
+        query_id = random.randint(0, 0xFFFF) if query_id is None else query_id
+        header = struct.pack('!6H', query_id, dns_query.OPCODES['UPDATE'] << 11, 1, 0, len(self.records), 0)
+        zone = dns_query.encode_name(self.zone) + struct.pack('!HH', dns_query.TYPES['SOA'], dns_query.CLASSES['IN'])
+        return header + zone + ''.join(self.records)
+
+
+def batch(zone, changes, max_changes=MAX_CHANGES):
+    '''
+    Updates of zone for changes ('add', name, ttl, type, rdata) and
+    ('delete', name[, type[, rdata]]), max_changes per message.
+    '''
+    updates = []
+    for change in changes:
+        if not updates or len(updates[-1]) >= max_changes:
+            updates.append(Update(zone))
+        if change[0] == 'add':
+            updates[-1].add(*change[1:])
+        elif change[0] == 'delete':
+            updates[-1].delete(*change[1:])
+        else:
+            raise ValueError('Unknown update operation %s' % change[0])
+    return updates
+
+
+def send(server, update, key=None, port=dns_query.PORT, timeout=dns_query.TIMEOUT, source=None):
+    '''
+    Send one Update (signed with key, default default_key()) and return
+    the response. Messages larger than 512 bytes go over TCP. source is
+    the local address the server sees, checked by allow_update ACLs.
+    '''
+    key = key or default_key()
+    wire = update.to_wire()
+    request_mac = None
+    if key is not None:
+        wire, request_mac = key.sign(wire)
+    response = dns_query.exchange(server, wire, port, timeout, tcp=len(wire) > UDP_SIZE, source=source)
+    # BADKEY/BADSIG errors may come back unsigned, verify reports them.
+    if key is not None and (response.tsig is not None or response.rcode == 'NOERROR'):
+        key.verify(response, request_mac)
+    logging.info('UPDATE %s @%s: %d changes, %s' % (update.zone, server, len(update), response.rcode))
+    return response
+
+
+def send_all(server, updates, key=None, port=dns_query.PORT, timeout=dns_query.TIMEOUT, concurrency=CONCURRENCY,
+             source=None):
+    '''
+    Send updates concurrently, return one response Message or exception
+    per update, in order.
+    '''
+    def send_one(update):
+        try:
+            return send(server, update, key, port, timeout, source)
+        except Exception as error:
+            return error
+    pool = ThreadPool(max(1, min(concurrency, len(updates))))
+    try:
+        return pool.map(send_one, updates)
+    finally:
+        pool.close()
+        pool.join()
@@ -0,0 +1,413 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: dnssec_validate.py
+#
+# Description:
+#     Validates a signed zone locally. The zone is fetched with one AXFR
+#     (DNSKEY, RRSIG, NSEC/NSEC3 included), the DNSKEY RRset is checked
+#     against the DS of the parent, every authoritative RRset must carry
+#     a valid signature of a zone key and the NSEC or NSEC3 chain must be
+#     complete. Parsed public keys are cached across zones, so the keys
+#     of a rollover (dnssecgetkskrollover) are loaded once.
+#
+#
+# Input Options:
+#        import ib_utils.dnssec_validate as dnssec_validate
+#        result = dnssec_validate.validate_zone("dnssec.test.com", config.grid_vip)
+#        assert result, result.report()
+#        results = dnssec_validate.validate_zones(["sub1.test.com", "test.com"])
+#  Output:
+#    ValidationResult (keys, trusted key tags, errors), true when the
+#    zone validates
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import hashlib
+import logging
+import struct
+import threading
+import time
+import config
+import ib_utils.dns_query as dns_query
+import ib_utils.zone_snapshot as zone_snapshot
+from multiprocessing.pool import ThreadPool
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, padding, rsa, utils
+
+# DNSSEC algorithm number -> (key type, hash, curve)
+ALGORITHMS = {
+    5: ('rsa', hashes.SHA1, None),
+    7: ('rsa', hashes.SHA1, None),
+    8: ('rsa', hashes.SHA256, None),
+    10: ('rsa', hashes.SHA512, None),
+    13: ('ecdsa', hashes.SHA256, ec.SECP256R1),
+    14: ('ecdsa', hashes.SHA384, ec.SECP384R1),
+    15: ('ed25519', None, None),
+}
+DIGESTS = {1: hashlib.sha1, 2: hashlib.sha256, 4: hashlib.sha384}
+ZONE_KEY = 0x0100
+SEP = 0x0001
+OPT_OUT = 0x01
+CONCURRENCY = 4
+
+_keys = {}
+_lock = threading.Lock()
+
+
+class DNSSECError(Exception):
+    pass
+
+
+def number(data):
+    return int(data.encode('hex') or '0', 16)
+
+
+def key_tag(rdata):
+    '''
+    Key tag of a DNSKEY rdata (RFC 4034 appendix B).
+    '''
+    total = 0
+    for index, char in enumerate(rdata):
+        total += ord(char) if index & 1 else ord(char) << 8
+    total += (total >> 16) & 0xFFFF
+    return total & 0xFFFF
+
+
+def public_key(algorithm, data):
+    '''
+    Public key object of a DNSKEY, parsed once per key.
+    '''
+    with _lock:
+        if (algorithm, data) in _keys:
+            return _keys[(algorithm, data)]
+    if algorithm not in ALGORITHMS:
+        raise DNSSECError('Unsupported algorithm %d' % algorithm)
+    kind, digest, curve = ALGORITHMS[algorithm]
+    if kind == 'rsa':
+        if ord(data[0]):
+            size, offset = ord(data[0]), 1
+        else:
+            size, offset = struct.unpack('!H', data[1:3])[0], 3
+        numbers = rsa.RSAPublicNumbers(number(data[offset:offset + size]), number(data[offset + size:]))
+        key = numbers.public_key(default_backend())
+    elif kind == 'ecdsa':
+        half = len(data) // 2
+        key = ec.EllipticCurvePublicNumbers(number(data[:half]), number(data[half:]),
+                                            curve()).public_key(default_backend())
+    else:
+        key = ed25519.Ed25519PublicKey.from_public_bytes(data)
+    with _lock:
+        _keys[(algorithm, data)] = key
+    return key
+
+
+def verify(algorithm, key_data, signature, data):
+    key = public_key(algorithm, key_data)
+    kind, digest, curve = ALGORITHMS[algorithm]
+    try:
+        if kind == 'rsa':
+            key.verify(signature, data, padding.PKCS1v15(), digest())
+        elif kind == 'ecdsa':
+            half = len(signature) // 2
+            key.verify(utils.encode_dss_signature(number(signature[:half]), number(signature[half:])),
+                       data, ec.ECDSA(digest()))
+        else:
+            key.verify(signature, data)
+    except InvalidSignature:
+        return False
+    return True
+
+
+def canonical_name(name):
+    return dns_query.encode_name(name.lower())
+
+
+def labels(name):
+    return [label for label in name.rstrip('.').split('.') if label] if name != '.' else []
+
+
+def canonical_rdata(rr):
+    if rr.fields is None:
+        return rr.wire
+    return dns_query.encode_rdata(rr.type, rr.fields, canonical=True)
+
+
+def signed_data(rrsig, rrs):
+    '''
+    The data an RRSIG signs over rrs (RFC 4034 3.1.8.1).
+    '''
+    rtype, algorithm, label_count, original_ttl = rrsig.fields[:4]
+    owner = labels(rrs[0].name.lower())
+    if label_count < len(owner):
+        # Expanded from a wildcard.
+        owner = ['*'] + owner[len(owner) - label_count:]
+    owner = dns_query.encode_name('.'.join(owner) + '.')
+    header = owner + struct.pack('!HHI', dns_query.type_code(rtype), dns_query.class_code(rrs[0].rclass), original_ttl)
+    rdatas = sorted(set(canonical_rdata(rr) for rr in rrs))
+    return (dns_query.encode_rdata('RRSIG', rrsig.fields[:8], canonical=True) +
+            ''.join(header + struct.pack('!H', len(rdata)) + rdata for rdata in rdatas))
+
+
+def nsec3_hash(name, salt, iterations):
+    digest = hashlib.sha1(canonical_name(name) + salt).digest()
+    for i in range(iterations):
+        digest = hashlib.sha1(digest + salt).digest()
+    return dns_query.base32hex(digest)
+
+
+class DNSKey:
+    def __init__(self, rr):
+        self.flags, self.protocol, self.algorithm, self.data = rr.fields
+        self.wire = rr.wire
+        self.tag = key_tag(rr.wire)
+
+    @property
+    def ksk(self):
+        return bool(self.flags & SEP)
+
+    def __repr__(self):
+        return '<DNSKey %d alg %d %s>' % (self.tag, self.algorithm, 'KSK' if self.ksk else 'ZSK')
+
+
+def ds_matches(zone, key, ds):
+    '''
+    ds is the (tag, algorithm, digest type, digest) of a DS record.
+    '''
+    tag, algorithm, digest_type, digest = ds
+    if tag != key.tag or algorithm != key.algorithm or digest_type not in DIGESTS:
+        return False
+    return DIGESTS[digest_type](canonical_name(zone) + key.wire).digest() == digest
+
+
+class ValidationResult:
+    '''
+    keys: the DNSKEYs of the zone, trusted: tags of the keys anchored by
+    a DS (by their SEP flag when no DS is known), errors: (name, type,
+    reason) of every failure.
+    '''
+    def __init__(self, zone):
+        self.zone = zone
+        self.keys = []
+        self.trusted = []
+        self.chain = False
+        self.rrsets = 0
+        self.signatures = 0
+        self.errors = []
+
+    @property
+    def ok(self):
+        return bool(self.keys) and not self.errors
+
+    def __nonzero__(self):
+        return self.ok
+    __bool__ = __nonzero__
+
+    def error(self, name, rtype, reason):
+        self.errors.append((name, rtype, reason))
+
+    def report(self):
+        lines = ['%s: %d keys %s, trusted %s%s, %d RRsets, %d signatures checked, %d errors' %
+                 (self.zone, len(self.keys), self.keys, self.trusted, '' if self.chain else ' (no DS)',
+                  self.rrsets, self.signatures, len(self.errors))]
+        lines.extend('  %s %s: %s' % error for error in self.errors)
+        return '\n'.join(lines)
+
+
+class ZoneData:
+    '''
+    RRsets of a zone, grouped by owner name and type, with the delegation
+    points needed to tell authoritative data from glue.
+    '''
+    def __init__(self, zone, rrs):
+        self.zone = dns_query.absolute(zone).lower()
+        self.rrsets = {}
+        self.rrsigs = {}
+        for rr in rrs:
+            name = rr.name.lower()
+            if rr.type == 'RRSIG':
+                self.rrsigs.setdefault((name, rr.fields[0]), []).append(rr)
+            else:
+                self.rrsets.setdefault((name, rr.type), []).append(rr)
+        self.names = set(name for name, rtype in self.rrsets)
+        self.cuts = set(name for name, rtype in self.rrsets if rtype == 'NS' and name != self.zone)
+
+    def below_cut(self, name):
+        return any(name.endswith('.' + cut) for cut in self.cuts)
+
+    def types(self, name):
+        return set(rtype for owner, rtype in self.rrsets if owner == name)
+
+    def signed(self, name, rtype):
+        '''
+        Whether the RRset must be signed: not glue, not a delegation NS.
+        '''
+        if self.below_cut(name):
+            return False
+        return name not in self.cuts or rtype in ('DS', 'NSEC')
+
+    def authoritative_names(self):
+        return set(name for name in self.names if not self.below_cut(name))
+
+
+def check_rrset(data, result, keys, name, rtype, now, trusted_only=False):
+    rrs = data.rrsets[(name, rtype)]
+    result.rrsets += 1
+    rrsigs = data.rrsigs.get((name, rtype), [])
+    if not rrsigs:
+        result.error(name, rtype, 'not signed')
+        return False
+    reasons = []
+    for rrsig in rrsigs:
+        covered, algorithm, label_count, ttl, expiration, inception, tag, signer = rrsig.fields[:8]
+        if signer.lower() != data.zone:
+            reasons.append('signer %s' % signer)
+            continue
+        if not inception <= now <= expiration:
+            reasons.append('key %d signature outside %s - %s' % (tag, dns_query.format_time(inception),
+                                                                dns_query.format_time(expiration)))
+            continue
+        candidates = [key for key in keys if key.tag == tag and key.algorithm == algorithm]
+        if trusted_only:
+            candidates = [key for key in candidates if key.tag in result.trusted]
+        if not candidates:
+            reasons.append('no %skey %d' % ('trusted ' if trusted_only else '', tag))
+            continue
+        message = signed_data(rrsig, rrs)
+        for key in candidates:
+            result.signatures += 1
+            if verify(algorithm, key.data, rrsig.fields[8], message):
+                return True
+        reasons.append('bad signature of key %d' % tag)
+    result.error(name, rtype, ', '.join(reasons))
+    return False
+
+
+def check_nsec(data, result):
+    nsec = dict((name, rrs[0]) for (name, rtype), rrs in data.rrsets.items() if rtype == 'NSEC')
+    names = data.authoritative_names()
+    for name in sorted(names - set(nsec)):
+        result.error(name, 'NSEC', 'missing')
+    for name, rr in nsec.items():
+        expected = data.types(name) | set(['RRSIG', 'NSEC'])
+        listed = set(rr.rdata.split()[1:])
+        if listed != expected:
+            result.error(name, 'NSEC', 'type bitmap %s, zone has %s' % (sorted(listed), sorted(expected)))
+    # Walk the chain from the apex, it must come back after visiting all.
+    name = data.zone
+    visited = set()
+    while name in nsec and name not in visited:
+        visited.add(name)
+        name = nsec[name].fields[0].lower()
+    if name != data.zone or visited != set(nsec):
+        result.error(data.zone, 'NSEC', 'chain broken at %s' % name)
+
+
+def check_nsec3(data, result):
+    params = data.rrsets.get((data.zone, 'NSEC3PARAM'))
+    if not params:
+        result.error(data.zone, 'NSEC3PARAM', 'missing')
+        return
+    algorithm, flags, iterations, salt = params[0].fields
+    nsec3 = {}
+    for (name, rtype), rrs in data.rrsets.items():
+        if rtype == 'NSEC3':
+            nsec3[labels(name)[0].upper()] = rrs[0]
+    hashed = set(name for name in data.names if data.types(name) <= set(['NSEC3']))
+    names = data.authoritative_names() - hashed
+    # Empty non-terminals get an NSEC3 record too.
+    for name in list(names):
+        parts = labels(name)
+        for depth in range(len(labels(data.zone)) + 1, len(parts)):
+            names.add('.'.join(parts[len(parts) - depth:]) + '.')
+    for name in sorted(names):
+        if name in data.cuts and 'DS' not in data.types(name) and nsec3 and \
+           all(rr.fields[1] & OPT_OUT for rr in nsec3.values()):
+            continue
+        rr = nsec3.get(nsec3_hash(name, salt, iterations))
+        if rr is None:
+            result.error(name, 'NSEC3', 'missing')
+            continue
+        expected = data.types(name) - set(['NSEC3'])
+        if any(data.signed(name, rtype) for rtype in expected):
+            expected.add('RRSIG')
+        listed = set(rr.rdata.split()[5:])
+        if listed != expected:
+            result.error(name, 'NSEC3', 'type bitmap %s, zone has %s' % (sorted(listed), sorted(expected)))
+    chain = sorted(nsec3)
+    for index, owner in enumerate(chain):
+        following = chain[(index + 1) % len(chain)]
+        if dns_query.base32hex(nsec3[owner].fields[4]) != following:
+            result.error(owner.lower() + '.' + data.zone, 'NSEC3', 'next hash is not %s' % following)
+
+
+def validate_rrs(zone, rrs, ds=None, now=None):
+    '''
+    Validate the records of zone. ds is a list of DS rdata texts (or DS
+    RRs) of the parent, None when the zone is not delegated.
+    '''
+    now = time.time() if now is None else now
+    data = ZoneData(zone, rrs)
+    result = ValidationResult(data.zone)
+    result.keys = [DNSKey(rr) for rr in data.rrsets.get((data.zone, 'DNSKEY'), [])]
+    zone_keys = [key for key in result.keys if key.flags & ZONE_KEY]
+    if not zone_keys:
+        result.error(data.zone, 'DNSKEY', 'no zone key')
+        return result
+    if ds:
+        records = [record.fields if hasattr(record, 'fields') else dns_query.parse_rdata('DS', record)[0]
+                   for record in ds]
+        result.chain = True
+        result.trusted = [key.tag for key in zone_keys if any(ds_matches(data.zone, key, record) for record in records)]
+        if not result.trusted:
+            result.error(data.zone, 'DS', 'no DNSKEY matches the DS records')
+            return result
+    else:
+        result.trusted = [key.tag for key in zone_keys if key.ksk] or [key.tag for key in zone_keys]
+    check_rrset(data, result, zone_keys, data.zone, 'DNSKEY', now, trusted_only=True)
+    for name, rtype in sorted(data.rrsets):
+        if rtype != 'DNSKEY' and data.signed(name, rtype):
+            check_rrset(data, result, zone_keys, name, rtype, now)
+    if any(rtype == 'NSEC3' for name, rtype in data.rrsets):
+        check_nsec3(data, result)
+    else:
+        check_nsec(data, result)
+    return result
+
+
+def validate_zone(zone, server=None, ds=None, parent_server=None, port=dns_query.PORT, now=None):
+    '''
+    Transfer zone from server (default config.grid_vip) and validate it.
+    Without ds, the DS RRset is asked to parent_server (default server).
+    '''
+    server = server or config.grid_vip
+    start = time.time()
+    rrs = list(zone_snapshot.transfer(server, zone, port))
+    if ds is None:
+        response = dns_query.query(parent_server or server, zone, 'DS', port=port, recursion=False)
+        rrset = response.rrset(zone, 'DS')
+        ds = rrset.rrs if rrset is not None else None
+    result = validate_rrs(zone, rrs, ds, now)
+    logging.info('%s\nvalidated in %.1fs' % (result.report(), time.time() - start))
+    return result
+
+
+def validate_zones(zones, server=None, port=dns_query.PORT, concurrency=CONCURRENCY, now=None):
+    '''
+    {zone: ValidationResult}, zones validated concurrently.
+    '''
+    pool = ThreadPool(max(1, min(concurrency, len(zones))))
+    try:
+        results = pool.map(lambda zone: validate_zone(zone, server, port=port, now=now), zones)
+    finally:
+        pool.close()
+        pool.join()
+    return dict(zip(zones, results))
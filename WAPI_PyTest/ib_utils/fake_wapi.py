@@ -0,0 +1,807 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: fake_wapi.py
+#
+# Description:
+#     In-process HTTPS WAPI stand-in for offline runs and for profiling
+#     the client side (ib_NIOS, wapi_pool, wapi_session) without a Grid
+#     Master. Objects are kept in memory with every scalar field indexed,
+#     so equality searches do not scan. It understands _ref, searches
+#     (=, ~=, :=, !=, JSON body), _return_fields(+), _max_results,
+#     _paging, _function, the 'request' object and ibapauth cookies.
+#     Served types: zone_auth, record:*, smartfolder:global/personal/
+#     children, networkview, member, member:filedistribution,
+#     tftpfiledir, grid, grid:servicerestart:status and :request,
+#     fileop, search, request. grid restartservices takes restart_time
+#     seconds, reported through the grid:servicerestart objects.
+#
+#
+# Input Options:
+#        import ib_utils.fake_wapi as fake_wapi
+#        server = fake_wapi.start()
+#        config.grid_vip = server.grid_vip      # before importing ib_NIOS
+#        server.store.create('zone_auth', {'fqdn': 'test.com'})
+#        ...
+#        server.stop()
+#
+#        python -m ib_utils.fake_wapi 8443
+#  Output:
+#    FakeWapi server, address in grid_vip ('127.0.0.1:<port>')
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import BaseHTTPServer
+import SocketServer
+import atexit
+import base64
+import datetime
+import itertools
+import json
+import logging
+import os
+import re
+import socket
+import ssl
+import struct
+import sys
+import tempfile
+import threading
+import time
+import urlparse
+import uuid
+import config
+from collections import OrderedDict
+
+CERTFILE = getattr(config, 'fake_wapi_certfile', None)
+KEYFILE = getattr(config, 'fake_wapi_keyfile', None)
+# Idle seconds before a session cookie expires, and the most sessions
+# kept (the least recently used go first).
+SESSION_TIMEOUT = getattr(config, 'fake_wapi_session_timeout', 600)
+MAX_SESSIONS = 1000
+# Seconds a grid restartservices keeps the members restarting.
+RESTART_TIME = getattr(config, 'fake_wapi_restart_time', 0.5)
+MAX_RESULTS = 1000
+PATH_PATTERN = re.compile(r'^/wapi/v[^/]+/([^?]*)(?:\?(.*))?$')
+STATE_PATTERN = re.compile(r'##STATE:([^:#]+):##')
+COOKIE_PATTERN = re.compile(r'ibapauth="?([^";,\s]*)')
+
+
+class WapiError(Exception):
+    def __init__(self, text, status=400, code='Client.Ibap.Proto'):
+        Exception.__init__(self, text)
+        self.status = status
+        self.code = code
+
+
+class ObjectType:
+    '''
+    keys: fields shown in the _ref and checked for duplicates,
+    fields: returned without _return_fields, defaults: set on create.
+    '''
+    def __init__(self, keys, fields, defaults=None, creatable=True, unique=True):
+        self.keys = keys
+        self.fields = fields
+        self.defaults = defaults or {}
+        self.creatable = creatable
+        self.unique = unique
+
+
+OBJECT_TYPES = {
+    'zone_auth': ObjectType(['fqdn', 'view'], ['fqdn', 'view'], {'view': 'default', 'zone_format': 'FORWARD'}),
+    'networkview': ObjectType(['name'], ['is_default', 'name'], {'is_default': False}),
+    'smartfolder:global': ObjectType(['name'], ['comment', 'name']),
+    'smartfolder:personal': ObjectType(['name'], ['comment', 'is_shortcut', 'name'], {'is_shortcut': False}),
+    'smartfolder:children': ObjectType([], [], creatable=False),
+    'member': ObjectType(['host_name'], ['config_addr_type', 'host_name', 'platform', 'service_type_configuration'],
+                         {'config_addr_type': 'IPV4', 'platform': 'VNIOS', 'service_type_configuration': 'ALL_V4'}),
+    'member:filedistribution': ObjectType(['host_name'], ['host_name', 'ipv4_address', 'status'],
+                                          {'status': 'ACTIVE'}, creatable=False),
+    'tftpfiledir': ObjectType(['type', 'name'], ['directory', 'name', 'type'], {'directory': '/'}),
+    'grid': ObjectType(['name'], [], creatable=False),
+    'grid:servicerestart:status': ObjectType(['grid'], ['failures', 'finished', 'grouped', 'needed_restart',
+                                             'no_restart', 'parent', 'pending', 'pending_restart',
+                                             'processing', 'restarting', 'success', 'timeouts'],
+                                             creatable=False),
+    'grid:servicerestart:request': ObjectType(['member', 'service'], ['error', 'forced', 'group',
+                                              'last_updated_time', 'member', 'needed', 'order', 'result',
+                                              'service', 'state'], creatable=False),
+    'fileop': ObjectType([], [], creatable=False),
+    'search': ObjectType([], [], creatable=False),
+}
+
+# record:<type> -> value fields, a record is unique by name, view and value.
+RECORD_FIELDS = {
+    'a': ['ipv4addr'], 'aaaa': ['ipv6addr'], 'cname': ['canonical'], 'dname': ['target'],
+    'ptr': ['ptrdname'], 'mx': ['mail_exchanger', 'preference'], 'txt': ['text'],
+    'srv': ['port', 'priority', 'target', 'weight'], 'ns': ['nameserver'],
+    'caa': ['ca', 'ca_type'], 'naptr': ['order', 'preference', 'replacement', 'services'],
+    'host': ['ipv4addrs'],
+}
+
+
+def object_type(name):
+    if name in OBJECT_TYPES:
+        return OBJECT_TYPES[name]
+    if name.startswith('record:'):
+        fields = RECORD_FIELDS.get(name.split(':', 1)[1], [])
+        keys = ['name', 'view'] + [field for field in fields if field != 'ipv4addrs']
+        return ObjectType(['name', 'view'], sorted(fields + ['name', 'view']), {'view': 'default'}, unique=keys)
+    raise WapiError('AdmConProtoError: Unknown object type (%s)' % name)
+
+
+def text(value):
+    '''
+    Search form of a field value, as it appears in a query string.
+    '''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, basestring):
+        return value
+    return unicode(value)
+
+
+def indexable(value):
+    return isinstance(value, (basestring, int, long, float, bool))
+
+
+class Store:
+    '''
+    Objects by _ref, with an index {(type, field): {value: set(refs)}} of
+    every scalar field. Changes made inside transaction() are undone
+    when it fails.
+    '''
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.objects = {}
+        self.types = {}
+        self.index = {}
+        self.order = {}
+        self.ids = itertools.count(1)
+        self.journal = None
+
+    def make_ref(self, otype, oid, obj):
+        spec = object_type(otype)
+        display = '/'.join(text(obj.get(key, '')) for key in spec.keys) or otype
+        return '%s/%s:%s' % (otype, oid, display)
+
+    def reindex(self, otype, ref, obj, add):
+        for field, value in obj.items():
+            if not indexable(value):
+                continue
+            refs = self.index.setdefault((otype, field), {}).setdefault(text(value), set())
+            if add:
+                refs.add(ref)
+            else:
+                refs.discard(ref)
+
+    def insert(self, otype, key, obj):
+        obj['_ref'] = self.make_ref(otype, key.split('/', 1)[1], obj)
+        self.objects[key] = (otype, obj)
+        self.order.setdefault(key, next(self.ids))
+        self.types.setdefault(otype, {})[key] = obj
+        self.reindex(otype, key, obj, True)
+
+    def remove(self, key):
+        otype, obj = self.objects.pop(key)
+        del self.types[otype][key]
+        self.reindex(otype, key, obj, False)
+        return otype, obj
+
+    def log(self, undo):
+        if self.journal is not None:
+            self.journal.append(undo)
+
+    def get(self, ref):
+        key = ref if ref in self.objects else self.ref_key(ref)
+        if key not in self.objects:
+            raise WapiError('AdmConDataNotFoundError: Reference %s not found' % ref, 404,
+                            'Client.Ibap.Data.NotFound')
+        return key, self.objects[key]
+
+    def ref_key(self, ref):
+        otype, rest = ref.split('/', 1) if '/' in ref else (ref, '')
+        return '%s/%s' % (otype, rest.split(':', 1)[0])
+
+    def find(self, otype, **fields):
+        return [obj for key, obj in self.search(otype, [(field, '', text(value)) for field, value in fields.items()])]
+
+    def search(self, otype, criteria):
+        '''
+        [(key, obj)] of otype matching criteria [(field, modifier, value)].
+        Equality on a field goes through the index, the rest is scanned.
+        '''
+        with self.lock:
+            objects = self.types.get(otype, {})
+            keys = None
+            scanned = []
+            for field, modifier, value in criteria:
+                if modifier == '' and not field.startswith('*'):
+                    refs = self.index.get((otype, field), {}).get(value, set())
+                    keys = set(refs) if keys is None else keys & refs
+                else:
+                    scanned.append((field, modifier, value))
+            if keys is None:
+                keys = objects.keys()
+            matches = []
+            for key in sorted(keys, key=self.order.get):
+                obj = objects[key]
+                if all(match(obj, field, modifier, value) for field, modifier, value in scanned):
+                    matches.append((key, obj))
+            return matches
+
+    def create(self, otype, data):
+        spec = object_type(otype)
+        obj = dict(spec.defaults)
+        obj.update(data)
+        with self.lock:
+            if otype.startswith('record:'):
+                obj['zone'] = self.parent_zone(otype, obj)
+            if spec.unique:
+                unique = spec.keys if spec.unique is True else spec.unique
+                missing = [field for field in unique if field not in obj]
+                if missing:
+                    raise WapiError('AdmConProtoError: Required field missing: %s' % missing[0])
+                if self.find(otype, **dict((field, obj[field]) for field in unique)):
+                    raise WapiError("AdmConDataError: None (IBDataConflictError: IB.Data.Conflict:Duplicate "
+                                    "object '%s' of type %s already exists in the database.)" %
+                                    (text(obj[unique[0]]), otype), code='Client.Ibap.Data.Conflict')
+            oid = base64.urlsafe_b64encode('fake.%s$%d' % (otype, next(self.ids))).rstrip('=')
+            key = '%s/%s' % (otype, oid)
+            self.insert(otype, key, obj)
+            self.log(lambda: self.remove(key))
+        return obj['_ref']
+
+    def parent_zone(self, otype, obj):
+        view = obj.get('view', 'default')
+        if otype == 'record:ptr' and 'ipv4addr' in obj and not obj.get('name'):
+            # Named after the address, in the reverse zone holding it.
+            address = struct.unpack('!I', socket.inet_aton(obj['ipv4addr']))[0]
+            for zone in self.find('zone_auth', zone_format='IPV4', view=view):
+                network, _, length = zone['fqdn'].partition('/')
+                mask = (0xFFFFFFFF << (32 - int(length or 32))) & 0xFFFFFFFF
+                if address & mask == struct.unpack('!I', socket.inet_aton(network))[0] & mask:
+                    obj['name'] = '.'.join(reversed(obj['ipv4addr'].split('.'))) + '.in-addr.arpa'
+                    return zone['fqdn']
+        name = obj.get('name', '').lower()
+        labels = name.split('.')
+        for index in range(len(labels)):
+            fqdn = '.'.join(labels[index:])
+            if self.find('zone_auth', fqdn=fqdn, view=view):
+                return fqdn
+        raise WapiError('AdmConDataError: None (IBDataError: IB.Data:The action is not allowed. '
+                        'A parent was not found.)', code='Client.Ibap.Data')
+
+    def update(self, ref, data):
+        with self.lock:
+            key, (otype, obj) = self.get(ref)
+            old = dict(obj)
+            self.remove(key)
+            obj = dict(obj)
+            obj.update(data)
+            self.insert(otype, key, obj)
+            self.log(lambda: (self.remove(key), self.insert(otype, key, old)))
+            return obj['_ref']
+
+    def delete(self, ref):
+        with self.lock:
+            key, (otype, obj) = self.get(ref)
+            if otype == 'zone_auth':
+                for record_type in [name for name in self.types if name.startswith('record:')]:
+                    for child, record in self.search(record_type, [('zone', '', obj['fqdn']),
+                                                                   ('view', '', obj['view'])]):
+                        self.delete(record['_ref'])
+            self.remove(key)
+            del self.order[key]
+            self.log(lambda: self.insert(otype, key, obj))
+            return obj['_ref']
+
+    def transaction(self, function):
+        with self.lock:
+            self.journal = journal = []
+            try:
+                return function()
+            except Exception:
+                for undo in reversed(journal):
+                    undo()
+                raise
+            finally:
+                self.journal = None
+
+
+def match(obj, field, modifier, value):
+    if field.startswith('*'):
+        actual = obj.get('extattrs', {}).get(field[1:], {}).get('value')
+    else:
+        actual = obj.get(field)
+    if actual is None:
+        return modifier == '!'
+    actual = text(actual)
+    if modifier == '~':
+        return re.search(value, actual) is not None
+    if modifier == ':':
+        return actual.lower() == value.lower()
+    if modifier == '!':
+        return actual != value
+    if modifier == '<':
+        return float(actual) <= float(value)
+    if modifier == '>':
+        return float(actual) >= float(value)
+    return actual == value
+
+
+def restart_function(store, obj, data, server):
+    return {}
+
+
+def restart_services(store, obj, data, server):
+    '''
+    Every member restarts for server.restart_time seconds: the
+    grid:servicerestart:status counters show them restarting, then
+    finished, and their grid:servicerestart:request objects are updated.
+    '''
+    members = [member['host_name'] for member in store.types.get('member', {}).values()]
+    services = data.get('services') or ['ALL']
+    status = store.types['grid:servicerestart:status'].keys()[0]
+    store.update(status, {'restarting': len(members), 'finished': 0, 'success': 0})
+    def finish():
+        with store.lock:
+            store.update(status, {'restarting': 0, 'finished': len(members), 'success': len(members)})
+            changes = {'state': 'FINISHED', 'result': 'SUCCESS', 'needed': 'NO', 'last_updated_time': time.time()}
+            for host_name in members:
+                for service in services:
+                    requests = store.find('grid:servicerestart:request', member=host_name, service=service)
+                    if requests:
+                        store.update(requests[0]['_ref'], changes)
+                    else:
+                        request = {'member': host_name, 'service': service, 'forced': True}
+                        request.update(changes)
+                        store.create('grid:servicerestart:request', request)
+    delay = getattr(server, 'restart_time', 0)
+    if delay:
+        timer = threading.Timer(delay, finish)
+        timer.daemon = True
+        server.timers = [pending for pending in server.timers if pending.is_alive()] + [timer]
+        timer.start()
+    else:
+        finish()
+    return {}
+
+
+def fileop_url(store, obj, data, server):
+    token = base64.b64encode(json.dumps({'id': uuid.uuid4().hex}))
+    return {'token': token,
+            'url': 'https://%s/http_direct_file_io/req_id-%s/%s' % (server.grid_vip, uuid.uuid4().hex,
+                                                                    data.get('filename', 'file'))}
+
+
+# (object type, function) -> handler(store, object or None, data, server)
+FUNCTIONS = {
+    ('grid', 'restartservices'): restart_services,
+    ('grid', 'requestrestartservicestatus'): restart_function,
+    ('grid', 'publish_changes'): restart_function,
+    ('fileop', 'uploadinit'): fileop_url,
+    ('fileop', 'csv_export'): fileop_url,
+    ('fileop', 'downloadcomplete'): restart_function,
+    ('fileop', 'setfiledest'): restart_function,
+    ('fileop', 'csv_import'): restart_function,
+}
+
+
+def seed(store, grid_fqdn=None):
+    '''
+    The objects a fresh grid has: grid, default network view, the master.
+    '''
+    host_name = grid_fqdn or getattr(config, 'grid_fqdn', 'infoblox.localdomain')
+    store.insert('grid', 'grid/' + base64.urlsafe_b64encode('fake.cluster$0').rstrip('='), {'name': 'Infoblox'})
+    store.create('networkview', {'name': 'default', 'is_default': True})
+    store.create('member', {'host_name': host_name, 'service_status': [
+        {'service': 'DNS', 'status': 'WORKING'}, {'service': 'DHCP', 'status': 'INACTIVE'}]})
+    store.insert('member:filedistribution', 'member:filedistribution/' +
+                 base64.urlsafe_b64encode('fake.member_tftp_properties$0').rstrip('='),
+                 {'host_name': host_name, 'ipv4_address': getattr(config, 'grid_vip', '127.0.0.1'),
+                  'status': 'ACTIVE', 'enable_tftp': False, 'enable_ftp': False, 'enable_http': False})
+    store.insert('grid:servicerestart:status', 'grid:servicerestart:status/' +
+                 base64.urlsafe_b64encode('fake.servicerestart$0').rstrip('='),
+                 dict((field, 0) for field in OBJECT_TYPES['grid:servicerestart:status'].fields if field != 'grid'))
+
+
+class Wapi:
+    '''
+    WAPI semantics on top of a Store, independent of HTTP.
+    '''
+    def __init__(self, store, server=None):
+        self.store = store
+        self.server = server
+        self.functions = dict(FUNCTIONS)
+        self.pages = {}
+        self.pages_lock = threading.Lock()
+
+    def output(self, obj, otype, args):
+        spec = object_type(otype)
+        if '_return_fields' in args:
+            fields = [field for field in args['_return_fields'].split(',') if field]
+        else:
+            fields = spec.fields + [field for field in args.get('_return_fields+', '').split(',') if field]
+        result = {'_ref': obj['_ref']}
+        for field in fields:
+            if field in obj:
+                result[field] = obj[field]
+        return result
+
+    def handle(self, method, target, args, data):
+        '''
+        (status, result) of one call; target is a type or a _ref, args
+        the query arguments as a list of pairs, data the decoded body.
+        '''
+        options = dict((name, value) for name, value in args if name.startswith('_'))
+        if target == 'request' and method == 'POST':
+            return 200, self.request(data)
+        otype = target.split('/', 1)[0]
+        object_type(otype)
+        if otype == 'search' and method == 'GET':
+            return 200, self.search(dict(args).get('search_string', ''))
+        if '_function' in options:
+            return 200, self.function(method, target, otype, options['_function'], data)
+        if method == 'GET':
+            if '/' in target:
+                key, (otype, obj) = self.store.get(target)
+                return 200, self.output(obj, otype, options)
+            return 200, self.read(otype, args, options, data)
+        if method == 'POST':
+            if '/' in target or not object_type(otype).creatable:
+                raise WapiError('AdmConProtoError: Operation create not allowed for %s' % otype)
+            ref = self.store.create(otype, data or {})
+        elif method == 'PUT':
+            ref = self.store.update(target, data or {})
+        elif method == 'DELETE':
+            ref = self.store.delete(target)
+        else:
+            raise WapiError('AdmConProtoError: Unsupported method %s' % method)
+        if '_return_fields' in options or '_return_fields+' in options:
+            key, (otype, obj) = self.store.get(ref)
+            return 201 if method == 'POST' else 200, self.output(obj, otype, options)
+        return 201 if method == 'POST' else 200, ref
+
+    def function(self, method, target, otype, name, data):
+        handler = self.functions.get((otype, name))
+        if handler is None or method != 'POST':
+            raise WapiError('AdmConProtoError: Function %s is not valid for this object' % name)
+        obj = self.store.get(target)[1][1] if '/' in target else None
+        return handler(self.store, obj, data or {}, self.server)
+
+    def read(self, otype, args, options, data):
+        if '_page_id' in options:
+            with self.pages_lock:
+                page = self.pages.pop(options['_page_id'], None)
+            if page is None:
+                raise WapiError('AdmConProtoError: Page id %s is not valid' % options['_page_id'])
+            keys, options = page
+        else:
+            criteria = []
+            for name, value in list(args) + sorted((data or {}).items()):
+                if name.startswith('_'):
+                    continue
+                modifier = name[-1] if name[-1] in '~:!<>' else ''
+                criteria.append((name[:-1] if modifier else name, modifier, text(value)))
+            keys = [key for key, obj in self.store.search(otype, criteria)]
+        objects = self.store.types.get(otype, {})
+        limit = int(options.get('_max_results', 0)) or None
+        if options.get('_paging') == '1':
+            if options.get('_return_as_object') != '1' or not limit:
+                raise WapiError('AdmConProtoError: _return_as_object=1 and _max_results are needed for paging')
+            page, rest = keys[:abs(limit)], keys[abs(limit):]
+            result = {'result': [self.output(objects[key], otype, options) for key in page if key in objects]}
+            if rest:
+                page_id = uuid.uuid4().hex
+                with self.pages_lock:
+                    self.pages[page_id] = (rest, options)
+                result['next_page_id'] = page_id
+            return result
+        if limit is None or limit < 0:
+            if len(keys) > abs(limit or MAX_RESULTS):
+                raise WapiError('AdmConProtoError: Result set too large (> %d)' % abs(limit or MAX_RESULTS))
+        else:
+            keys = keys[:limit]
+        result = [self.output(objects[key], otype, options) for key in keys]
+        if options.get('_return_as_object') == '1':
+            return {'result': result}
+        return result
+
+    def search(self, string):
+        '''
+        Global search: refs of the objects with string in a text field.
+        '''
+        string = string.lower()
+        with self.store.lock:
+            objects = list(self.store.objects.values())
+        return [{'_ref': obj['_ref']} for otype, obj in objects
+                if any(isinstance(value, basestring) and string in value.lower()
+                       for field, value in obj.items() if field != '_ref')][:MAX_RESULTS]
+
+    def request(self, body):
+        '''
+        Multiple operations in one transaction, see ib_NIOS.Batch.
+        '''
+        if not isinstance(body, list):
+            body = [body]
+        def run():
+            state = {}
+            results = []
+            for item in body:
+                if item.get('enable_substitution'):
+                    item = json.loads(STATE_PATTERN.sub(lambda m: state.get(m.group(1), m.group(0)),
+                                                        json.dumps(item)))
+                target, query = (item['object'].split('?', 1) + [''])[:2]
+                args = urlparse.parse_qsl(query, keep_blank_values=True) + \
+                       [(name, text(value)) for name, value in item.get('args', {}).items()]
+                status, result = self.handle(item['method'], target, args, item.get('data'))
+                for name, field in item.get('assign_state', {}).items():
+                    value = result[0] if isinstance(result, list) and result else result
+                    if isinstance(value, dict) and field in value:
+                        state[name] = value[field]
+                    elif isinstance(value, basestring) and field == '_ref':
+                        state[name] = value
+                if not item.get('discard'):
+                    results.append(result)
+            return results
+        return self.store.transaction(run)
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # One write per response, flushed by handle_one_request.
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, payload, cookie=None):
+        body = json.dumps(payload)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if cookie:
+            self.send_header('Set-Cookie', 'ibapauth="%s"; httponly; Path=/; secure' % cookie)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def authenticate(self):
+        '''
+        Cookie of the session, a new one after a Basic auth login, None
+        when neither is valid.
+        '''
+        match = COOKIE_PATTERN.search(self.headers.getheader('Cookie', ''))
+        if match and self.server.session(match.group(1)):
+            return match.group(1)
+        auth = self.headers.getheader('Authorization', '')
+        if auth.startswith('Basic '):
+            user, _, password = base64.b64decode(auth[6:]).partition(':')
+            if self.server.users is None or self.server.users.get(user) == password:
+                return self.server.login()
+        return None
+
+    def handle_one(self):
+        length = int(self.headers.getheader('Content-Length') or 0)
+        body = self.rfile.read(length) if length else ''
+        cookie = self.authenticate()
+        if cookie is None:
+            return self.reply(401, {'Error': 'AdmConProtoError: Authorization Required', 'code': 'Client.Ibap.Proto',
+                                    'text': 'Authorization Required'})
+        match = PATH_PATTERN.match(self.path)
+        if match is None:
+            return self.reply(404, {'Error': 'AdmConProtoError: Unknown path %s' % self.path})
+        target = urlparse.unquote(match.group(1))
+        if target == 'logout':
+            self.server.logout(cookie)
+            return self.reply(200, {})
+        try:
+            data = json.loads(body) if body.strip() else None
+            args = urlparse.parse_qsl(match.group(2) or '', keep_blank_values=True)
+            status, result = self.server.wapi.handle(self.command, target, args, data)
+        except WapiError as error:
+            status, result = error.status, {'Error': str(error), 'code': error.code, 'text': str(error)}
+        except (ValueError, KeyError, TypeError, re.error) as error:
+            status, result = 400, {'Error': 'AdmConProtoError: %s' % error, 'code': 'Client.Ibap.Proto',
+                                   'text': str(error)}
+        self.reply(status, result, cookie)
+
+    do_GET = do_POST = do_PUT = do_DELETE = handle_one
+
+
+class FakeWapi(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    '''
+    Threaded HTTPS server, connections are kept alive and the TLS
+    handshake is done in the connection thread.
+    '''
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 0), certfile=CERTFILE, keyfile=KEYFILE, users=None, store=None):
+        BaseHTTPServer.HTTPServer.__init__(self, address, Handler)
+        self.context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+        if certfile is None:
+            load_certificate(self.context)
+        else:
+            self.context.load_cert_chain(certfile, keyfile)
+        self.users = users
+        # cookie -> last use, least recently used first
+        self.cookies = OrderedDict()
+        self.cookies_lock = threading.Lock()
+        if store is None:
+            store = Store()
+            seed(store)
+        self.store = store
+        self.wapi = Wapi(store, self)
+        self.restart_time = RESTART_TIME
+        self.timers = []
+        # connection thread -> its socket
+        self.connections = {}
+        self.connections_lock = threading.Lock()
+        self.thread = None
+        _servers.append(self)
+
+    @property
+    def grid_vip(self):
+        return '%s:%d' % self.server_address[:2]
+
+    def get_request(self):
+        sock, address = self.socket.accept()
+        return self.context.wrap_socket(sock, server_side=True, do_handshake_on_connect=False), address
+
+    def finish_request(self, request, client_address):
+        try:
+            request.do_handshake()
+        except (ssl.SSLError, IOError) as error:
+            logging.info('fake WAPI handshake with %s failed: %s' % (client_address, error))
+            return
+        BaseHTTPServer.HTTPServer.finish_request(self, request, client_address)
+
+    def login(self):
+        cookie = os.urandom(16).encode('hex')
+        now = time.time()
+        with self.cookies_lock:
+            self.cookies[cookie] = now
+            for old, last_used in list(self.cookies.items()):
+                if len(self.cookies) <= MAX_SESSIONS and now - last_used <= SESSION_TIMEOUT:
+                    break
+                del self.cookies[old]
+        return cookie
+
+    def session(self, cookie):
+        '''
+        True for a live session cookie, its idle time starts over.
+        '''
+        now = time.time()
+        with self.cookies_lock:
+            last_used = self.cookies.pop(cookie, None)
+            if last_used is None or now - last_used > SESSION_TIMEOUT:
+                return False
+            self.cookies[cookie] = now
+            return True
+
+    def logout(self, cookie):
+        with self.cookies_lock:
+            self.cookies.pop(cookie, None)
+
+    def process_request(self, request, client_address):
+        thread = threading.Thread(target=self.process_request_thread, args=(request, client_address))
+        thread.daemon = True
+        with self.connections_lock:
+            self.connections[thread] = request
+        thread.start()
+
+    def process_request_thread(self, request, client_address):
+        try:
+            SocketServer.ThreadingMixIn.process_request_thread(self, request, client_address)
+        finally:
+            with self.connections_lock:
+                self.connections.pop(threading.current_thread(), None)
+
+    def handle_error(self, request, client_address):
+        # Clients dropping kept-alive connections are not errors.
+        error = sys.exc_info()[1]
+        if isinstance(error, (socket.error, ssl.SSLError)):
+            return
+        BaseHTTPServer.HTTPServer.handle_error(self, request, client_address)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name='fake_wapi')
+        self.thread.daemon = True
+        self.thread.start()
+        logging.info('fake WAPI listening on %s' % self.grid_vip)
+        return self
+
+    def stop(self):
+        '''
+        Stop serving and end the open connections, called at exit for
+        the servers still running.
+        '''
+        if self in _servers:
+            _servers.remove(self)
+        if self.thread is not None and self.thread.is_alive():
+            self.shutdown()
+        self.server_close()
+        for timer in self.timers:
+            timer.cancel()
+        with self.connections_lock:
+            connections = self.connections.items()
+        for thread, request in connections:
+            try:
+                # On the TCP socket, the connection thread then reads EOF.
+                socket.socket.shutdown(request, socket.SHUT_RDWR)
+            except socket.error:
+                pass
+        for thread, request in connections:
+            thread.join(1)
+
+
+_servers = []
+
+
+def stop_all():
+    for server in list(_servers):
+        server.stop()
+
+
+# Connection threads are daemons, end them before the interpreter tears
+# down the modules they use.
+atexit.register(stop_all)
+
+
+_certificate = []
+
+
+def load_certificate(context):
+    '''
+    Load a self-signed certificate, made once per process, into context.
+    The key is written to a temporary file for load_cert_chain only.
+    '''
+    if not _certificate:
+        from cryptography import x509
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import ec
+        from cryptography.x509.oid import NameOID
+        key = ec.generate_private_key(ec.SECP256R1(), default_backend())
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, u'fake-wapi')])
+        now = datetime.datetime.utcnow()
+        cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+                .serial_number(x509.random_serial_number()).not_valid_before(now - datetime.timedelta(days=1))
+                .not_valid_after(now + datetime.timedelta(days=365)).sign(key, hashes.SHA256(), default_backend()))
+        _certificate.append(key.private_bytes(serialization.Encoding.PEM,
+                                              serialization.PrivateFormat.TraditionalOpenSSL,
+                                              serialization.NoEncryption()) +
+                            cert.public_bytes(serialization.Encoding.PEM))
+    handle, path = tempfile.mkstemp(prefix='fake_wapi', suffix='.pem')
+    try:
+        with os.fdopen(handle, 'w') as pem:
+            pem.write(_certificate[0])
+        context.load_cert_chain(path)
+    finally:
+        os.remove(path)
+
+
+def start(port=0, host='127.0.0.1', certfile=CERTFILE, keyfile=KEYFILE, users=None):
+    '''
+    Start a fake WAPI in a background thread. users maps user to password,
+    None accepts any Basic auth login.
+    '''
+    return FakeWapi((host, port), certfile, keyfile, users).start()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    server = FakeWapi(('0.0.0.0', int(sys.argv[1]) if len(sys.argv) > 1 else 8443))
+    logging.info('fake WAPI listening on %s' % server.grid_vip)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
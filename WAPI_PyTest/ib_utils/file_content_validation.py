@@ -25,6 +25,8 @@
 ########################################################################
 
 from paramiko import client
+import ib_utils.ssh_pool as ssh_pool
+import ib_utils.log_offset as log_offset
 import paramiko
 import os
 import sys
@@ -32,6 +34,7 @@ import config
 import socket
 import subprocess
 import logging
+import re
 
 host_name = socket.gethostname()
 host_ip = socket.gethostbyname(host_name)
@@ -59,12 +62,7 @@ class SSH:
 
     def __init__(self,address):
         logging.info ("Log Validation Script")
-        logging.info ("connecting to server \n : ", address)
-        self.client=client.SSHClient()
-        self.client.set_missing_host_key_policy(client.AutoAddPolicy())
-        privatekeyfile = os.path.expanduser('~/.ssh/id_rsa')
-        mykey = paramiko.RSAKey.from_private_key_file(privatekeyfile)
-        self.client.connect(address, username='root', pkey = mykey)
+        self.client=ssh_pool.get_client(address)
         
             
     def send_command(self,command):
@@ -80,6 +78,21 @@ class SSH:
 def log_validation (string,file_path,IP_address,Host_address=host_ip):
     file_name='_'.join(file_path.split('/'))
     print ("file_name :",file_name)
+    capture=log_offset.get_capture(IP_address,file_path)
+    if (capture is not None):
+        # Only the bytes written since the last read are fetched.
+        log_offset.read_capture(IP_address,file_path)
+        try:
+            regex=re.compile(string,re.I)
+        except re.error:
+            regex=re.compile(re.escape(string),re.I)
+        matches=capture.search(regex)
+        if not matches:
+            logging.info ("Requested Logs not found")
+            return None
+        result=''.join(line.text+'\n' for line in matches)
+        logging.info (result)
+        return result
     if (Host_address == host_ip ):
         #command1='egrep -i \"'+string +'" /tmp/'+ str(IP_address)+file_name+'.log'
         try:
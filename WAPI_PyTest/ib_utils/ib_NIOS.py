@@ -2,9 +2,21 @@ import ConfigParser
 import logging
 import httplib
 import json
+import re
 import ssl
+import threading
+import time
+import urllib
+import urlparse
 import config
+import ib_utils.ref_cache as ref_cache
+import ib_utils.wait as wait
+import ib_utils.wapi_cassette as wapi_cassette
+import ib_utils.wapi_metrics as wapi_metrics
+import ib_utils.wapi_pool as wapi_pool
+import ib_utils.wapi_session as wapi_session
 from json import loads
+from multiprocessing.pool import ThreadPool
 
 #CONF="reporting_conf.ini"
 #parser = ConfigParser.SafeConfigParser()
@@ -22,6 +34,22 @@ URLENCODED = 'application/json'
 DEFAULT_CONTENT_TYPE = URLENCODED
 VERSION = config.wapi_version
 PATH = '/wapi/v' + VERSION + '/'
+CONCURRENCY = getattr(config, 'wapi_concurrency', 8)
+# {grid_vip: concurrency} overriding CONCURRENCY for some grids.
+GRID_CONCURRENCY = getattr(config, 'wapi_grid_concurrency', {})
+BATCH_SIZE = getattr(config, 'wapi_batch_size', 100)
+PAGE_SIZE = getattr(config, 'wapi_page_size', 1000)
+STATE_PATTERN = re.compile(r'##STATE:([^:#]+):##')
+RESTART_TIMEOUT = getattr(config, 'wapi_restart_timeout', 600)
+# grid:servicerestart:status counters which are non zero while a restart is in progress.
+RESTART_BUSY_FIELDS = ['needed_restart', 'pending', 'pending_restart', 'processing', 'restarting']
+# Every counter of grid:servicerestart:status, a change in any of them shows the restart was picked up.
+RESTART_COUNTER_FIELDS = RESTART_BUSY_FIELDS + ['failures', 'finished', 'success', 'timeouts']
+# member service_status names checked for each restartservices service.
+RESTART_SERVICES = {'ALL': ['DNS', 'DHCP'], 'DHCPV4': ['DHCP'], 'DHCPV6': ['DHCP']}
+# member service_status values counted as running. WARNING services (e.g.
+# NTP not synchronized) are up and may stay in that state.
+RUNNING_STATUSES = getattr(config, 'wapi_running_statuses', ('WORKING', 'WARNING', 'INACTIVE'))
 
 #logging.basicConfig(filename='output.log',level=logging.DEBUG,filemode='w')
 
@@ -33,28 +61,417 @@ def wapi_request(operation, ref='', params='', fields='', \
     '''
     Send an HTTPS request to the NIOS server.
     '''
-    # Create connection and request header.
-    # This class does not perform any verification of the server`s certificate.
-    conn = httplib.HTTPSConnection(grid_vip,context=ssl._create_unverified_context())
-    auth_header = 'Basic %s' % (':'.join([user, password])
-                                .encode('Base64').strip('\r\n'))
-    request_header = {'Authorization':auth_header,
-                      'Content-Type': content_type}
+    # Cached (grid, user) session, it sends the ibapauth cookie over a
+    # pooled keep-alive connection and logs in with Basic auth if needed.
+    session = wapi_session.get_session(grid_vip, user, password)
     if ref:
         url = PATH + ref
     else:
         url = PATH + object_type
     if params:
         url += params
-    conn.request(operation, url, fields, request_header)
-    response = conn.getresponse();
+    start = time.time()
+    # Sent as is, or recorded to / replayed from a cassette (WAPI_CASSETTE_MODE).
+    response = wapi_cassette.request(session, operation, url, fields, content_type)
+    if wapi_metrics.hooks:
+        wapi_metrics.record(operation, url, fields, response, time.time() - start, grid_vip)
     if response.status >= 200 and response.status < 300:
+        if operation in ('PUT', 'DELETE'):
+            ref_cache.invalidate(grid_vip, (ref or object_type).split('?')[0])
         return handle_success(response)
     elif response.status == 400 or response.status == 404:
         return response.status,handle_success(response)
     else:
         return handle_exception(response)
     
+def resolve(object_type, user=USERNAME, password=PASSWORD, grid_vip=GRIDVIP, **keys):
+    '''
+    Return the _ref of the first object_type object matching keys, e.g.
+    resolve("grid") or resolve("zone_auth", fqdn="test.com", view="default").
+    Refs are memoized per grid until a PUT/DELETE on them or
+    ref_cache.clear().
+    '''
+    key = ref_cache.make_key(object_type, keys)
+    ref = ref_cache.get(grid_vip, key)
+    if ref is not None:
+        return ref
+    fields = json.dumps(keys) if keys else ''
+    response = wapi_request('GET', object_type=object_type, fields=fields, \
+                            user=user, password=password, grid_vip=grid_vip)
+    if isinstance(response, tuple):
+        raise Exception('WAPI Error message: %s' % response[1])
+    objects = json.loads(response)
+    if not objects:
+        raise Exception('No %s object found matching %s' % (object_type, keys))
+    ref = objects[0]['_ref']
+    ref_cache.put(grid_vip, key, ref)
+    return ref
+
+def restart_status(user=USERNAME, password=PASSWORD, grid_vip=GRIDVIP):
+    '''
+    Snapshot of the restart progress of the grid: the
+    grid:servicerestart:status counters and the latest last_updated_time
+    of the grid:servicerestart:request objects. Read it before
+    restartservices and pass it to wait_for_restart.
+    '''
+    response = wapi_request('GET', object_type="grid:servicerestart:status", \
+                            params="?_return_fields=" + ','.join(RESTART_COUNTER_FIELDS), \
+                            user=user, password=password, grid_vip=grid_vip)
+    if isinstance(response, tuple):
+        raise Exception('WAPI Error message: %s' % response[1])
+    counters = dict((status['_ref'], dict((field, status.get(field) or 0) for field in RESTART_COUNTER_FIELDS)) \
+                    for status in json.loads(response))
+    response = wapi_request('GET', object_type="grid:servicerestart:request", \
+                            params="?_return_fields=last_updated_time", \
+                            user=user, password=password, grid_vip=grid_vip)
+    last_updated = None
+    if not isinstance(response, tuple):
+        last_updated = max([request.get('last_updated_time') or 0 for request in json.loads(response)] or [None])
+    return {'counters': counters, 'last_updated': last_updated}
+
+def restart_in_progress(user=USERNAME, password=PASSWORD, grid_vip=GRIDVIP, status=None):
+    '''
+    Number of service restarts still needed, pending or running on the
+    grid, from status (restart_status()) or read now.
+    '''
+    if status is None:
+        status = restart_status(user, password, grid_vip)
+    return sum(counters[field] for counters in status['counters'].values() for field in RESTART_BUSY_FIELDS)
+
+def services_not_running(services=None, user=USERNAME, password=PASSWORD, grid_vip=GRIDVIP, \
+                        running=RUNNING_STATUSES):
+    '''
+    Return (host_name, service, status) of every member service whose
+    status is not in running (WORKING, WARNING or INACTIVE by default).
+    services defaults to ('ALL',).
+    '''
+    names = set()
+    for service in services or ('ALL',):
+        names.update(RESTART_SERVICES.get(service.upper(), [service.upper()]))
+    response = wapi_request('GET', object_type="member", params="?_return_fields=host_name,service_status", \
+                            user=user, password=password, grid_vip=grid_vip)
+    if isinstance(response, tuple):
+        raise Exception('WAPI Error message: %s' % response[1])
+    not_running = []
+    for member in json.loads(response):
+        for status in member.get('service_status', []):
+            if status['service'] in names and status['status'] not in running:
+                not_running.append((member['host_name'], status['service'], status['status']))
+    return not_running
+
+def wait_for_restart(grid_vip=GRIDVIP, before=None, services=None, timeout=RESTART_TIMEOUT, \
+                    initial_interval=1, max_interval=10, user=USERNAME, password=PASSWORD, \
+                    running=RUNNING_STATUSES):
+    '''
+    Wait after restartservices until the grid picked up the restart (its
+    restart_status() differs from before, read before restartservices),
+    no restart is pending and the services run on every member, polling
+    with a doubling interval.
+    Return the convergence time in seconds, raise wait.WaitTimeout on timeout.
+
+        before = ib_NIOS.restart_status(grid_vip=grid)
+        ib_NIOS.wapi_request('POST', object_type=ref + "?_function=restartservices", ...)
+        ib_NIOS.wait_for_restart(grid, before)
+    '''
+    if before is None:
+        raise ValueError('wait_for_restart needs the restart_status() read before restartservices')
+    start = time.time()
+    status = {'started': False}
+    def restarted():
+        current = restart_status(user, password, grid_vip)
+        if current != before and not status['started']:
+            logging.info('Restart started on %s after %.1f s' % (grid_vip, time.time() - start))
+            status['started'] = True
+        if not status['started']:
+            return False
+        status['pending'] = restart_in_progress(status=current)
+        not_running = services_not_running(services, user, password, grid_vip, running)
+        if not_running and not_running != status.get('not running'):
+            logging.info('Waiting for %s' % ', '.join('%s on %s (%s)' % (service, host, state) \
+                                                      for host, service, state in not_running))
+        status['not running'] = not_running
+        return status['pending'] == 0 and not status['not running']
+    try:
+        wait.wait_until(restarted, timeout=timeout, \
+                        initial_interval=initial_interval, max_interval=max_interval, \
+                        description='restart of %s on %s' % (services or ('ALL',), grid_vip), ignore=(Exception,))
+    except wait.WaitTimeout:
+        logging.info('Restart status of %s at timeout: %s' % (grid_vip, status))
+        raise
+    return time.time() - start
+
+_grid_semaphores = {}
+_grid_semaphores_lock = threading.Lock()
+
+def grid_concurrency(grid_vip):
+    '''
+    Default number of in-flight WAPI calls on grid_vip.
+    '''
+    return GRID_CONCURRENCY.get(grid_vip, CONCURRENCY)
+
+def grid_semaphore(grid_vip, concurrency):
+    '''
+    Semaphore bounding the number of in-flight WAPI calls on one grid.
+    AsyncWapiClients of a grid asking for the same concurrency share it,
+    a client with another limit gets its own.
+    '''
+    key = (grid_vip, concurrency)
+    with _grid_semaphores_lock:
+        if key not in _grid_semaphores:
+            _grid_semaphores[key] = threading.BoundedSemaphore(concurrency)
+        return _grid_semaphores[key]
+
+class AsyncWapiClient:
+    '''
+    Sends independent wapi_request calls concurrently.
+    submit() takes the same operation/ref/object_type/params/fields arguments
+    as wapi_request and returns an AsyncResult, get() on it returns what
+    wapi_request would have returned or raises its exception.
+    concurrency defaults to grid_concurrency(grid_vip).
+    '''
+    def __init__(self, grid_vip=GRIDVIP, user=USERNAME, password=PASSWORD, concurrency=None):
+        self.grid_vip = grid_vip
+        self.user = user
+        self.password = password
+        self.concurrency = concurrency or grid_concurrency(grid_vip)
+        self.semaphore = grid_semaphore(grid_vip, self.concurrency)
+        self.workers = ThreadPool(self.concurrency)
+        # Keep one idle keep-alive connection per worker while the client is open.
+        self.pool = wapi_pool.get_pool(grid_vip, user)
+        self.pool.reserve(self.concurrency)
+
+    def call(self, kwargs):
+        with self.semaphore:
+            return wapi_request(user=self.user, password=self.password,
+                                grid_vip=self.grid_vip, **kwargs)
+
+    def submit(self, operation, ref='', params='', fields='', \
+                    object_type=DEFAULT_OBJECT_TYPE, content_type=DEFAULT_CONTENT_TYPE):
+        kwargs = {'operation': operation, 'ref': ref, 'params': params, 'fields': fields,
+                  'object_type': object_type, 'content_type': content_type}
+        return self.workers.apply_async(self.call, (kwargs,))
+
+    def gather(self, requests, return_exceptions=False):
+        '''
+        Run every request (dict of submit() arguments) and return the
+        results in the same order. With return_exceptions=True a failed
+        request puts its exception in the list instead of raising it.
+        '''
+        pending = [self.submit(**request) for request in requests]
+        results = []
+        for result in pending:
+            try:
+                results.append(result.get())
+            except Exception as error:
+                if not return_exceptions:
+                    raise
+                results.append(error)
+        return results
+
+    def close(self):
+        self.workers.close()
+        self.workers.join()
+        if self.pool is not None:
+            self.pool.release(self.concurrency)
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def gather_requests(requests, concurrency=None, return_exceptions=False, \
+                    user=USERNAME, password=PASSWORD, grid_vip=GRIDVIP):
+    '''
+    Send a list of independent WAPI requests concurrently, e.g.
+    gather_requests([{'operation': 'POST', 'object_type': 'record:caa', 'fields': json.dumps(data)}, ...])
+    '''
+    with AsyncWapiClient(grid_vip, user, password, concurrency) as client:
+        return client.gather(requests, return_exceptions)
+
+def iter_objects(object_type, return_fields=None, page_size=PAGE_SIZE, params='', \
+                    user=USERNAME, password=PASSWORD, grid_vip=GRIDVIP):
+    '''
+    Generator over every object of object_type, read page by page with
+    WAPI _paging/_page_id so only one page is held in memory.
+    object_type and params take search arguments as in wapi_request
+    ("allrecords?zone=test.com" or params="?zone=test.com"), return_fields
+    is a list or a comma separated string ("+ttl" for _return_fields+).
+    '''
+    if '?' in object_type:
+        object_type, query = object_type.split('?', 1)
+        params = '?' + query + ('&' + params.lstrip('?') if params else '')
+    args = urlparse.parse_qsl(params.lstrip('?'), keep_blank_values=True)
+    args += [('_paging', 1), ('_return_as_object', 1), ('_max_results', page_size)]
+    if return_fields:
+        if not isinstance(return_fields, basestring):
+            return_fields = ','.join(return_fields)
+        if return_fields.startswith('+'):
+            args.append(('_return_fields+', return_fields[1:]))
+        else:
+            args.append(('_return_fields', return_fields))
+    query = '?' + urllib.urlencode(args)
+    while True:
+        response = wapi_request('GET', object_type=object_type, params=query, \
+                                user=user, password=password, grid_vip=grid_vip)
+        if isinstance(response, tuple):
+            raise Exception('WAPI Error message: %s' % response[1])
+        page = json.loads(response)
+        for obj in page['result']:
+            yield obj
+        page_id = page.get('next_page_id')
+        if not page_id:
+            break
+        query = '?' + urllib.urlencode([('_page_id', page_id)])
+
+class BatchItem:
+    '''
+    One operation queued in a Batch.
+    After the flush, status is 'ok' with the WAPI result in result, or
+    'error' with the WAPI error message in error.
+    '''
+    def __init__(self, request, assign_state):
+        self.request = request
+        self.assign_state = assign_state
+        self.status = 'pending'
+        self.result = None
+        self.error = None
+
+class Batch:
+    '''
+    Collects wapi_request style operations and sends them as WAPI
+    'request' objects, chunk_size operations per POST.
+
+    assign_state maps a state name to a field of the item result ('_ref'
+    for the ref returned by a POST); later items refer to it with
+    '##STATE:<name>:##' in ref, object_type or fields. Names are resolved
+    by the server inside a chunk and by the client across chunks.
+
+    The WAPI 'request' object is transactional, when one operation fails
+    every item of its chunk gets the error.
+    '''
+    def __init__(self, chunk_size=BATCH_SIZE, user=USERNAME, password=PASSWORD, grid_vip=GRIDVIP):
+        self.chunk_size = chunk_size
+        self.user = user
+        self.password = password
+        self.grid_vip = grid_vip
+        self.items = []
+        self.pending = []
+        self.state = {}
+
+    def add(self, operation, ref='', params='', fields='', \
+                    object_type=DEFAULT_OBJECT_TYPE, assign_state=None):
+        target = ref or object_type
+        if '?' in target:
+            target, query = target.split('?', 1)
+            params = '?' + query + ('&' + params.lstrip('?') if params else '')
+        request = {'method': operation, 'object': target}
+        if fields:
+            request['data'] = json.loads(fields)
+        args = dict(urlparse.parse_qsl(params.lstrip('?'), keep_blank_values=True))
+        if args:
+            request['args'] = args
+        if assign_state:
+            request['assign_state'] = assign_state
+        item = BatchItem(request, assign_state)
+        self.items.append(item)
+        self.pending.append(item)
+        if len(self.pending) >= self.chunk_size:
+            self.flush()
+        return item
+
+    def substitute(self, value):
+        '''
+        Replace the state names already known on the client side.
+        '''
+        if isinstance(value, basestring):
+            return STATE_PATTERN.sub(lambda m: self.state.get(m.group(1), m.group(0)), value)
+        if isinstance(value, dict):
+            return dict((k, self.substitute(v)) for k, v in value.items())
+        if isinstance(value, list):
+            return [self.substitute(v) for v in value]
+        return value
+
+    def save_state(self, item):
+        result = item.result
+        if isinstance(result, list) and result:
+            result = result[0]
+        for name, field in item.assign_state.items():
+            if isinstance(result, dict) and field in result:
+                self.state[name] = result[field]
+            elif isinstance(result, basestring) and field == '_ref':
+                self.state[name] = result
+
+    def flush(self):
+        '''
+        Send the queued operations, return the items of this flush.
+        '''
+        chunk, self.pending = self.pending, []
+        if not chunk:
+            return chunk
+        body = []
+        for item in chunk:
+            request = self.substitute(item.request)
+            if STATE_PATTERN.search(json.dumps(request)):
+                request['enable_substitution'] = True
+            body.append(request)
+        logging.info('Sending %d operations in one WAPI request' % len(chunk))
+        try:
+            response = wapi_request('POST', object_type='request', fields=json.dumps(body), \
+                                    user=self.user, password=self.password, grid_vip=self.grid_vip)
+        except Exception as error:
+            response = (None, str(error))
+        if not isinstance(response, tuple) or response[0] is None:
+            # Applied, or unknown whether it was: drop the refs it may have changed.
+            self.invalidate(body)
+        if isinstance(response, tuple):
+            status, error = response
+            logging.info('WAPI request of %d operations failed: %s' % (len(chunk), error))
+            for item in chunk:
+                item.status = 'error'
+                item.error = error
+            return chunk
+        for item, result in zip(chunk, json.loads(response)):
+            item.status = 'ok'
+            item.result = result
+            if item.assign_state:
+                self.save_state(item)
+        return chunk
+
+    def invalidate(self, requests):
+        '''
+        Drop the cached refs of the PUT and DELETE operations, like
+        wapi_request does for single calls.
+        '''
+        for request in requests:
+            if request['method'] not in ('PUT', 'DELETE'):
+                continue
+            if STATE_PATTERN.search(request['object']):
+                # Substituted by the server, the ref is not known here.
+                ref_cache.clear(self.grid_vip)
+            else:
+                ref_cache.invalidate(self.grid_vip, request['object'])
+
+    def errors(self):
+        return [item for item in self.items if item.status == 'error']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is None:
+            self.flush()
+
+def batch(chunk_size=BATCH_SIZE, user=USERNAME, password=PASSWORD, grid_vip=GRIDVIP):
+    '''
+    with ib_NIOS.batch() as b:
+        zone = b.add('POST', object_type="zone_auth", fields=json.dumps(data), assign_state={'zone_ref': '_ref'})
+        b.add('POST', object_type="record:caa", fields=json.dumps(record))
+    assert not b.errors()
+    '''
+    return Batch(chunk_size, user, password, grid_vip)
+
 def handle_exception(response):
     '''
     If there was encountered an error while performing requested action,
@@ -4,6 +4,7 @@ import httplib
 import json
 import ssl
 import config
+import ib_utils.wapi_session as wapi_session
 from json import loads
 
 #CONF="reporting_conf.ini"
@@ -34,21 +35,16 @@ def wapi_request(operation, ref='', params='', fields='', \
     '''
     Send an HTTPS request to the NIOS server.
     '''
-    # Create connection and request header.
-    # This class does not perform any verification of the server`s certificate.
-    conn = httplib.HTTPSConnection(grid_vip,context=ssl._create_unverified_context())
-    auth_header = 'Basic %s' % (':'.join([user, password])
-                                .encode('Base64').strip('\r\n'))
-    request_header = {'Authorization':auth_header,
-                      'Content-Type': content_type}
+    # Cached (grid, user) session, it sends the ibapauth cookie over a
+    # pooled keep-alive connection and logs in with Basic auth if needed.
+    session = wapi_session.get_session(grid_vip, user, password)
     if ref:
         url = PATH + ref
     else:
         url = PATH + object_type
     if params:
         url += params
-    conn.request(operation, url, fields, request_header)
-    response = conn.getresponse();
+    response = session.request(operation, url, fields, content_type)
     if response.status >= 200 and response.status < 300:
         return handle_success(response)
     elif response.status == 400 or response.status == 404:
@@ -62,21 +58,16 @@ def wapi_request_2(operation, ref='', params='', fields='', \
     '''
     Send an HTTPS request to the NIOS server.
     '''
-    # Create connection and request header.
-    # This class does not perform any verification of the server`s certificate.
-    conn = httplib.HTTPSConnection(grid2_vip,context=ssl._create_unverified_context())
-    auth_header = 'Basic %s' % (':'.join([user, password])
-                                .encode('Base64').strip('\r\n'))
-    request_header = {'Authorization':auth_header,
-                      'Content-Type': content_type}
+    # Cached (grid, user) session, it sends the ibapauth cookie over a
+    # pooled keep-alive connection and logs in with Basic auth if needed.
+    session = wapi_session.get_session(grid2_vip, user, password)
     if ref:
         url = PATH + ref
     else:
         url = PATH + object_type
     if params:
         url += params
-    conn.request(operation, url, fields, request_header)
-    response = conn.getresponse();
+    response = session.request(operation, url, fields, content_type)
     if response.status >= 200 and response.status < 300:
         return handle_success(response)
     elif response.status == 400 or response.status == 404:
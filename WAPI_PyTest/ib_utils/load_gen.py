@@ -0,0 +1,421 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: load_gen.py
+#
+# Description:
+#     WAPI load generation from the operations the suites already do:
+#     record:a/ptr/caa create, read, update and delete, global search,
+#     smartfolder queries and csv_export. Operations are drawn from a
+#     weighted mix and driven either by a fixed number of workers
+#     (closed loop) or at a target rate (open loop, latency counted from
+#     the scheduled time so a saturated grid shows up as queueing). The
+#     run ramps up linearly, then holds a steady state; latency
+#     percentiles, throughput and errors are reported per operation for
+#     the steady state. The objects live in a zone, a reverse zone and a
+#     smart folder made for the run and removed after it.
+#
+#
+# Input Options:
+#        python run.py -m <master> -v <wapi_version> --load [--rate=200] \
+#               [--concurrency=16] [--ramp=30] [--duration=120] \
+#               [--mix=record:a.create=4,search=1] [--report=load.json]
+#        python -m ib_utils.load_gen --grid=<vip> --concurrency=16 --duration=60
+#
+#        import ib_utils.load_gen as load_gen
+#        result = load_gen.run(load_gen.Workload(config.grid_vip), concurrency=16, duration=60)
+#        print result.report()
+#  Output:
+#    LoadResult, per operation count, ops/s, errors, p50/p95/p99/max
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import getopt
+import itertools
+import json
+import logging
+import random
+import socket
+import struct
+import sys
+import threading
+import time
+import config
+import ib_utils.ib_NIOS as ib_NIOS
+import ib_utils.wapi_metrics as wapi_metrics
+import ib_utils.wapi_pool as wapi_pool
+from multiprocessing.pool import ThreadPool
+
+CONCURRENCY = getattr(config, 'load_concurrency', 8)
+RAMP = getattr(config, 'load_ramp', 30)
+DURATION = getattr(config, 'load_duration', 60)
+NETWORK = getattr(config, 'load_network', '10.254.0.0/16')
+# Queued requests per worker before the open loop drops new ones.
+BACKLOG = 10
+
+DEFAULT_MIX = {
+    'record:a.create': 4, 'record:a.read': 8, 'record:a.update': 2, 'record:a.delete': 3,
+    'record:ptr.create': 2, 'record:ptr.read': 3, 'record:ptr.delete': 2,
+    'record:caa.create': 2, 'record:caa.read': 2, 'record:caa.update': 1, 'record:caa.delete': 2,
+    'search': 2, 'smartfolder.children': 2, 'smartfolder.read': 1, 'fileop.csv_export': 1,
+}
+
+# Smart folder of the smartfolder suites.
+SMART_FOLDER = {
+    'comment': 'load generation', 'group_bys': [{'enable_grouping': True, 'value': 'Site', 'value_type': 'EXTATTR'}],
+    'query_items': [{'field_type': 'NORMAL', 'name': 'network_view', 'op_match': True, 'operator': 'EQ',
+                     'value': {'value_string': 'default'}, 'value_type': 'ENUM'}],
+}
+
+
+def parse_mix(text):
+    '''
+    'record:a.create=4,search=1' -> {'record:a.create': 4, 'search': 1}
+    '''
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.strip().rpartition('=')
+        if name not in DEFAULT_MIX:
+            raise ValueError('Unknown load operation %s, known: %s' % (name, ', '.join(sorted(DEFAULT_MIX))))
+        mix[name] = float(weight)
+    return mix
+
+
+class Workload:
+    '''
+    The objects and operations of one load run against a grid.
+    '''
+    def __init__(self, grid_vip=None, user=None, password=None, network=NETWORK):
+        self.grid_vip = grid_vip or config.grid_vip
+        self.user = user or config.username
+        self.password = password or config.password
+        self.prefix = 'load-%d' % time.time()
+        self.zone = self.prefix + '.com'
+        self.network = network
+        base, _, length = network.partition('/')
+        self.base = struct.unpack('!I', socket.inet_aton(base))[0]
+        self.size = 1 << (32 - int(length or 32))
+        self.counter = itertools.count(1)
+        self.refs = {'record:a': [], 'record:ptr': [], 'record:caa': []}
+        self.lock = threading.Lock()
+        self.setup_refs = []
+        self.smart_folder = None
+
+    def call(self, operation, **kwargs):
+        '''
+        (status, body) of one wapi_request, status None for exceptions.
+        '''
+        try:
+            response = ib_NIOS.wapi_request(operation, user=self.user, password=self.password,
+                                            grid_vip=self.grid_vip, **kwargs)
+        except Exception as error:
+            return None, str(error)
+        if isinstance(response, tuple):
+            return response
+        return 200, response
+
+    def setup(self):
+        objects = [('zone_auth', {'fqdn': self.zone, 'comment': 'load generation'}),
+                   ('zone_auth', {'fqdn': self.network, 'zone_format': 'IPV4', 'comment': 'load generation'}),
+                   ('smartfolder:personal', dict(SMART_FOLDER, name=self.prefix))]
+        for object_type, data in objects:
+            status, body = self.call('POST', object_type=object_type, fields=json.dumps(data))
+            if status != 200:
+                raise Exception('Load setup, creating %s %s failed: %s' % (object_type, data, body))
+            self.setup_refs.append(json.loads(body))
+        self.smart_folder = self.setup_refs[-1]
+        logging.info('Load objects in zone %s, reverse zone %s' % (self.zone, self.network))
+
+    def teardown(self):
+        # Deleting the zones deletes their records.
+        for ref in reversed(self.setup_refs):
+            status, body = self.call('DELETE', ref=ref)
+            if status != 200:
+                logging.info('Load teardown, deleting %s failed: %s' % (ref, body))
+        self.setup_refs = []
+
+    def address(self, number):
+        return socket.inet_ntoa(struct.pack('!I', self.base + 1 + number % (self.size - 2)))
+
+    def record_data(self, record_type, number):
+        if record_type == 'record:a':
+            return {'name': 'a%d.%s' % (number, self.zone), 'ipv4addr': self.address(number)}
+        if record_type == 'record:ptr':
+            return {'ptrdname': 'ptr%d.%s' % (number, self.zone), 'ipv4addr': self.address(number)}
+        return {'name': 'caa%d.%s' % (number, self.zone), 'ca': 'CAA_Authority.com', 'ca_type': 'ISSUE'}
+
+    def lease(self, record_type):
+        '''
+        Take a random created ref out of the pool, so no other worker
+        deletes or updates it while this one uses it. None when empty.
+        '''
+        with self.lock:
+            refs = self.refs[record_type]
+            if not refs:
+                return None
+            index = random.randrange(len(refs))
+            refs[index], refs[-1] = refs[-1], refs[index]
+            return refs.pop()
+
+    def release(self, record_type, ref):
+        with self.lock:
+            self.refs[record_type].append(ref)
+
+    def create(self, record_type):
+        data = self.record_data(record_type, next(self.counter))
+        status, body = self.call('POST', object_type=record_type, fields=json.dumps(data))
+        if status == 200:
+            self.release(record_type, json.loads(body))
+        return status, body
+
+    def read(self, record_type):
+        ref = self.lease(record_type)
+        if ref is None:
+            return self.call('GET', object_type=record_type, params='?zone=%s&_max_results=10' %
+                             (self.zone if record_type != 'record:ptr' else self.network))
+        try:
+            return self.call('GET', ref=ref)
+        finally:
+            self.release(record_type, ref)
+
+    def update(self, record_type):
+        ref = self.lease(record_type)
+        if ref is None:
+            return None
+        status, body = self.call('PUT', ref=ref, fields=json.dumps({'comment': 'load %d' % next(self.counter)}))
+        # PUT answers with the ref of the object, which may have changed.
+        self.release(record_type, json.loads(body) if status == 200 else ref)
+        return status, body
+
+    def delete(self, record_type):
+        ref = self.lease(record_type)
+        if ref is None:
+            return None
+        return self.call('DELETE', ref=ref)
+
+    def execute(self, name):
+        '''
+        Run operation name of DEFAULT_MIX, (status, body) or None when it
+        had nothing to work on (no record to update or delete yet).
+        '''
+        if name.startswith('record:'):
+            record_type, action = name.split('.')
+            return getattr(self, action)(record_type)
+        if name == 'search':
+            return self.call('GET', object_type='search', params='?search_string=' + self.prefix)
+        if name == 'smartfolder.children':
+            return self.call('GET', object_type='smartfolder:children',
+                             fields=json.dumps({'smart_folder': self.smart_folder}))
+        if name == 'smartfolder.read':
+            return self.call('GET', object_type='smartfolder:personal', params='?name=' + self.prefix)
+        if name == 'fileop.csv_export':
+            status, body = self.call('POST', object_type='fileop', params='?_function=csv_export',
+                                     fields=json.dumps({'_object': 'record:a', 'zone': self.zone,
+                                                        '_separator': 'COMMA'}))
+            if status == 200:
+                self.call('POST', object_type='fileop', params='?_function=downloadcomplete',
+                          fields=json.dumps({'token': json.loads(body)['token']}))
+            return status, body
+        raise ValueError('Unknown load operation %s' % name)
+
+
+class OperationStats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.skipped = 0
+        self.last_error = None
+
+    def add(self, latency, result):
+        if result is None:
+            self.skipped += 1
+            return
+        self.latencies.append(latency)
+        if result[0] != 200:
+            self.errors += 1
+            self.last_error = result[1]
+
+    def summary(self, seconds):
+        latencies = sorted(self.latencies)
+        return {'count': len(latencies), 'ops_per_second': round(len(latencies) / seconds, 3) if seconds else 0.0,
+                'errors': self.errors, 'skipped': self.skipped, 'last_error': self.last_error,
+                'p50': round(wapi_metrics.percentile(latencies, 0.50), 6),
+                'p95': round(wapi_metrics.percentile(latencies, 0.95), 6),
+                'p99': round(wapi_metrics.percentile(latencies, 0.99), 6),
+                'max': round(latencies[-1], 6) if latencies else 0.0}
+
+
+class LoadResult:
+    '''
+    Per operation stats of the ramp-up and of the steady state.
+    '''
+    def __init__(self, mode, target, ramp, duration):
+        self.mode = mode
+        self.target = target
+        self.ramp = ramp
+        self.duration = duration
+        self.phases = {'ramp': {}, 'steady': {}}
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def add(self, phase, name, latency, result):
+        with self.lock:
+            self.phases[phase].setdefault(name, OperationStats()).add(latency, result)
+
+    def summary(self):
+        result = {'mode': self.mode, 'target': self.target, 'ramp': self.ramp, 'duration': self.duration,
+                  'dropped': self.dropped}
+        for phase, seconds in (('ramp', self.ramp), ('steady', self.duration)):
+            operations = self.phases[phase]
+            total = OperationStats()
+            for stats in operations.values():
+                total.latencies.extend(stats.latencies)
+                total.errors += stats.errors
+                total.skipped += stats.skipped
+            result[phase] = dict((name, stats.summary(seconds)) for name, stats in operations.items())
+            result[phase]['total'] = total.summary(seconds)
+        return result
+
+    def report(self):
+        summary = self.summary()
+        lines = ['%s load, target %s, %ds ramp-up, %ds steady state, %d requests dropped' %
+                 (self.mode, self.target, self.ramp, self.duration, self.dropped),
+                 '  %-22s %8s %9s %7s %8s %8s %8s %8s' % ('steady state', 'count', 'ops/s', 'errors',
+                                                         'p50 ms', 'p95 ms', 'p99 ms', 'max ms')]
+        steady = summary['steady']
+        for name in sorted(steady, key=lambda name: (name == 'total', name)):
+            stats = steady[name]
+            lines.append('  %-22s %8d %9.1f %7d %8.1f %8.1f %8.1f %8.1f' % (
+                name, stats['count'], stats['ops_per_second'], stats['errors'], stats['p50'] * 1000,
+                stats['p95'] * 1000, stats['p99'] * 1000, stats['max'] * 1000))
+        ramp = summary['ramp']['total']
+        lines.append('  ramp-up: %d requests, %d errors, p95 %.1fms' % (ramp['count'], ramp['errors'], ramp['p95'] * 1000))
+        return '\n'.join(lines)
+
+
+class Chooser:
+    '''
+    Weighted random choice over a mix.
+    '''
+    def __init__(self, mix):
+        self.names = sorted(name for name in mix if mix[name] > 0)
+        if not self.names:
+            raise ValueError('Empty load mix')
+        self.bounds = []
+        total = 0
+        for name in self.names:
+            total += mix[name]
+            self.bounds.append(total)
+
+    def choose(self):
+        point = random.uniform(0, self.bounds[-1])
+        for name, bound in zip(self.names, self.bounds):
+            if point <= bound:
+                return name
+        return self.names[-1]
+
+
+def run(workload, mix=None, rate=None, concurrency=CONCURRENCY, ramp=RAMP, duration=DURATION, setup=True):
+    '''
+    Drive workload for ramp + duration seconds. With rate (requests/s)
+    the load is open loop on concurrency workers, otherwise concurrency
+    workers each send their next request when the previous one is done.
+    '''
+    chooser = Chooser(mix or DEFAULT_MIX)
+    result = LoadResult('open loop' if rate else 'closed loop', '%s/s' % rate if rate else '%d workers' % concurrency,
+                        ramp, duration)
+    # One idle keep-alive connection per worker during the run.
+    pool = wapi_pool.get_pool(workload.grid_vip, workload.user)
+    pool.reserve(concurrency)
+    try:
+        if setup:
+            workload.setup()
+        start = time.time()
+        end = start + ramp + duration
+
+        def execute(name, scheduled):
+            outcome = workload.execute(name)
+            now = time.time()
+            result.add('ramp' if scheduled < start + ramp else 'steady', name, now - scheduled, outcome)
+
+        try:
+            if rate:
+                run_open_loop(chooser, execute, rate, concurrency, start, ramp, end, result)
+            else:
+                run_closed_loop(chooser, execute, concurrency, start, ramp, end)
+        finally:
+            if setup:
+                workload.teardown()
+    finally:
+        pool.release(concurrency)
+    logging.info(result.report())
+    return result
+
+
+def run_closed_loop(chooser, execute, concurrency, start, ramp, end):
+    def worker(index):
+        # Workers join one by one over the ramp-up.
+        time.sleep(max(0, start + ramp * index / concurrency - time.time()))
+        while time.time() < end:
+            execute(chooser.choose(), time.time())
+    threads = [threading.Thread(target=worker, args=(index,), name='load-%d' % index) for index in range(concurrency)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_open_loop(chooser, execute, rate, concurrency, start, ramp, end, result):
+    workers = ThreadPool(concurrency)
+    queued = threading.BoundedSemaphore(concurrency * BACKLOG)
+
+    def task(name, scheduled):
+        try:
+            execute(name, scheduled)
+        finally:
+            queued.release()
+    scheduled = start
+    try:
+        while scheduled < end:
+            time.sleep(max(0, scheduled - time.time()))
+            if queued.acquire(False):
+                workers.apply_async(task, (chooser.choose(), scheduled))
+            else:
+                result.dropped += 1
+            # The rate grows linearly over the ramp-up.
+            elapsed = scheduled - start
+            current = rate * min(1.0, max(elapsed, 0.5) / ramp) if ramp else rate
+            scheduled += 1.0 / current
+    finally:
+        workers.close()
+        workers.join()
+
+
+def main(argv):
+    options, args = getopt.getopt(argv, '', ['grid=', 'user=', 'password=', 'rate=', 'concurrency=', 'ramp=',
+                                             'duration=', 'mix=', 'report=', 'network='])
+    options = dict(options)
+    # wapi_request logs every call at INFO, too much under load.
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s %(message)s')
+    workload = Workload(options.get('--grid'), options.get('--user'), options.get('--password'),
+                        options.get('--network', NETWORK))
+    result = run(workload, parse_mix(options['--mix']) if '--mix' in options else None,
+                 float(options['--rate']) if '--rate' in options else None,
+                 int(options.get('--concurrency', CONCURRENCY)), int(options.get('--ramp', RAMP)),
+                 int(options.get('--duration', DURATION)))
+    print(result.report())
+    if '--report' in options:
+        with open(options['--report'], 'w') as report:
+            json.dump(result.summary(), report, indent=1, sort_keys=True)
+    return 1 if result.summary()['steady']['total']['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -8,6 +8,7 @@
 #
 # Description:
 #     Captures log based on log path and Grid_IP using start(to start log capture) or stop (to stop log capture) functions.
+#     The capture is streamed in-process by ib_utils.log_stream, see log_validation for matching.
 #
 #
 # Input Options:
@@ -27,6 +28,8 @@
 ########################################################################
 
 from paramiko import client
+import ib_utils.ssh_pool as ssh_pool
+import ib_utils.log_stream as log_stream
 import paramiko
 import os
 import sys
@@ -58,12 +61,7 @@ class SSH:
     client=None
 
     def __init__(self,address):
-        logging.info ("connecting to server \n : ", address)
-        self.client=client.SSHClient()
-        self.client.set_missing_host_key_policy(client.AutoAddPolicy())
-        privatekeyfile = os.path.expanduser('~/.ssh/id_rsa')
-        mykey = paramiko.RSAKey.from_private_key_file(privatekeyfile)
-        self.client.connect(address, username='root',pkey=mykey, allow_agent = True, look_for_keys = False)
+        self.client=ssh_pool.get_client(address)
         
             
     def send_command(self,command):
@@ -110,31 +108,16 @@ def log_action (action,file_path,IP):
     file_name='_'.join(file_path.split('/'))
     logging.info (file_name)
     if (action=='start'):
-        try:
-            logging.info ("Log validation started")
-            connection=SSH(str(IP))
-            create_dir='mkdir dump'
-            create=connection.send_command(create_dir)
-            connection.send_command('ls')
-            command1='tail -f -n 0 '+ file_path +' >> /root/dump/'+ str(IP)+file_name+'.log 2>&1 &'
-            command2='ps -ef | grep -i '+ file_path
-            check_pid=connection.send_command(command1)
-            if len(check_pid)>2:
-                logging.info ("Already process is running invoking kill all process")
-                connection.kill_command(check_pid,'kill -9 ')
-        except tail:
-            logging.info ("file not found")
-        else:
-            connection.send_command(command1)
+        logging.info ("Log validation started")
+        log_stream.start_capture(IP,file_path)
     elif(action=='stop'):
-        file_name='_'.join(file_path.split('/'))
-        command2="scp -o StrictHostKeyChecking=no -o BatchMode=yes -o UserKnownHostsFile=/dev/null root@"+str(IP)+":/root/dump/"+str(IP)+file_name+'.log'+" /tmp/"
-        logging.info (command2)
-        ExecCmd(command2)
-        remove_cmd='rm -rf /root/dump/'+ str(IP)+file_name+'.log'
-        connection=SSH(str(IP))
-        remove=connection.send_command(remove_cmd)
+        capture=log_stream.stop_capture(IP,file_path)
+        if capture is None:
+            logging.info ("No capture was started for "+file_path+" on "+str(IP))
+            return
+        # Local copy for the callers reading /tmp/<IP><file>.log directly.
+        with open('/tmp/'+str(IP)+file_name+'.log','w') as fobj:
+            fobj.write(capture.buffer.text()+'\n')
         logging.info ("Log validation stopped")
     else:
         logging.info ("please specify either you want to start or stop logs")        
-        
@@ -0,0 +1,216 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: log_offset.py
+#
+# Description:
+#     Offset based log capture, nothing keeps running on the appliance.
+#     start records the inode and size of the remote file and keeps an
+#     SFTP handle on it; read fetches only the bytes appended since the
+#     last read with seek/read. A rotated file is detected from its inode
+#     (renamed) or from its size and last read bytes (truncated): the
+#     rest of a renamed file is read through the open handle, then the
+#     new file from its beginning. pre_start_lines moves the start back
+#     to the last lines written before start, like 'tail -f' printed them.
+#
+#
+# Input Options:
+#        import ib_utils.log_offset as log_offset
+#        log_offset.start_capture('10.35.113.14', '/infoblox/var/infoblox.log')
+#        log_offset.start_capture('10.35.113.14', '/var/log/syslog', pre_start_lines=log_offset.PRE_START_LINES)
+#        log_offset.read_capture('10.35.113.14', '/infoblox/var/infoblox.log')
+#        log_offset.stop_capture('10.35.113.14', '/infoblox/var/infoblox.log')
+#  Output:
+#    read returns the new data, the captured lines are kept in a
+#    log_stream.LogBuffer (capture.buffer)
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import logging
+import re
+import threading
+import config
+import ib_utils.ssh_pool as ssh_pool
+import ib_utils.log_stream as log_stream
+
+CHUNK_SIZE = 1024 * 1024
+TAIL_SIZE = 64
+PRE_START_LINES = getattr(config, 'log_capture_pre_start_lines', 10)
+PRE_START_SIZE = 64 * 1024
+
+_captures = {}
+_lock = threading.Lock()
+
+
+def remote_stat(IP, file_path):
+    '''
+    (inode, size) of file_path on IP, (None, 0) when it does not exist.
+    SFTP attributes carry no inode, hence the single stat command.
+    '''
+    output = ssh_pool.exec_command(IP, "stat -L -c '%i %s' " + file_path + ' 2>/dev/null').split()
+    if len(output) != 2 or not output[1].isdigit():
+        return None, 0
+    return output[0], int(output[1])
+
+
+class OffsetCapture:
+    '''
+    Bytes appended to file_path on IP since start(), read on demand.
+    '''
+    def __init__(self, IP, file_path, max_lines=log_stream.MAX_LINES, pre_start_lines=0):
+        self.IP = str(IP)
+        self.file_path = file_path
+        self.max_lines = max_lines
+        self.pre_start_lines = pre_start_lines
+        self.inode = None
+        self.offset = 0
+        self.handle = None
+        self.tail = ''
+        self.buffer = None
+        self.stopped = False
+        self.lock = threading.Lock()
+
+    def open(self):
+        try:
+            return ssh_pool.get_sftp(self.IP).open(self.file_path, 'r')
+        except IOError:
+            return None
+
+    def start(self):
+        self.inode, self.offset = remote_stat(self.IP, self.file_path)
+        self.handle = self.open()
+        self.offset = self.lines_start(self.pre_start_lines)
+        self.tail = self.last_bytes()
+        self.buffer = log_stream.LogBuffer(self.offset, self.max_lines)
+        logging.info("Capturing %s on %s from byte %d" % (self.file_path, self.IP, self.offset))
+
+    def read_from(self, handle, offset):
+        handle.seek(offset)
+        chunks = []
+        while True:
+            data = handle.read(CHUNK_SIZE)
+            if not data:
+                break
+            chunks.append(data)
+        return ''.join(chunks)
+
+    def lines_start(self, lines):
+        '''
+        Offset of the last lines lines before offset, as 'tail -n lines'
+        (at most PRE_START_SIZE bytes back).
+        '''
+        if self.handle is None or not lines or not self.offset:
+            return self.offset
+        start = max(0, self.offset - PRE_START_SIZE)
+        self.handle.seek(start)
+        data = self.handle.read(self.offset - start)
+        # A newline ending the data does not start a line.
+        position = len(data) - 1 if data.endswith('\n') else len(data)
+        for _ in range(lines):
+            position = data.rfind('\n', 0, position)
+            if position < 0:
+                # Window start: keep whole lines only.
+                return start if start == 0 else start + data.find('\n') + 1
+        return start + position + 1
+
+    def last_bytes(self):
+        '''
+        The bytes just before offset, compared on the next read to notice
+        a file truncated and rewritten past the old offset.
+        '''
+        if self.handle is None or not self.offset:
+            return ''
+        start = max(0, self.offset - TAIL_SIZE)
+        self.handle.seek(start)
+        return self.handle.read(self.offset - start)
+
+    def truncated(self):
+        return self.handle.stat().st_size < self.offset or self.last_bytes() != self.tail
+
+    def read(self):
+        '''
+        Fetch and buffer the data appended since the previous read.
+        '''
+        with self.lock:
+            inode = remote_stat(self.IP, self.file_path)[0]
+            data = ''
+            if self.handle is not None:
+                if self.truncated():
+                    # Truncated in place (copytruncate), the old tail is lost.
+                    logging.info("%s on %s was truncated" % (self.file_path, self.IP))
+                    self.offset = 0
+                data = self.read_from(self.handle, self.offset)
+                self.offset += len(data)
+                self.tail = self.last_bytes()
+            if inode != self.inode:
+                # Rotated by rename: the handle still points to the old file.
+                logging.info("%s on %s was rotated" % (self.file_path, self.IP))
+                if self.handle is not None:
+                    self.handle.close()
+                self.inode = inode
+                self.handle = self.open()
+                self.offset = 0
+                if self.handle is not None:
+                    new_data = self.read_from(self.handle, 0)
+                    self.offset = len(new_data)
+                    self.tail = self.last_bytes()
+                    data += new_data
+            self.buffer.feed(data)
+            return data
+
+    def stop(self):
+        data = self.read()
+        self.stopped = True
+        self.buffer.flush()
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+        logging.info("Captured %d lines of %s on %s" % (self.buffer.count, self.file_path, self.IP))
+        return data
+
+    def search(self, pattern, flags=re.I):
+        if not hasattr(pattern, 'search'):
+            pattern = re.compile(pattern, flags)
+        return self.buffer.search(pattern)
+
+
+def start_capture(IP, file_path, max_lines=log_stream.MAX_LINES, pre_start_lines=0):
+    capture = OffsetCapture(IP, file_path, max_lines, pre_start_lines)
+    capture.start()
+    with _lock:
+        previous = _captures.get((str(IP), file_path))
+        _captures[(str(IP), file_path)] = capture
+    if previous is not None and previous.handle is not None:
+        previous.handle.close()
+    return capture
+
+
+def read_capture(IP, file_path):
+    capture = get_capture(IP, file_path)
+    if capture is None:
+        raise KeyError('No capture of %s on %s' % (file_path, IP))
+    if not capture.stopped:
+        capture.read()
+    return capture
+
+
+def stop_capture(IP, file_path):
+    '''
+    Read what is left and release the SFTP handle, the captured lines
+    stay available.
+    '''
+    capture = get_capture(IP, file_path)
+    if capture is not None and not capture.stopped:
+        capture.stop()
+    return capture
+
+
+def get_capture(IP, file_path):
+    with _lock:
+        return _captures.get((str(IP), file_path))
@@ -0,0 +1,414 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: log_stream.py
+#
+# Description:
+#     In-process log capture. start records the size of the remote log
+#     file and streams everything written after that offset over an SSH
+#     channel of the shared ssh_pool connection into a bounded local
+#     ring buffer of indexed lines. Validation matches compiled regexes
+#     against that buffer, no scp, no remote file and no grep process.
+#
+#
+# Input Options:
+#        import ib_utils.log_stream as log_stream
+#        log_stream.start_capture('10.35.113.14', '/var/log/syslog')
+#        log_stream.stop_capture('10.35.113.14', '/var/log/syslog')
+#        log_stream.search('10.35.113.14', '/var/log/syslog', '.*ADD.*DLV.*')
+#
+#        session = log_stream.CaptureSession([config.grid1_master_vip, config.grid1_member1_vip], ['/var/log/messages'])
+#        session.start()
+#        session.stop()
+#        session.events()
+#  Output:
+#    search returns the matching LogLine objects (line number, byte
+#    offset, capture timestamp, text), CaptureSession.events the
+#    (host, path, LogLine) of every member merged in time order
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import heapq
+import logging
+import re
+import threading
+import time
+import config
+import ib_utils.ssh_pool as ssh_pool
+from collections import deque
+from multiprocessing.pool import ThreadPool
+
+MAX_LINES = getattr(config, 'log_capture_max_lines', 100000)
+DRAIN_TIME = 1
+CONCURRENCY = getattr(config, 'log_capture_concurrency', 8)
+
+_captures = {}
+_lock = threading.Lock()
+
+
+class LogLine:
+    def __init__(self, number, offset, timestamp, text):
+        self.number = number
+        self.offset = offset
+        self.timestamp = timestamp
+        self.text = text
+
+    def __repr__(self):
+        return '<LogLine %d @%d: %s>' % (self.number, self.offset, self.text)
+
+
+class LogBuffer:
+    '''
+    Ring buffer of the last max_lines complete lines of a captured file.
+    number is the line index since the capture start, offset the byte
+    offset of the line in the remote file.
+    '''
+    def __init__(self, start_offset=0, max_lines=MAX_LINES):
+        self.lines = deque(maxlen=max_lines)
+        self.partial = ''
+        self.offset = start_offset
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def feed(self, data):
+        now = time.time()
+        with self.lock:
+            data = self.partial + data
+            parts = data.split('\n')
+            self.partial = parts.pop()
+            for text in parts:
+                self.lines.append(LogLine(self.count, self.offset, now, text.rstrip('\r')))
+                self.count += 1
+                self.offset += len(text) + 1
+
+    def flush(self):
+        '''
+        Keep a last line not terminated by a newline.
+        '''
+        if self.partial:
+            self.feed('\n')
+
+    def search(self, regex):
+        with self.lock:
+            return [line for line in self.lines if regex.search(line.text)]
+
+    def snapshot(self):
+        '''
+        Copy of the captured lines, safe to scan while the capture runs.
+        '''
+        with self.lock:
+            return list(self.lines)
+
+    def text(self):
+        with self.lock:
+            return '\n'.join(line.text for line in self.lines)
+
+
+class StreamCapture:
+    '''
+    Streams the bytes appended to file_path on IP into a LogBuffer.
+    '''
+    def __init__(self, IP, file_path, max_lines=MAX_LINES):
+        self.IP = str(IP)
+        self.file_path = file_path
+        self.max_lines = max_lines
+        self.channel = None
+        self.thread = None
+        self.buffer = None
+        self.pid = None
+
+    def start(self):
+        size = ssh_pool.exec_command(self.IP, 'stat -c %s ' + self.file_path).strip()
+        start_offset = int(size) if size.isdigit() else 0
+        self.buffer = LogBuffer(start_offset, self.max_lines)
+        self.channel = ssh_pool.get_client(self.IP).get_transport().open_session()
+        # No pty, it would turn every \n into \r\n and shift the byte
+        # offsets. The shell reports its pid and becomes tail, stop kills it.
+        self.channel.exec_command('echo $$; exec tail -c +%d -F %s 2>/dev/null' % (start_offset + 1, self.file_path))
+        self.pid = self.read_pid()
+        self.thread = threading.Thread(target=self.read)
+        self.thread.daemon = True
+        self.thread.start()
+        logging.info("Capturing %s on %s from byte %d" % (self.file_path, self.IP, start_offset))
+
+    def read_pid(self):
+        data = ''
+        while '\n' not in data:
+            chunk = self.channel.recv(65536)
+            if not chunk:
+                raise Exception('Capture of %s on %s ended before it started' % (self.file_path, self.IP))
+            data += chunk
+        pid, data = data.split('\n', 1)
+        if data:
+            self.buffer.feed(data)
+        return int(pid)
+
+    def read(self):
+        while True:
+            data = self.channel.recv(65536)
+            if not data:
+                break
+            self.buffer.feed(data)
+
+    def stop(self, drain_time=DRAIN_TIME):
+        # Give syslog a moment to flush what the test just triggered.
+        time.sleep(drain_time)
+        ssh_pool.exec_command(self.IP, 'kill %d' % self.pid)
+        self.thread.join(drain_time + 5)
+        self.channel.close()
+        self.buffer.flush()
+        logging.info("Captured %d lines of %s on %s" % (self.buffer.count, self.file_path, self.IP))
+
+    def search(self, pattern, flags=re.I):
+        if not hasattr(pattern, 'search'):
+            pattern = re.compile(pattern, flags)
+        return self.buffer.search(pattern)
+
+
+def start_capture(IP, file_path, max_lines=MAX_LINES):
+    '''
+    Start a capture of file_path on IP, replacing a previous one.
+    '''
+    capture = StreamCapture(IP, file_path, max_lines)
+    with _lock:
+        previous = _captures.pop((str(IP), file_path), None)
+    if previous is not None and previous.channel is not None and not previous.channel.closed:
+        previous.stop(0)
+    capture.start()
+    with _lock:
+        _captures[(str(IP), file_path)] = capture
+    return capture
+
+
+def stop_capture(IP, file_path):
+    '''
+    Stop streaming, the captured lines stay available to search().
+    '''
+    capture = get_capture(IP, file_path)
+    if capture is not None and not capture.channel.closed:
+        capture.stop()
+    return capture
+
+
+def get_capture(IP, file_path):
+    with _lock:
+        return _captures.get((str(IP), file_path))
+
+
+def search(IP, file_path, pattern, flags=re.I):
+    capture = get_capture(IP, file_path)
+    if capture is None:
+        raise KeyError('No capture of %s on %s' % (file_path, IP))
+    return capture.search(pattern, flags)
+
+
+class CaptureSession:
+    '''
+    Captures of every path on every host, started and stopped on a thread
+    pool so the SSH round-trips of the members overlap. The captures are
+    registered like start_capture ones, log_validation finds them.
+    Timestamps are taken on this host when the data arrives, so lines of
+    different members are ordered on one clock.
+    '''
+    def __init__(self, hosts, paths, max_lines=MAX_LINES, concurrency=CONCURRENCY):
+        self.targets = [(str(host), path) for host in hosts for path in paths]
+        self.max_lines = max_lines
+        self.concurrency = concurrency
+        self.captures = {}
+
+    def run(self, function):
+        pool = ThreadPool(max(1, min(self.concurrency, len(self.targets))))
+        try:
+            return pool.map(function, self.targets)
+        finally:
+            pool.close()
+            pool.join()
+
+    def start(self):
+        captures = self.run(lambda target: start_capture(target[0], target[1], self.max_lines))
+        self.captures = dict(zip(self.targets, captures))
+        return self
+
+    def stop(self, drain_time=DRAIN_TIME):
+        # One drain for the whole session instead of one per capture.
+        time.sleep(drain_time)
+        def stop_one(target):
+            capture = self.captures.get(target)
+            if capture is not None and not capture.channel.closed:
+                capture.stop(0)
+        self.run(stop_one)
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def events(self):
+        '''
+        [(host, path, LogLine)] of all captures in time order.
+        '''
+        streams = []
+        for index, target in enumerate(self.targets):
+            capture = self.captures.get(target)
+            if capture is None:
+                continue
+            streams.append([(line.timestamp, index, line.number, target[0], target[1], line)
+                            for line in capture.buffer.snapshot()])
+        return [event[3:] for event in heapq.merge(*streams)]
+
+    def search(self, pattern, flags=re.I):
+        if not hasattr(pattern, 'search'):
+            pattern = re.compile(pattern, flags)
+        return [event for event in self.events() if pattern.search(event[2].text)]
+
+
+def shell_pattern(string):
+    '''
+    Patterns written for 'grep -i <string>' may carry shell quotes.
+    Return a compiled case insensitive regex (Python re syntax).
+    '''
+    string = string.strip()
+    if len(string) > 1 and string[0] == string[-1] and string[0] in '\'"':
+        string = string[1:-1]
+    try:
+        return re.compile(string, re.I)
+    except re.error:
+        return re.compile(re.escape(string), re.I)
+
+
+def grep_pattern(string):
+    '''
+    Compiled case insensitive regex matching what 'grep -i <string>' run
+    through the shell matched: shell quoting removed, then the basic
+    regular expression (BRE) translated to Python re syntax, so
+    "a|b(c)+" stays literal and "\\(a\\|b\\)" groups.
+    '''
+    string = shell_word(string.strip())
+    try:
+        return re.compile(bre_to_re(string), re.I)
+    except (re.error, ValueError):
+        # grep exits with an error on it, match it literally instead.
+        return re.compile(re.escape(string), re.I)
+
+
+def shell_word(string):
+    '''
+    Remove the quotes and backslashes the shell removes from a word.
+    '''
+    word = []
+    quote = None
+    index = 0
+    while index < len(string):
+        char = string[index]
+        index += 1
+        if quote == "'":
+            if char == "'":
+                quote = None
+            else:
+                word.append(char)
+        elif char == '\\' and index < len(string) and (quote is None or string[index] in '$`"\\'):
+            word.append(string[index])
+            index += 1
+        elif char == '"':
+            quote = None if quote == '"' else '"'
+        elif char == "'" and quote is None:
+            quote = "'"
+        else:
+            word.append(char)
+    return ''.join(word)
+
+
+POSIX_CLASSES = {'alpha': 'a-zA-Z', 'digit': '0-9', 'alnum': '0-9a-zA-Z', 'upper': 'A-Z', 'lower': 'a-z',
+                 'space': r' \t\n\r\f\v', 'blank': r' \t', 'xdigit': '0-9A-Fa-f', 'cntrl': r'\x00-\x1f\x7f',
+                 'print': r'\x20-\x7e', 'graph': r'\x21-\x7e', 'punct': re.escape('!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~')}
+
+
+def bre_to_re(pattern):
+    '''
+    GNU grep basic regular expression to Python re syntax. ( ) { } | + ?
+    are literal unless escaped, * is literal at the start of an
+    expression, ^ and $ are anchors only at its start and end.
+    '''
+    out = []
+    index = 0
+    # True where an expression starts: * is literal and ^ an anchor.
+    start = True
+    while index < len(pattern):
+        char = pattern[index]
+        index += 1
+        if char == '\\' and index < len(pattern):
+            char = pattern[index]
+            index += 1
+            if char in '(|':
+                out.append(char)
+                start = True
+                continue
+            if char == '{':
+                end = pattern.find('\\}', index)
+                if end < 0:
+                    raise ValueError('Unmatched \\{')
+                out.append('{%s}' % pattern[index:end])
+                index = end + 2
+            elif char in ')+?':
+                out.append(char)
+            elif char in '<>':
+                out.append(r'\b')
+            elif char.isdigit() or char in 'wWsSbB':
+                out.append('\\' + char)
+            else:
+                out.append(re.escape(char))
+        elif char == '[':
+            index, text = bracket_to_re(pattern, index)
+            out.append(text)
+        elif char == '*':
+            out.append(r'\*' if start else '*')
+        elif char == '^':
+            out.append('^' if start else r'\^')
+            continue
+        elif char == '$':
+            last = index == len(pattern) or pattern.startswith('\\)', index) or pattern.startswith('\\|', index)
+            out.append('$' if last else r'\$')
+        elif char == '.':
+            out.append('.')
+        else:
+            out.append(re.escape(char))
+        start = False
+    return ''.join(out)
+
+
+def bracket_to_re(pattern, index):
+    '''
+    (index after the closing ']', Python class) of the POSIX bracket
+    expression whose '[' is just before index.
+    '''
+    out = ['[']
+    if pattern[index:index + 1] == '^':
+        out.append('^')
+        index += 1
+    first = True
+    while index < len(pattern):
+        char = pattern[index]
+        if char == ']' and not first:
+            out.append(']')
+            return index + 1, ''.join(out)
+        first = False
+        if pattern.startswith('[:', index):
+            end = pattern.find(':]', index + 2)
+            name = pattern[index + 2:end] if end >= 0 else None
+            if name not in POSIX_CLASSES:
+                raise ValueError('Invalid character class %s' % name)
+            out.append(POSIX_CLASSES[name])
+            index = end + 2
+            continue
+        # Backslash is literal inside brackets.
+        out.append('\\' + char if char in '\\[]^' else char)
+        index += 1
+    raise ValueError('Unmatched [')
@@ -13,9 +13,11 @@
 # Input Options:
 #        import log_validation as logv
 #	 logv.log_validation(".*ADD.*DLV.*","/var/log/syslog",config.grid_vip) (LookFor String,file_path,grid_ip)
+#	 logv.validate_patterns(capture,[".*ADD.*DLV.*","zone_auth"],mode="ordered")
 #  Output:
 #    0: Test success
 #    1: Test failed
+#    validate_patterns returns a PatternResult (matches, missing, ok)
 #
 # Author: Rajeev Patil
 #
@@ -25,6 +27,9 @@
 ########################################################################
 
 from paramiko import client
+import ib_utils.ssh_pool as ssh_pool
+import ib_utils.log_stream as log_stream
+import ib_utils.multi_match as multi_match
 import paramiko
 import os
 import sys
@@ -32,6 +37,7 @@ import config
 import socket
 import subprocess
 import logging
+import re
 
 host_name = socket.gethostname()
 host_ip = socket.gethostbyname(host_name)
@@ -46,12 +52,7 @@ class SSH:
 
     def __init__(self,address):
         logging.info ("Log Validation Script")
-        logging.info ("connecting to server \n : ", address)
-        self.client=client.SSHClient()
-        self.client.set_missing_host_key_policy(client.AutoAddPolicy())
-        privatekeyfile = os.path.expanduser('~/.ssh/id_rsa')
-        mykey = paramiko.RSAKey.from_private_key_file(privatekeyfile)
-        self.client.connect(address, username='root', pkey = mykey)
+        self.client=ssh_pool.get_client(address)
         
             
     def send_command(self,command):
@@ -66,6 +67,20 @@ class SSH:
 
 def log_validation (string,file_path,IP_address, Host_address=host_ip):
     file_name='_'.join(file_path.split('/'))
+    capture=log_stream.get_capture(IP_address,file_path)
+    if (capture is not None):
+        # Match against the in-process capture of log_capture.log_action,
+        # string keeps its 'grep -i' meaning (shell quoting, BRE syntax).
+        # A missing pattern raises CalledProcessError as grep did.
+        regex=log_stream.grep_pattern(string)
+        matches=capture.search(regex)
+        result='\n'.join(line.text for line in matches)
+        print (result)
+        if not matches:
+            logging.info ("Requested Logs not found")
+            raise subprocess.CalledProcessError(1,'grep -i '+string,result)
+        logging.info ("Requested Logs Present")
+        return
     if (Host_address == host_ip ):
         command1='grep -i '+string +' /tmp/'+ str(IP_address)+file_name+'.log'
         print(command1)
@@ -91,5 +106,87 @@ def log_validation (string,file_path,IP_address, Host_address=host_ip):
             logging.info ("Pattern not found")
 
 
+MODES = ('all', 'any', 'ordered')
+
+
+class PatternResult:
+    '''
+    Outcome of validate_patterns. matches maps every pattern to the
+    LogLine objects (number, offset, timestamp, text) it matched, in
+    ordered mode only the line which satisfied it. Truthy when the mode
+    is satisfied.
+    '''
+    def __init__(self, patterns, mode, matches):
+        self.patterns = patterns
+        self.mode = mode
+        self.matches = matches
+        self.missing = [pattern for pattern in patterns if not matches[pattern]]
+        if mode == 'any':
+            self.ok = len(self.missing) < len(patterns)
+        else:
+            self.ok = not self.missing
+
+    def __nonzero__(self):
+        return self.ok
+    __bool__ = __nonzero__
+
+    def __repr__(self):
+        return '<PatternResult %s ok=%s missing=%s>' % (self.mode, self.ok, self.missing)
+
+
+def capture_lines(capture):
+    '''
+    LogLine list of a StreamCapture, a LogBuffer, a local file path or a
+    list of strings. Lines read from a file carry no timestamp.
+    '''
+    if hasattr(capture, 'buffer'):
+        capture = capture.buffer
+    if hasattr(capture, 'snapshot'):
+        return capture.snapshot()
+    if isinstance(capture, basestring):
+        with open(capture, 'r') as fobj:
+            capture = fobj.read().split('\n')
+            if capture and not capture[-1]:
+                capture.pop()
+    lines = []
+    offset = 0
+    for number, text in enumerate(capture):
+        if isinstance(text, log_stream.LogLine):
+            lines.append(text)
+            continue
+        lines.append(log_stream.LogLine(number, offset, None, text.rstrip('\r')))
+        offset += len(text) + 1
+    return lines
 
 
+def validate_patterns(capture, patterns, mode='all'):
+    '''
+    Match every pattern against capture in one scan of its lines.
+    mode 'all': every pattern must match, 'any': at least one of them,
+    'ordered': each pattern must match a line after the line matched by
+    the previous one. Patterns are Python regexes (unlike the grep BRE
+    of log_validation) and may carry the shell quotes of grep -i.
+    '''
+    if mode not in MODES:
+        raise ValueError('mode must be one of %s' % ', '.join(MODES))
+    patterns = list(patterns)
+    matcher = multi_match.MultiMatcher([log_stream.shell_pattern(p).pattern for p in patterns], re.I)
+    matches = dict((pattern, []) for pattern in patterns)
+    position = 0
+    for line in capture_lines(capture):
+        found = matcher.match(line.text)
+        if not found:
+            continue
+        if mode == 'ordered':
+            # One line may satisfy several consecutive patterns.
+            while position < len(patterns) and position in found:
+                matches[patterns[position]].append(line)
+                position += 1
+            if position == len(patterns):
+                break
+            continue
+        for index in found:
+            matches[patterns[index]].append(line)
+    result = PatternResult(patterns, mode, matches)
+    logging.info ("Pattern validation (%s): %d of %d patterns found" % (mode, len(patterns) - len(result.missing), len(patterns)))
+    return result
@@ -0,0 +1,128 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: multi_match.py
+#
+# Description:
+#     Matches many patterns against a line in one pass. Plain strings
+#     go through an Aho-Corasick automaton, real regexes are combined
+#     into one alternation used as a prefilter, so a line matching none
+#     of them costs a single regex scan. A line passing the prefilter is
+#     matched once against one named lookahead per regex, the groups set
+#     tell which patterns matched.
+#
+#
+# Input Options:
+#        import ib_utils.multi_match as multi_match
+#        matcher = multi_match.MultiMatcher(["ADD for 'arec'", ".*DLV.*"])
+#        matcher.match("... ADD for 'arec' ...")     -> set([0])
+#  Output:
+#    Set of the indexes of the patterns found in the line
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import re
+from collections import deque
+
+REGEX_CHARS = re.compile(r'[.^$*+?{}\[\]\\|()]')
+BACKREF = re.compile(r'\\[1-9]|\(\?P=')
+
+
+class AhoCorasick:
+    '''
+    Finds which of a set of literal strings occur in a text.
+    '''
+    def __init__(self, words):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [set()]
+        for index, word in enumerate(words):
+            self.add(word, index)
+        self.build()
+
+    def add(self, word, index):
+        state = 0
+        for char in word:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(set())
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.out[state].add(index)
+
+    def build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, target in self.goto[state].items():
+                queue.append(target)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[target] = self.goto[fallback].get(char, 0)
+                self.out[target] |= self.out[self.fail[target]]
+
+    def search(self, text):
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            if self.out[state]:
+                found |= self.out[state]
+        return found
+
+
+class MultiMatcher:
+    '''
+    Compiles a list of patterns once and tells which ones match a line.
+    '''
+    def __init__(self, patterns, flags=re.I):
+        self.patterns = list(patterns)
+        self.ignore_case = bool(flags & re.I)
+        literals = []
+        self.literal_index = []
+        self.regexes = []
+        for index, pattern in enumerate(self.patterns):
+            if REGEX_CHARS.search(pattern):
+                self.regexes.append((index, re.compile(pattern, flags)))
+            else:
+                literals.append(pattern.lower() if self.ignore_case else pattern)
+                self.literal_index.append(index)
+        self.literals = AhoCorasick(literals) if literals else None
+        # Back references would point to other groups once the patterns are
+        # combined, such patterns are always tried one by one.
+        self.separate = [(index, regex) for index, regex in self.regexes if BACKREF.search(regex.pattern)]
+        combinable = [(index, regex.pattern) for index, regex in self.regexes if not BACKREF.search(regex.pattern)]
+        self.combined = None
+        self.lookaheads = None
+        if combinable:
+            try:
+                self.combined = re.compile('|'.join('(?:%s)' % pattern for index, pattern in combinable), flags)
+                # Each lookahead sets its group when the pattern occurs
+                # anywhere in the line, the empty branch lets it fail.
+                self.lookaheads = re.compile(''.join(r'(?=[\s\S]*?(?P<_m%d>%s)|)' % (index, pattern)
+                                                     for index, pattern in combinable), flags)
+            except re.error:
+                # e.g. two patterns defining the same group name.
+                self.combined = None
+                self.separate = self.regexes
+
+    def match(self, line):
+        found = set()
+        if self.literals is not None:
+            text = line.lower() if self.ignore_case else line
+            found.update(self.literal_index[i] for i in self.literals.search(text))
+        if self.combined is not None and self.combined.search(line):
+            groups = self.lookaheads.match(line).groupdict()
+            found.update(int(name[2:]) for name, text in groups.items() if name.startswith('_m') and text is not None)
+        found.update(index for index, regex in self.separate if regex.search(line))
+        return found
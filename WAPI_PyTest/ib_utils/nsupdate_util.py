@@ -15,23 +15,80 @@ import pexpect
 import getpass
 import sys
 import config
+import ib_utils.dns_update as dns_update
+import ib_utils.dns_query as dns_query
+import base64
 #auth_zone={"fqdn": "manoj990.com"}
-    
+
+# Address the updates come from, the one allow_update ACLs of the tests expect.
+NSUPDATE_SOURCE=getattr(config,'nsupdate_source',None) or config.client_ip
+
+
 def nsupdate_add(name,ttl,record_type,zone,record_data):
-    child = pexpect.spawn ('ssh -o StrictHostKeyChecking=no root@'+config.client_ip)
-    child.logfile=sys.stdout 
+    # Sent in-process from NSUPDATE_SOURCE when it is an address of this host,
+    # else by nsupdate run over ssh on NSUPDATE_SOURCE (returns None then).
+    if not dns_query.is_local_address(NSUPDATE_SOURCE):
+        command='update add '+str(name)+'.'+str(zone)+' '+str(ttl)+' '+str(record_type)+' '+str(record_data)
+        remote_nsupdate([command,'send'])
+        return None
+    update=dns_update.Update(zone).add(str(name)+'.'+str(zone),ttl,record_type,record_data)
+    response=dns_update.send(config.grid_vip,update,source=NSUPDATE_SOURCE)
+    logging.info ("update add "+str(name)+'.'+str(zone)+' '+str(ttl)+' '+str(record_type)+' '+str(record_data)+" : "+response.rcode)
+    return response
+
+
+def nsupdate_batch(zone,changes,key=None):
+    # changes: ('add',name,ttl,type,rdata) or ('delete',name[,type[,rdata]]), sent in one message per 500 changes.
+    # Returns the response Messages (or exceptions), the nsupdate rcodes when sent over ssh.
+    updates=dns_update.batch(zone,changes)
+    if dns_query.is_local_address(NSUPDATE_SOURCE):
+        responses=dns_update.send_all(config.grid_vip,updates,key=key,source=NSUPDATE_SOURCE)
+    else:
+        responses=remote_nsupdate(nsupdate_commands(updates,changes,key or dns_update.default_key()))
+    for response in responses:
+        if isinstance(response,Exception) or getattr(response,'rcode',response)!='NOERROR':
+            logging.info ("nsupdate failed for "+str(zone)+" : "+str(getattr(response,'rcode',response)))
+    return responses
+
+
+def nsupdate_commands(updates,changes,key=None):
+    # nsupdate input for the same messages as dns_update.batch.
+    commands=[]
+    if key is not None:
+        algorithm=key.algorithm.rstrip('.').replace('.sig-alg.reg.int','')
+        commands.append('key '+algorithm+':'+key.name.rstrip('.')+' '+base64.b64encode(key.secret))
+    position=0
+    for update in updates:
+        commands.append('zone '+update.zone)
+        for change in changes[position:position+len(update)]:
+            words=[str(word) for word in change[2:]]
+            commands.append(' '.join(['update',change[0],update.owner(change[1])]+words))
+        commands.append('send')
+        position+=len(update)
+    return commands
+
+
+def remote_nsupdate(commands):
+    # nsupdate session on NSUPDATE_SOURCE, returns the rcode of every 'send'.
+    child = pexpect.spawn ('ssh -o StrictHostKeyChecking=no root@'+NSUPDATE_SOURCE)
+    child.logfile=sys.stdout
     child.expect (':')
     child.sendline ('infoblox')
-    #child.sendline('ls -ltr')
     child.sendline ('nsupdate')
     child.expect ('>')
     child.sendline ('server '+config.grid_vip)
     child.expect ('>')
-    child.sendline (('update add '+ ' '+str(name)+'.'+str(zone)+' '+str(ttl)+' '+str(record_type)+' '+str(record_data)))
-    child.expect ('>')
-    child.sendline ('send')
-    child.expect ('>')
-    
+    rcodes=[]
+    for command in commands:
+        child.sendline (command)
+        child.expect ('>')
+        if command=='send':
+            failed=re.search(r'update failed: (\w+)',child.before)
+            rcodes.append(failed.group(1) if failed else 'NOERROR')
+            logging.info ("nsupdate on "+NSUPDATE_SOURCE+" : "+rcodes[-1])
+    child.sendline ('quit')
+    child.close()
+    return rcodes
 
 
 #nsupdate_add('arun','1800','IPSECKEY',auth_zone['fqdn'],'10 0 1 . AAIBAQEBIgEDUVN5hu01UztgZEeO7rJ7W9dNrhSbboG6OgUhr4KreAE=')
@@ -0,0 +1,99 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: ref_cache.py
+#
+# Description:
+#     LRU cache of WAPI object references used by ib_NIOS.resolve.
+#     Entries are kept per grid and keyed by (object_type, search keys);
+#     ib_NIOS.wapi_request drops the entries pointing to a ref after a
+#     successful PUT or DELETE on it. Deleting a zone, DNS view or network
+#     deletes the objects it holds, so a change to one of those drops
+#     every entry of the grid.
+#
+#
+# Input Options:
+#        import ib_utils.ref_cache as ref_cache
+#        ref_cache.put(grid_vip, key, ref)
+#        ref_cache.get(grid_vip, key)
+#        ref_cache.invalidate(grid_vip, ref)
+#        ref_cache.clear()
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import json
+import threading
+import config
+from collections import OrderedDict
+
+CACHE_SIZE = getattr(config, 'wapi_ref_cache_size', 256)
+# Object types whose delete cascades to other objects (networkview and
+# networkcontainer match "network").
+CONTAINER_TYPES = ('zone_', 'view', 'network', 'ipv6network')
+
+_entries = OrderedDict()
+_refs = {}
+_lock = threading.Lock()
+
+
+def make_key(object_type, keys):
+    # Search values may be dicts or lists, e.g. extattrs.
+    return (object_type, json.dumps(keys, sort_keys=True))
+
+
+def get(grid_vip, key):
+    with _lock:
+        ref = _entries.pop((grid_vip, key), None)
+        if ref is not None:
+            # Re-insert to mark the entry as most recently used.
+            _entries[(grid_vip, key)] = ref
+        return ref
+
+
+def put(grid_vip, key, ref):
+    with _lock:
+        _discard((grid_vip, key))
+        _entries[(grid_vip, key)] = ref
+        _refs.setdefault((grid_vip, ref), set()).add(key)
+        while len(_entries) > CACHE_SIZE:
+            _discard(next(iter(_entries)))
+
+
+def invalidate(grid_vip, ref):
+    '''
+    Drop every entry of grid_vip resolving to ref, or every entry of
+    grid_vip when ref is a zone, view or network.
+    '''
+    if ref.split('/', 1)[0].startswith(CONTAINER_TYPES):
+        clear(grid_vip)
+        return
+    with _lock:
+        for key in _refs.pop((grid_vip, ref), ()):
+            _entries.pop((grid_vip, key), None)
+
+
+def clear(grid_vip=None):
+    '''
+    Drop the entries of grid_vip, or of every grid.
+    '''
+    with _lock:
+        for entry in list(_entries):
+            if grid_vip is None or entry[0] == grid_vip:
+                _discard(entry)
+
+
+def _discard(entry):
+    ref = _entries.pop(entry, None)
+    if ref is None:
+        return
+    keys = _refs.get((entry[0], ref))
+    if keys is not None:
+        keys.discard(entry[1])
+        if not keys:
+            del _refs[(entry[0], ref)]
@@ -0,0 +1,167 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: sleep_accounting_plugin.py
+#
+# Description:
+#     pytest plugin measuring idle time. time.sleep is wrapped for the
+#     run (test modules doing "from time import sleep" are imported
+#     after it) and every sleep is attributed to its test and call site,
+#     the first frame outside ib_utils so waits made through helpers land
+#     on the suite line calling them. The report ranks the call sites and
+#     tests by seconds slept and splits the wall clock of the session
+#     into sleeping, WAPI calls (wapi_metrics) and the rest. Sleeps of
+#     background threads are listed but left out of the split.
+#
+#
+# Input Options:
+#        py.test -p ib_utils.sleep_accounting_plugin suites/test_x.py --junit-xml=x.xml
+#        --sleep-report=<file>     JSON report path (default next to --junit-xml)
+#        --sleep-top=<N>           rows of the end of session tables (default 15)
+#  Output:
+#    JSON report (<name>.sleep.json), terminal summary
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import json
+import os
+import sys
+import threading
+import time
+import ib_utils.wapi_metrics as wapi_metrics
+
+TOP = 15
+IB_UTILS = os.path.dirname(os.path.abspath(__file__))
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('sleep accounting')
+    group.addoption('--sleep-report', action='store', default=None,
+                    help='JSON report of the time spent in time.sleep (default: next to --junit-xml)')
+    group.addoption('--sleep-top', action='store', type=int, default=TOP,
+                    help='call sites and tests listed at the end (default %d)' % TOP)
+
+
+def pytest_configure(config):
+    path = config.getoption('sleep_report')
+    xmlpath = getattr(config.option, 'xmlpath', None)
+    if not path and xmlpath:
+        path = os.path.splitext(xmlpath)[0] + '.sleep.json'
+    config.pluginmanager.register(SleepAccounting(path, config.getoption('sleep_top')), 'sleep_accounting')
+
+
+def call_site(frame):
+    '''
+    'file:line (function)' of the first frame outside ib_utils.
+    '''
+    caller = frame
+    while frame is not None and os.path.abspath(frame.f_code.co_filename).startswith(IB_UTILS + os.sep):
+        frame = frame.f_back
+    frame = frame or caller
+    return '%s:%d (%s)' % (os.path.relpath(frame.f_code.co_filename), frame.f_lineno, frame.f_code.co_name)
+
+
+class SleepAccounting:
+    def __init__(self, path, top):
+        self.path = path
+        self.top = top
+        self.lock = threading.Lock()
+        # site -> [calls, seconds, {test: seconds}]
+        self.sites = {}
+        self.tests = {}
+        self.durations = {}
+        self.wapi = {}
+        self.background = 0.0
+        self.main_thread = threading.current_thread()
+        self.start = time.time()
+        self.original = time.sleep
+        time.sleep = self.sleep
+        wapi_metrics.add_hook(self.wapi_call)
+
+    def sleep(self, seconds):
+        start = time.time()
+        try:
+            self.original(seconds)
+        finally:
+            self.account(time.time() - start, sys._getframe(1))
+
+    def account(self, slept, frame):
+        test = wapi_metrics.current_test() or '<session>'
+        site = call_site(frame)
+        with self.lock:
+            if threading.current_thread() is not self.main_thread:
+                self.background += slept
+                site += ' [thread]'
+            else:
+                self.tests[test] = self.tests.get(test, 0.0) + slept
+            entry = self.sites.setdefault(site, [0, 0.0, {}])
+            entry[0] += 1
+            entry[1] += slept
+            entry[2][test] = entry[2].get(test, 0.0) + slept
+
+    def wapi_call(self, call):
+        with self.lock:
+            test = call.test or '<session>'
+            self.wapi[test] = self.wapi.get(test, 0.0) + call.total
+
+    def pytest_runtest_logreport(self, report):
+        self.durations[report.nodeid] = self.durations.get(report.nodeid, 0.0) + report.duration
+
+    def pytest_unconfigure(self, config):
+        time.sleep = self.original
+        wapi_metrics.remove_hook(self.wapi_call)
+
+    def summary(self):
+        wall = time.time() - self.start
+        slept = sum(self.tests.values())
+        # WAPI calls run concurrently from worker threads may add up to
+        # more than the wall clock, the split keeps the rest at zero.
+        wapi = min(sum(self.wapi.values()), max(0.0, wall - slept))
+        sites = sorted(self.sites.items(), key=lambda item: -item[1][1])
+        tests = sorted(self.tests.items(), key=lambda item: -item[1])
+        return {
+            'wall_clock': round(wall, 3), 'slept': round(slept, 3), 'wapi': round(wapi, 3),
+            'other': round(max(0.0, wall - slept - wapi), 3), 'background_slept': round(self.background, 3),
+            'sites': [{'site': site, 'calls': calls, 'seconds': round(seconds, 3),
+                       'tests': dict((test, round(value, 3)) for test, value in per_test.items())}
+                      for site, (calls, seconds, per_test) in sites],
+            'tests': [{'test': test, 'slept': round(seconds, 3),
+                       'duration': round(self.durations.get(test, 0.0), 3),
+                       'wapi': round(self.wapi.get(test, 0.0), 3)} for test, seconds in tests],
+        }
+
+    def pytest_sessionfinish(self, session):
+        if self.path and self.sites:
+            with open(self.path, 'w') as report:
+                json.dump(self.summary(), report, indent=1, sort_keys=True)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.sites:
+            return
+        summary = self.summary()
+        wall = summary['wall_clock'] or 1.0
+        terminalreporter.write_sep('=', 'sleep accounting')
+        terminalreporter.write_line('wall clock %.1fs: sleeping %.1fs (%.1f%%), WAPI calls %.1fs (%.1f%%), '
+                                    'other %.1fs (%.1f%%); background threads slept %.1fs' % (
+                                        summary['wall_clock'], summary['slept'], 100 * summary['slept'] / wall,
+                                        summary['wapi'], 100 * summary['wapi'] / wall,
+                                        summary['other'], 100 * summary['other'] / wall,
+                                        summary['background_slept']))
+        terminalreporter.write_line('Biggest sleep call sites:')
+        terminalreporter.write_line('  %9s %6s %6s  %s' % ('slept s', 'calls', 'tests', 'site'))
+        for site in summary['sites'][:self.top]:
+            terminalreporter.write_line('  %9.1f %6d %6d  %s' % (site['seconds'], site['calls'],
+                                                                 len(site['tests']), site['site']))
+        terminalreporter.write_line('Tests sleeping the most:')
+        terminalreporter.write_line('  %9s %9s %9s  %s' % ('slept s', 'test s', 'WAPI s', 'test'))
+        for test in summary['tests'][:self.top]:
+            terminalreporter.write_line('  %9.1f %9.1f %9.1f  %s' % (test['slept'], test['duration'],
+                                                                     test['wapi'], test['test']))
+        if self.path:
+            terminalreporter.write_line('Sleep report: %s' % self.path)
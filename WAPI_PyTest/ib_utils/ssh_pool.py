@@ -0,0 +1,150 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: ssh_pool.py
+#
+# Description:
+#     Shared paramiko connections for the log and validation utilities.
+#     One SSHClient is kept per (host, user, port) with transport
+#     keep-alive; every exec_command opens a new channel on the same
+#     transport, so the key exchange and authentication happen once per
+#     host. The RSA private key is read from disk once. Connections are
+#     closed at interpreter exit (or by close_all()).
+#
+#
+# Input Options:
+#        import ib_utils.ssh_pool as ssh_pool
+#        client = ssh_pool.get_client(config.grid_vip)
+#        output = ssh_pool.exec_command(config.grid_vip, "ls /root")
+#        sftp = ssh_pool.get_sftp(config.grid_vip)
+#        ssh_pool.close_all()
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import atexit
+import logging
+import os
+import threading
+import paramiko
+import config
+from paramiko import client
+
+KEY_FILE = getattr(config, 'ssh_key_file', '~/.ssh/id_rsa')
+KEEPALIVE = getattr(config, 'ssh_keepalive', 30)
+
+_keys = {}
+_clients = {}
+_sftp = {}
+_connecting = {}
+_lock = threading.RLock()
+
+
+def private_key(key_file=KEY_FILE):
+    '''
+    Parsed RSA key, loaded from disk on first use only.
+    '''
+    with _lock:
+        if key_file not in _keys:
+            _keys[key_file] = paramiko.RSAKey.from_private_key_file(os.path.expanduser(key_file))
+        return _keys[key_file]
+
+
+def is_active(ssh_client):
+    transport = ssh_client.get_transport()
+    return transport is not None and transport.is_active()
+
+
+def connect_lock(key):
+    '''
+    Lock of one (address, username, port): a host is connected once while
+    other hosts connect at the same time.
+    '''
+    with _lock:
+        return _connecting.setdefault(key, threading.Lock())
+
+
+def get_client(address, username='root', password=None, port=22):
+    '''
+    Connected SSHClient for (address, username, port), reconnected when the
+    cached transport is gone. Without password the cached RSA key is used.
+    '''
+    key = (str(address), username, port)
+    with _lock:
+        ssh_client = _clients.get(key)
+    if ssh_client is not None and is_active(ssh_client):
+        return ssh_client
+    with connect_lock(key):
+        # Another thread may have connected while this one waited.
+        with _lock:
+            ssh_client = _clients.get(key)
+        if ssh_client is not None and is_active(ssh_client):
+            return ssh_client
+        if ssh_client is not None:
+            logging.info("SSH connection to %s lost, reconnecting" % address)
+            close(address, username, port)
+        logging.info("connecting to server : %s" % address)
+        ssh_client = client.SSHClient()
+        ssh_client.set_missing_host_key_policy(client.AutoAddPolicy())
+        if password is None:
+            ssh_client.connect(str(address), username=username, port=port, pkey=private_key(),
+                               allow_agent=True, look_for_keys=False)
+        else:
+            ssh_client.connect(str(address), username=username, password=password, port=port)
+        ssh_client.get_transport().set_keepalive(KEEPALIVE)
+        with _lock:
+            _clients[key] = ssh_client
+        return ssh_client
+
+
+def exec_command(address, command, username='root', password=None, port=22):
+    '''
+    Run command on a new channel of the shared connection, return stdout.
+    '''
+    stdin, stdout, stderr = get_client(address, username, password, port).exec_command(command)
+    return stdout.read()
+
+
+def get_sftp(address, username='root', password=None, port=22):
+    '''
+    SFTP session on the shared connection, cached per host.
+    '''
+    key = (str(address), username, port)
+    ssh_client = get_client(address, username, password, port)
+    with connect_lock(key):
+        with _lock:
+            sftp = _sftp.get(key)
+        if sftp is None or sftp.get_channel().closed:
+            sftp = ssh_client.open_sftp()
+            with _lock:
+                _sftp[key] = sftp
+        return sftp
+
+
+def close(address, username='root', port=22):
+    key = (str(address), username, port)
+    with _lock:
+        sftp = _sftp.pop(key, None)
+        ssh_client = _clients.pop(key, None)
+    if sftp is not None:
+        sftp.close()
+    if ssh_client is not None:
+        ssh_client.close()
+
+
+def close_all():
+    '''
+    Close every shared connection, e.g. at the end of a test session.
+    '''
+    with _lock:
+        keys = list(_clients)
+    for address, username, port in keys:
+        close(address, username, port)
+
+
+atexit.register(close_all)
@@ -26,6 +26,7 @@ import time
 import sys
 import socket
 from paramiko import client
+import ib_utils.ssh_pool as ssh_pool
 global host_ip
 host_name = socket.gethostname()
 host_ip = socket.gethostbyname(host_name)
@@ -44,10 +45,7 @@ class SSH:
     client=None
 
     def __init__(self,address):
-        logging.info ("connecting to server \n : ", address)
-        self.client=client.SSHClient()
-        self.client.set_missing_host_key_policy(client.AutoAddPolicy())
-        self.client.connect(host_ip, username='root',password='infoblox',port=22)
+        self.client=ssh_pool.get_client(host_ip, password='infoblox')
 
     def send_command(self,command):
         if(self.client):
@@ -0,0 +1,174 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: suite_history.py
+#
+# Description:
+#     Keeps the duration of every suite and test case of each run.py
+#     execution in a local SQLite database, read from the JUnit XML
+#     reports in WAPI_Test_Reports/XML. The history is used to order
+#     suites longest first, to balance shards and to report suites
+#     which got slower than their trailing median.
+#
+#
+# Input Options:
+#        import ib_utils.suite_history as history
+#        history.record_junit(run_id, "test_natgroup.py", "WAPI_Test_Reports/XML/natgroup.xml")
+#        lst = history.longest_first(lst)
+#        shards = history.shard(lst, 3)
+#        history.print_regressions(run_id)
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import logging
+import sqlite3
+import time
+import config
+import xml.etree.ElementTree as ET
+
+DB_PATH = getattr(config, 'duration_db', 'WAPI_Test_Reports/durations.db')
+WINDOW = 5
+REGRESSION_FACTOR = 1.25
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS suite_durations (
+    run_id TEXT, suite TEXT, duration REAL, tests INTEGER, failures INTEGER, recorded REAL);
+CREATE INDEX IF NOT EXISTS suite_durations_suite ON suite_durations (suite, recorded);
+CREATE TABLE IF NOT EXISTS test_durations (
+    run_id TEXT, suite TEXT, classname TEXT, name TEXT, duration REAL, outcome TEXT);
+CREATE INDEX IF NOT EXISTS test_durations_suite ON test_durations (suite, name);
+'''
+
+
+def connect(db_path=DB_PATH):
+    # One connection per call, run.py records from several worker threads.
+    conn = sqlite3.connect(db_path, timeout=60)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def new_run_id():
+    return time.strftime('%Y%m%d-%H%M%S')
+
+
+def outcome(testcase):
+    for child in testcase:
+        if child.tag in ('failure', 'error', 'skipped'):
+            return child.tag
+    return 'passed'
+
+
+def record_junit(run_id, suite, xml_path, db_path=DB_PATH):
+    '''
+    Store the suite and test case durations of one JUnit XML report.
+    Return the suite duration, None if the report is missing or broken.
+    '''
+    try:
+        root = ET.parse(xml_path).getroot()
+    except (IOError, ET.ParseError) as error:
+        logging.info('No duration recorded for %s: %s' % (suite, error))
+        return None
+    testsuites = [root] if root.tag == 'testsuite' else root.findall('testsuite')
+    duration = sum(float(ts.get('time') or 0) for ts in testsuites)
+    tests = sum(int(ts.get('tests') or 0) for ts in testsuites)
+    failures = sum(int(ts.get('failures') or 0) + int(ts.get('errors') or 0) for ts in testsuites)
+    cases = [(run_id, suite, tc.get('classname'), tc.get('name'), float(tc.get('time') or 0), outcome(tc))
+             for tc in root.iter('testcase')]
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.execute('INSERT INTO suite_durations VALUES (?, ?, ?, ?, ?, ?)',
+                         (run_id, suite, duration, tests, failures, time.time()))
+            conn.executemany('INSERT INTO test_durations VALUES (?, ?, ?, ?, ?, ?)', cases)
+    finally:
+        conn.close()
+    return duration
+
+
+def median(values):
+    values = sorted(values)
+    if not values:
+        return None
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def trailing_medians(window=WINDOW, exclude_run=None, db_path=DB_PATH):
+    '''
+    {suite: median duration of its last window runs}
+    '''
+    conn = connect(db_path)
+    try:
+        rows = conn.execute('SELECT suite, duration FROM suite_durations WHERE run_id IS NOT ? '
+                            'ORDER BY recorded DESC', (exclude_run,)).fetchall()
+    finally:
+        conn.close()
+    durations = {}
+    for suite, duration in rows:
+        if len(durations.setdefault(suite, [])) < window:
+            durations[suite].append(duration)
+    return dict((suite, median(values)) for suite, values in durations.items())
+
+
+def longest_first(suites, db_path=DB_PATH):
+    '''
+    Order suites by decreasing trailing median duration (LPT order).
+    Suites without history go first, their duration is unknown.
+    '''
+    medians = trailing_medians(db_path=db_path)
+    return sorted(suites, key=lambda suite: -medians.get(suite, float('inf')))
+
+
+def shard(suites, count, db_path=DB_PATH):
+    '''
+    Split suites into count shards of similar total duration, giving each
+    suite (longest first) to the least loaded shard.
+    '''
+    medians = trailing_medians(db_path=db_path)
+    known = [d for d in medians.values() if d is not None]
+    default = median(known) if known else 1.0
+    shards = [[] for i in range(count)]
+    loads = [0.0] * count
+    for suite in longest_first(suites, db_path):
+        index = loads.index(min(loads))
+        shards[index].append(suite)
+        loads[index] += medians.get(suite) or default
+    return shards
+
+
+def regressions(run_id, factor=REGRESSION_FACTOR, window=WINDOW, db_path=DB_PATH):
+    '''
+    [(suite, duration in run_id, trailing median)] of the suites which
+    took more than factor times their median of the previous runs.
+    '''
+    medians = trailing_medians(window, exclude_run=run_id, db_path=db_path)
+    conn = connect(db_path)
+    try:
+        rows = conn.execute('SELECT suite, duration FROM suite_durations WHERE run_id = ?', (run_id,)).fetchall()
+    finally:
+        conn.close()
+    slower = []
+    for suite, duration in rows:
+        previous = medians.get(suite)
+        if previous and duration > previous * factor:
+            slower.append((suite, duration, previous))
+    return sorted(slower, key=lambda row: row[2] - row[1])
+
+
+def print_regressions(run_id, factor=REGRESSION_FACTOR, db_path=DB_PATH):
+    slower = regressions(run_id, factor, db_path=db_path)
+    if not slower:
+        print("No suite slower than %.0f%% of its trailing median" % (factor * 100))
+        return slower
+    print("Suites slower than their trailing median:")
+    for suite, duration, previous in slower:
+        print("  %-50s %8.1fs (median %8.1fs, +%.0f%%)" % (suite, duration, previous, (duration / previous - 1) * 100))
+    return slower
@@ -0,0 +1,143 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: suite_scheduler.py
+#
+# Description:
+#     Runs test suites on a pool of worker threads. Every suite holds a
+#     set of resource locks (e.g. "grid:dns", "zone_auth") while it runs
+#     and two suites sharing a resource never run at the same time. A
+#     suite with no declared resources locks "*", which conflicts with
+#     every other suite, so undeclared suites still run alone.
+#
+#
+# Input Options:
+#        import ib_utils.suite_scheduler as scheduler
+#        resources = scheduler.load_resources("suite_resources.txt")
+#        scheduler.run_suites(lst, run_suite, workers=4, resources=resources)
+#
+#    suite_resources.txt format, one suite per line:
+#        test_smartfolder_global.py: smartfolder:global
+#        test_record_dname.py: zone_auth record:dname
+#        test_upgrade_status.py:                      (read-only, no lock)
+#  Output:
+#    {suite: return value of run_suite}
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import logging
+import sys
+import threading
+import time
+
+EXCLUSIVE = '*'
+
+
+def load_resources(filename):
+    '''
+    Parse the suite resource file into {suite: set of resources}.
+    Missing file means every suite is exclusive.
+    '''
+    resources = {}
+    try:
+        fobj = open(filename, 'r')
+    except IOError:
+        return resources
+    with fobj:
+        for line in fobj:
+            line = line.split('#', 1)[0].strip()
+            if ':' not in line:
+                continue
+            suite, names = line.split(':', 1)
+            resources[suite.strip()] = set(names.split())
+    return resources
+
+
+class Scheduler:
+    '''
+    Hands the next runnable suite (in files.txt order) to idle workers.
+    '''
+    def __init__(self, suites, run_suite, workers, resources):
+        self.pending = list(suites)
+        self.total = len(self.pending)
+        self.run_suite = run_suite
+        self.workers = workers
+        self.resources = resources
+        self.held = {}
+        self.results = {}
+        self.done = 0
+        self.condition = threading.Condition()
+
+    def locks(self, suite):
+        # files.txt lines may carry trailing blanks.
+        return self.resources.get(suite.strip(), set([EXCLUSIVE]))
+
+    def conflicts(self, locks):
+        for held in self.held.values():
+            if EXCLUSIVE in held or EXCLUSIVE in locks or held & locks:
+                return True
+        return False
+
+    def next_suite(self):
+        with self.condition:
+            while self.pending:
+                for suite in self.pending:
+                    locks = self.locks(suite)
+                    if not self.conflicts(locks):
+                        self.pending.remove(suite)
+                        self.held[suite] = locks
+                        self.progress('START', suite)
+                        return suite
+                self.condition.wait()
+            return None
+
+    def finish(self, suite, result, elapsed):
+        with self.condition:
+            del self.held[suite]
+            self.results[suite] = result
+            self.done += 1
+            self.progress('DONE %.0fs' % elapsed, suite)
+            self.condition.notify_all()
+
+    def progress(self, event, suite):
+        line = '[%d/%d done, %d running] %s %s' % (self.done, self.total, len(self.held), event, suite)
+        logging.info(line)
+        print(line)
+        sys.stdout.flush()
+
+    def worker(self):
+        while True:
+            suite = self.next_suite()
+            if suite is None:
+                return
+            start = time.time()
+            try:
+                result = self.run_suite(suite)
+            except Exception as error:
+                logging.info('Suite %s failed to run: %s' % (suite, error))
+                result = error
+            self.finish(suite, result, time.time() - start)
+
+    def run(self):
+        threads = [threading.Thread(target=self.worker) for i in range(max(1, self.workers))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            # join with a timeout so KeyboardInterrupt still reaches the main thread.
+            while thread.is_alive():
+                thread.join(1)
+        return self.results
+
+
+def run_suites(suites, run_suite, workers=1, resources=None):
+    '''
+    Run run_suite(suite) for every suite with at most workers in parallel.
+    '''
+    return Scheduler(suites, run_suite, workers, resources or {}).run()
@@ -0,0 +1,107 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: wait.py
+#
+# Description:
+#     Polls a condition until it holds instead of sleeping for the worst
+#     case. The poll interval grows exponentially (with jitter) up to
+#     max_interval and the wait gives up at the deadline. Time spent and
+#     number of polls of every wait are logged and the latest waits are
+#     kept in wait.history.
+#
+#
+# Input Options:
+#        import ib_utils.wait as wait
+#        wait.wait_until(lambda: is_grid_alive(vip), timeout=600, description="grid up")
+#        wait.wait_until(predicate, timeout, initial_interval, max_interval, jitter)
+#  Output:
+#    Value returned by the predicate once it is true.
+#    WaitTimeout raised at the deadline (None with raise_on_timeout=False).
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import logging
+import random
+import time
+import config
+from collections import deque
+
+HISTORY_SIZE = getattr(config, 'wait_history_size', 1000)
+
+history = deque(maxlen=HISTORY_SIZE)
+
+
+class WaitTimeout(Exception):
+    '''
+    Raised when the condition is still false at the deadline.
+    '''
+    def __init__(self, description, elapsed, polls):
+        Exception.__init__(self, 'Timed out after %.1f s (%d polls) waiting for %s' % (elapsed, polls, description))
+        self.elapsed = elapsed
+        self.polls = polls
+
+
+class WaitStats:
+    '''
+    Metrics of one wait_until call.
+    '''
+    def __init__(self, description, elapsed, polls, succeeded):
+        self.description = description
+        self.elapsed = elapsed
+        self.polls = polls
+        self.succeeded = succeeded
+
+    def __repr__(self):
+        return '<WaitStats %s: %.1f s, %d polls, %s>' % (self.description, self.elapsed, self.polls,
+                                                      'ok' if self.succeeded else 'timeout')
+
+
+def wait_until(predicate, timeout=300, initial_interval=1, max_interval=30, jitter=0.1, \
+               backoff=2, description=None, ignore=(), raise_on_timeout=True):
+    '''
+    Call predicate until it returns a true value and return that value.
+    The first call is immediate, the following ones are spaced by
+    initial_interval * backoff**n (capped at max_interval) +/- jitter
+    (fraction of the interval). Exceptions of the types in ignore count
+    as a false result, e.g. ignore=(Exception,) while a grid reboots.
+    '''
+    description = description or getattr(predicate, '__name__', 'condition')
+    start = time.time()
+    deadline = start + timeout
+    interval = initial_interval
+    polls = 0
+    while True:
+        polls += 1
+        try:
+            value = predicate()
+        except ignore as error:
+            logging.info('Waiting for %s: %s' % (description, error))
+            value = None
+        elapsed = time.time() - start
+        if value:
+            record(description, elapsed, polls, True)
+            return value
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            record(description, elapsed, polls, False)
+            if raise_on_timeout:
+                raise WaitTimeout(description, elapsed, polls)
+            return None
+        delay = interval * (1 + random.uniform(-jitter, jitter))
+        time.sleep(max(0, min(delay, remaining)))
+        interval = min(interval * backoff, max_interval)
+
+
+def record(description, elapsed, polls, succeeded):
+    stats = WaitStats(description, elapsed, polls, succeeded)
+    history.append(stats)
+    logging.info('Waited %.1f s (%d polls) for %s: %s' % (elapsed, polls, description,
+                                                          'done' if succeeded else 'timed out'))
+    return stats
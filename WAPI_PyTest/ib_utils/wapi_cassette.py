@@ -0,0 +1,207 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: wapi_cassette.py
+#
+# Description:
+#     Record/replay of WAPI calls for ib_NIOS.wapi_request. In record
+#     mode every request/response pair is kept and appended to a gzip
+#     JSON lines cassette at exit; in replay mode responses come from the
+#     cassette and nothing is sent. Requests are keyed by a hash of the
+#     method, the URL with sorted query arguments, the body with sorted
+#     JSON keys, the user and the running pytest test, so the lookup is
+#     one dict access. A request repeated in a test gets its recorded
+#     responses in order. Every entry carries the id of the recording
+#     session; when a request was recorded again (e.g. a re-recorded
+#     test), replay only uses the entries of the latest session.
+#
+#     WAPI_CASSETTE_MODE=record|replay  (config.wapi_cassette_mode)
+#     WAPI_CASSETTE=<file>               (config.wapi_cassette)
+#
+#
+# Input Options:
+#        WAPI_CASSETTE_MODE=record WAPI_CASSETTE=/tmp/run.gz python run.py ...
+#        WAPI_CASSETTE_MODE=replay WAPI_CASSETTE=/tmp/run.gz py.test suites/...
+#
+#        import ib_utils.wapi_cassette as wapi_cassette
+#        response = wapi_cassette.request(session, 'GET', url, '', 'application/json')
+#  Output:
+#    Response with status, reason, read() and getheader()
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import atexit
+import fcntl
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import urllib
+import urlparse
+import uuid
+import config
+import ib_utils.wapi_metrics as wapi_metrics
+
+MODE = os.environ.get('WAPI_CASSETTE_MODE') or getattr(config, 'wapi_cassette_mode', None)
+PATH = os.environ.get('WAPI_CASSETTE') or getattr(config, 'wapi_cassette', 'wapi_cassette.jsonl.gz')
+
+
+class CassetteMiss(Exception):
+    pass
+
+
+class RecordedResponse:
+    '''
+    Response read back from a cassette, as wapi_pool.BufferedResponse.
+    '''
+    def __init__(self, status, reason, body):
+        self.status = status
+        self.reason = reason
+        self.body = body
+
+    def read(self):
+        return self.body
+
+    def getheader(self, name, default=None):
+        return default
+
+    def getheaders(self):
+        return []
+
+
+def normalize_url(url):
+    path, _, query = url.partition('?')
+    if not query:
+        return path
+    return path + '?' + urllib.urlencode(sorted(urlparse.parse_qsl(query, keep_blank_values=True)))
+
+
+def normalize_body(body):
+    if not body:
+        return ''
+    try:
+        return json.dumps(json.loads(body), sort_keys=True, separators=(',', ':'))
+    except ValueError:
+        return body
+
+
+def make_key(operation, url, body, user, test=None):
+    test = wapi_metrics.current_test() if test is None else test
+    text = '\n'.join([operation.upper(), normalize_url(url), normalize_body(body), user, test])
+    return hashlib.sha1(text.encode('utf-8') if isinstance(text, unicode) else text).hexdigest()
+
+
+class Cassette:
+    '''
+    Recorded interactions indexed {key: [responses]}; replay keeps one
+    position per key.
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.session = uuid.uuid4().hex
+        self.index = {}
+        self.positions = {}
+        self.recorded = []
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            raise CassetteMiss('WAPI cassette %s does not exist' % self.path)
+        sessions = {}
+        with gzip.open(self.path, 'rb') as cassette:
+            try:
+                for line in cassette:
+                    entry = json.loads(line)
+                    key = entry['key']
+                    # Sessions are saved in order, a later one recording
+                    # the key replaces the earlier entries.
+                    if sessions.get(key, entry.get('session')) != entry.get('session'):
+                        del self.index[key]
+                    sessions[key] = entry.get('session')
+                    self.index.setdefault(key, []).append(entry)
+            except (IOError, EOFError) as error:
+                # A recording interrupted while writing its gzip member.
+                logging.info('WAPI cassette %s is truncated: %s' % (self.path, error))
+        logging.info('WAPI cassette %s: %d requests loaded' % (self.path, len(self.index)))
+        return self
+
+    def replay(self, operation, url, body, user):
+        key = make_key(operation, url, body, user)
+        with self.lock:
+            entries = self.index.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMiss('No recorded response for %s %s %s (user %s, test %s)' %
+                                   (operation, url, body, user, wapi_metrics.current_test()))
+            position = self.positions.get(key, 0)
+            self.positions[key] = position + 1
+            self.hits += 1
+        entry = entries[min(position, len(entries) - 1)]
+        return RecordedResponse(entry['status'], entry['reason'], entry['body'].encode('utf-8'))
+
+    def record(self, operation, url, body, user, response):
+        entry = {'key': make_key(operation, url, body, user), 'session': self.session, 'method': operation,
+                 'url': url, 'status': response.status, 'reason': response.reason,
+                 'body': response.read().decode('utf-8', 'replace')}
+        with self.lock:
+            self.recorded.append(entry)
+
+    def save(self):
+        '''
+        Append the recorded interactions as one gzip member, under a lock
+        so parallel suites recording into the same file do not interleave.
+        '''
+        with self.lock:
+            recorded, self.recorded = self.recorded, []
+        if not recorded:
+            return
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode='wb') as member:
+            for entry in recorded:
+                member.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        with open(self.path, 'ab') as cassette:
+            fcntl.flock(cassette, fcntl.LOCK_EX)
+            try:
+                cassette.write(buffer.getvalue())
+            finally:
+                fcntl.flock(cassette, fcntl.LOCK_UN)
+        logging.info('WAPI cassette %s: %d requests recorded' % (self.path, len(recorded)))
+
+
+_cassette = []
+_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    with _cassette_lock:
+        if not _cassette:
+            cassette = Cassette(PATH)
+            if MODE == 'replay':
+                cassette.load()
+            else:
+                atexit.register(cassette.save)
+            _cassette.append(cassette)
+        return _cassette[0]
+
+
+def request(session, operation, url, fields, content_type):
+    '''
+    session.request() recorded or replayed according to MODE.
+    '''
+    if MODE == 'replay':
+        return get_cassette().replay(operation, url, fields, session.user)
+    response = session.request(operation, url, fields, content_type)
+    if MODE == 'record':
+        get_cassette().record(operation, url, fields, session.user, response)
+    return response
@@ -0,0 +1,196 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: wapi_metrics.py
+#
+# Description:
+#     Per-call WAPI instrumentation. ib_NIOS.wapi_request hands every
+#     finished call to the registered hooks as a WapiCall (method, object
+#     type, _function, status, bytes in/out, connect/TLS/first byte/total
+#     seconds, owning pytest test). Nothing is measured while no hook is
+#     registered. Stats aggregates calls into latency histograms with
+#     p50/p95/p99, see wapi_timing_plugin for the pytest report.
+#
+#
+# Input Options:
+#        import ib_utils.wapi_metrics as wapi_metrics
+#        calls = []
+#        wapi_metrics.add_hook(calls.append)
+#        ...
+#        wapi_metrics.remove_hook(calls.append)
+#        stats = wapi_metrics.Stats()
+#        for call in calls: stats.add(call)
+#        print stats.summary()
+#  Output:
+#    WapiCall objects, Stats.summary() dict
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import logging
+import math
+import os
+import re
+import threading
+
+# Upper bounds of the latency histogram buckets, in milliseconds.
+BUCKETS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+PATH_PATTERN = re.compile(r'^/wapi/v[^/]+/([^?]*)(?:\?(.*))?$')
+FUNCTION_PATTERN = re.compile(r'(?:^|&)_function=([^&]*)')
+
+hooks = []
+
+
+def add_hook(hook):
+    hooks.append(hook)
+
+
+def remove_hook(hook):
+    if hook in hooks:
+        hooks.remove(hook)
+
+
+def current_test():
+    # Set by pytest while a test runs, e.g. "suites/x.py::T::test_1 (call)".
+    return os.environ.get('PYTEST_CURRENT_TEST', '').rsplit(' ', 1)[0]
+
+
+class WapiCall:
+    def __init__(self, method, object_type, function, status, bytes_in, bytes_out,
+                 connect, tls, first_byte, total, test, grid_vip=None):
+        self.method = method
+        self.object_type = object_type
+        self.function = function
+        self.status = status
+        self.bytes_in = bytes_in
+        self.bytes_out = bytes_out
+        self.connect = connect
+        self.tls = tls
+        self.first_byte = first_byte
+        self.total = total
+        self.test = test
+        self.grid_vip = grid_vip
+
+    def __repr__(self):
+        return '<WapiCall %s %s%s %s %.3fs>' % (self.method, self.object_type,
+                                               '?_function=' + self.function if self.function else '',
+                                               self.status, self.total)
+
+
+def record(operation, url, body, response, total, grid_vip=None):
+    '''
+    Build the WapiCall of a finished wapi_request and pass it to the hooks.
+    '''
+    match = PATH_PATTERN.match(url)
+    target, query = match.groups() if match else (url, None)
+    function = FUNCTION_PATTERN.search(query or '')
+    timing = getattr(response, 'timing', None) or {}
+    call = WapiCall(operation, target.split('/', 1)[0], function.group(1) if function else None,
+                    response.status, len(response.read()), len(body or ''),
+                    timing.get('connect', 0.0), timing.get('tls', 0.0), timing.get('first_byte', 0.0),
+                    total, current_test(), grid_vip)
+    for hook in list(hooks):
+        try:
+            hook(call)
+        except Exception as error:
+            logging.info('WAPI metrics hook %r failed: %s' % (hook, error))
+    return call
+
+
+def percentile(values, fraction):
+    '''
+    Nearest-rank percentile of sorted values.
+    '''
+    if not values:
+        return 0.0
+    return values[max(0, int(math.ceil(fraction * len(values))) - 1)]
+
+
+class Stats:
+    '''
+    Latency distribution and volume of a group of calls.
+    '''
+    def __init__(self):
+        self.totals = []
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.connect = 0.0
+        self.tls = 0.0
+        self.first_byte = 0.0
+
+    def add(self, call):
+        self.totals.append(call.total)
+        if call.status >= 400:
+            self.errors += 1
+        self.bytes_in += call.bytes_in
+        self.bytes_out += call.bytes_out
+        self.connect += call.connect
+        self.tls += call.tls
+        self.first_byte += call.first_byte
+
+    @property
+    def count(self):
+        return len(self.totals)
+
+    @property
+    def total(self):
+        return sum(self.totals)
+
+    def histogram(self):
+        counts = [0] * (len(BUCKETS) + 1)
+        for total in self.totals:
+            index = 0
+            while index < len(BUCKETS) and total * 1000 > BUCKETS[index]:
+                index += 1
+            counts[index] += 1
+        labels = ['<=%dms' % bucket for bucket in BUCKETS] + ['>%dms' % BUCKETS[-1]]
+        return dict((label, count) for label, count in zip(labels, counts) if count)
+
+    def summary(self):
+        totals = sorted(self.totals)
+        return {'count': self.count, 'errors': self.errors, 'total': round(self.total, 6),
+                'mean': round(self.total / self.count, 6) if self.count else 0.0,
+                'p50': round(percentile(totals, 0.50), 6), 'p95': round(percentile(totals, 0.95), 6),
+                'p99': round(percentile(totals, 0.99), 6), 'max': round(totals[-1], 6) if totals else 0.0,
+                'bytes_in': self.bytes_in, 'bytes_out': self.bytes_out,
+                'connect': round(self.connect, 6), 'tls': round(self.tls, 6),
+                'first_byte': round(self.first_byte, 6), 'histogram': self.histogram()}
+
+
+class Aggregator:
+    '''
+    Stats of calls grouped by test, suite (test file), object type and
+    function.
+    '''
+    def __init__(self):
+        self.groups = {'tests': {}, 'suites': {}, 'object_types': {}, 'functions': {}}
+        self.overall = Stats()
+        self.lock = threading.Lock()
+
+    def add(self, call):
+        test = call.test or '<session>'
+        keys = {'tests': test, 'suites': test.split('::', 1)[0], 'object_types': call.object_type,
+                'functions': '%s.%s' % (call.object_type, call.function) if call.function else None}
+        with self.lock:
+            for group, key in keys.items():
+                if key is not None:
+                    self.groups[group].setdefault(key, Stats()).add(call)
+            self.overall.add(call)
+
+    def slowest(self, group, count=10):
+        '''
+        [(key, Stats)] of group with the most time spent, slowest first.
+        '''
+        return sorted(self.groups[group].items(), key=lambda item: -item[1].total)[:count]
+
+    def summary(self):
+        result = {'overall': self.overall.summary()}
+        for group, stats in self.groups.items():
+            result[group] = dict((key, value.summary()) for key, value in stats.items())
+        return result
@@ -0,0 +1,242 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: wapi_pool.py
+#
+# Description:
+#     Keep-alive HTTPS connection pool used by ib_NIOS.wapi_request.
+#     One pool is kept per (grid_vip, user), idle connections are reused
+#     for later WAPI calls instead of doing a new TCP + TLS handshake.
+#
+#
+# Input Options:
+#        import ib_utils.wapi_pool as wapi_pool
+#        pool = wapi_pool.get_pool(config.grid_vip, config.username)
+#        response = pool.request('GET', url, body, headers)
+#        wapi_pool.close_all()
+#  Output:
+#    Buffered response object with status, reason, read() and getheader()
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import atexit
+import httplib
+import logging
+import select
+import socket
+import ssl
+import threading
+import time
+import config
+
+POOL_SIZE = getattr(config, 'wapi_pool_size', 4)
+POOL_IDLE_TIMEOUT = getattr(config, 'wapi_pool_idle_timeout', 60)
+POOL_TIMEOUT = getattr(config, 'wapi_pool_timeout', None)
+
+# Errors raised by httplib when a kept-alive socket was closed by the server.
+CONNECTION_ERRORS = (httplib.BadStatusLine, httplib.CannotSendRequest,
+                     httplib.ResponseNotReady, socket.error, ssl.SSLError)
+# Requests sent again when the response was lost, replaying anything else
+# may apply it twice (e.g. a POST creating duplicates).
+RETRY_METHODS = ('GET', 'HEAD')
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class BufferedResponse:
+    '''
+    Fully read WAPI response.
+    The body is read before the connection goes back to the pool, so the
+    handle_success/handle_exception helpers in ib_NIOS keep working as is.
+    '''
+    def __init__(self, response):
+        self.status = response.status
+        self.reason = response.reason
+        self.body = response.read()
+        self.headers = response.getheaders()
+        self.msg = response.msg
+        self.will_close = response.will_close
+        # Seconds spent in TCP connect, TLS handshake, waiting for the
+        # status line and in the whole exchange, set by the pool.
+        self.timing = {}
+
+    def read(self):
+        return self.body
+
+    def getheader(self, name, default=None):
+        return self.msg.getheader(name, default)
+
+    def getheaders(self):
+        return self.headers
+
+
+class TimedHTTPSConnection(httplib.HTTPSConnection):
+    '''
+    HTTPSConnection remembering how long the TCP connect and the TLS
+    handshake of its last connect() took.
+    '''
+    connect_time = 0.0
+    tls_time = 0.0
+
+    def connect(self):
+        start = time.time()
+        httplib.HTTPConnection.connect(self)
+        connected = time.time()
+        self.sock = self._context.wrap_socket(self.sock, server_hostname=self._tunnel_host or self.host)
+        self.connect_time = connected - start
+        self.tls_time = time.time() - connected
+
+
+class ConnectionPool:
+    '''
+    Bounded pool of keep-alive HTTPS connections to one grid for one user.
+    '''
+    def __init__(self, grid_vip, maxsize=POOL_SIZE, idle_timeout=POOL_IDLE_TIMEOUT, timeout=POOL_TIMEOUT):
+        self.grid_vip = grid_vip
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        # Idle connections wanted by open concurrent clients, see reserve().
+        self.reserved = 0
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def capacity(self):
+        return max(self.maxsize, self.reserved)
+
+    def reserve(self, count):
+        '''
+        Keep up to count more idle connections until release(count), for
+        a client sending count requests at a time.
+        '''
+        with self.lock:
+            self.reserved += count
+
+    def release(self, count):
+        with self.lock:
+            self.reserved -= count
+            extra = self.idle[self.capacity():]
+            del self.idle[self.capacity():]
+        for conn, last_used in extra:
+            conn.close()
+
+    def new_connection(self):
+        # This class does not perform any verification of the server`s certificate.
+        logging.info('Opening new WAPI connection to %s' % self.grid_vip)
+        return TimedHTTPSConnection(self.grid_vip, timeout=self.timeout,
+                                    context=ssl._create_unverified_context())
+
+    def get_connection(self):
+        '''
+        Return an idle connection (evicting the stale ones) or a new one.
+        Second value tells whether the connection was reused.
+        '''
+        now = time.time()
+        with self.lock:
+            while self.idle:
+                conn, last_used = self.idle.pop()
+                if now - last_used <= self.idle_timeout and not is_dropped(conn):
+                    return conn, True
+                conn.close()
+        return self.new_connection(), False
+
+    def put_connection(self, conn):
+        with self.lock:
+            if len(self.idle) < self.capacity():
+                self.idle.append((conn, time.time()))
+                return
+        conn.close()
+
+    def request(self, operation, url, body, headers):
+        '''
+        Send one request and return a BufferedResponse.
+        A request failing on a reused connection is retried once on a fresh
+        connection, the server may have closed the idle socket meanwhile.
+        Once the request was sent only RETRY_METHODS are retried, the
+        server may have applied it before the connection broke.
+        '''
+        start = time.time()
+        conn, reused = self.get_connection()
+        try:
+            response = self.send(conn, operation, url, body, headers)
+        except CONNECTION_ERRORS as error:
+            conn.close()
+            if not reused or (conn.sent and operation not in RETRY_METHODS):
+                raise
+            logging.info('Stale WAPI connection to %s (%s), reconnecting' % (self.grid_vip, error))
+            conn = self.new_connection()
+            try:
+                response = self.send(conn, operation, url, body, headers)
+            except:
+                conn.close()
+                raise
+        response.timing['total'] = time.time() - start
+        if response.will_close:
+            conn.close()
+        else:
+            self.put_connection(conn)
+        return response
+
+    def send(self, conn, operation, url, body, headers):
+        # httplib connects in request() when the connection is new.
+        conn.connect_time = conn.tls_time = 0.0
+        conn.sent = False
+        conn.request(operation, url, body, headers)
+        conn.sent = True
+        sent = time.time()
+        raw = conn.getresponse()
+        first_byte = time.time() - sent
+        response = BufferedResponse(raw)
+        response.timing = {'connect': conn.connect_time, 'tls': conn.tls_time, 'first_byte': first_byte}
+        return response
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn, last_used in idle:
+            conn.close()
+
+
+def is_dropped(conn):
+    '''
+    True when an idle connection became readable, i.e. the server closed it.
+    '''
+    if conn.sock is None:
+        return False
+    try:
+        return bool(select.select([conn.sock], [], [], 0)[0])
+    except (select.error, socket.error, ValueError):
+        return True
+
+
+def get_pool(grid_vip, user):
+    '''
+    Return the connection pool shared by all calls for (grid_vip, user).
+    '''
+    key = (grid_vip, user)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(grid_vip)
+        return pool
+
+
+def close_all():
+    '''
+    Close every pooled connection, e.g. at the end of a test session.
+    '''
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_all)
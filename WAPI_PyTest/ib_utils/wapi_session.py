@@ -0,0 +1,132 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: wapi_session.py
+#
+# Description:
+#     Caches the WAPI 'ibapauth' session cookie per (grid_vip, user).
+#     The first call logs in with Basic auth, later calls send the cookie
+#     so NIOS does not authenticate the admin again (local, RADIUS,
+#     TACACS+ or LDAP) on every request. On 401 the cookie is dropped and
+#     the call is sent once more with Basic auth.
+#
+#
+# Input Options:
+#        import ib_utils.wapi_session as wapi_session
+#        session = wapi_session.get_session(config.grid_vip, 'admin', 'infoblox')
+#        response = session.request('GET', url, '', 'application/json')
+#        wapi_session.logout_all()
+#  Output:
+#    wapi_pool.BufferedResponse
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import atexit
+import logging
+import re
+import threading
+import config
+import ib_utils.wapi_pool as wapi_pool
+
+SESSION_COOKIE = getattr(config, 'wapi_session_cookie', True)
+COOKIE_PATTERN = re.compile(r'(ibapauth=(?:"[^"]*"|[^;,\s]*))')
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class Session:
+    '''
+    Authenticated WAPI session of one user on one grid.
+    '''
+    def __init__(self, grid_vip, user, password):
+        self.grid_vip = grid_vip
+        self.user = user
+        self.pool = wapi_pool.get_pool(grid_vip, user)
+        self.auth_header = 'Basic %s' % (':'.join([user, password])
+                                         .encode('Base64').strip('\r\n'))
+        self.cookie = None
+
+    def save_cookie(self, response):
+        set_cookie = response.getheader('set-cookie')
+        if not set_cookie:
+            return
+        match = COOKIE_PATTERN.search(set_cookie)
+        if match:
+            self.cookie = match.group(1)
+
+    def send(self, operation, url, fields, content_type, cookie):
+        request_header = {'Content-Type': content_type}
+        if cookie:
+            request_header['Cookie'] = cookie
+        else:
+            request_header['Authorization'] = self.auth_header
+        return self.pool.request(operation, url, fields, request_header)
+
+    def request(self, operation, url, fields, content_type):
+        '''
+        Send the request with the cached cookie, or log in with Basic auth
+        when there is no cookie yet or the server rejected it.
+        '''
+        cookie = self.cookie if SESSION_COOKIE else None
+        response = self.send(operation, url, fields, content_type, cookie)
+        if response.status == 401 and cookie:
+            logging.info('WAPI session of %s on %s expired, logging in again' % (self.user, self.grid_vip))
+            self.cookie = None
+            response = self.send(operation, url, fields, content_type, None)
+        if SESSION_COOKIE:
+            self.save_cookie(response)
+        return response
+
+    def logout(self, path):
+        cookie, self.cookie = self.cookie, None
+        if not cookie:
+            return
+        try:
+            self.send('POST', path + 'logout', '', 'application/json', cookie)
+        except wapi_pool.CONNECTION_ERRORS as error:
+            logging.info('WAPI logout of %s on %s failed: %s' % (self.user, self.grid_vip, error))
+
+
+def get_session(grid_vip, user, password):
+    '''
+    Return the cached session for (grid_vip, user).
+    The password is part of the key so negative tests sending a wrong
+    password never ride on a session opened with the right one.
+    '''
+    key = (grid_vip, user, password)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = Session(grid_vip, user, password)
+        return session
+
+
+def clear_sessions():
+    '''
+    Forget every cached cookie, the next calls log in again.
+    '''
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.cookie = None
+
+
+def logout_all():
+    '''
+    Log every cached session out of WAPI, e.g. at the end of a test session.
+    '''
+    path = '/wapi/v' + config.wapi_version + '/'
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.logout(path)
+
+
+atexit.register(logout_all)
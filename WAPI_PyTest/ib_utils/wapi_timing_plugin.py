@@ -0,0 +1,94 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: wapi_timing_plugin.py
+#
+# Description:
+#     pytest plugin aggregating the WAPI calls of a run (see wapi_metrics)
+#     per test, per suite, per object type and per _function. The p50/
+#     p95/p99 and histograms are written as JSON next to the JUnit XML
+#     (<name>.wapi_timing.json) and the slowest object types and
+#     functions are printed at the end of the session.
+#
+#
+# Input Options:
+#        py.test -p ib_utils.wapi_timing_plugin suites/test_x.py --junit-xml=x.xml
+#        --wapi-timing=<file>      JSON report path (default next to --junit-xml)
+#        --wapi-timing-top=<N>     rows of the end of session tables (default 10)
+#  Output:
+#    JSON report, terminal summary
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import json
+import os
+import ib_utils.wapi_metrics as wapi_metrics
+
+TOP = 10
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('wapi timing')
+    group.addoption('--wapi-timing', action='store', default=None,
+                    help='JSON report of the WAPI call timings (default: next to --junit-xml)')
+    group.addoption('--wapi-timing-top', action='store', type=int, default=TOP,
+                    help='slowest object types and functions listed at the end (default %d)' % TOP)
+
+
+def pytest_configure(config):
+    path = config.getoption('wapi_timing')
+    xmlpath = getattr(config.option, 'xmlpath', None)
+    if not path and xmlpath:
+        path = os.path.splitext(xmlpath)[0] + '.wapi_timing.json'
+    config.pluginmanager.register(WapiTiming(path, config.getoption('wapi_timing_top')), 'wapi_timing')
+
+
+class WapiTiming:
+    def __init__(self, path, top):
+        self.path = path
+        self.top = top
+        self.aggregator = wapi_metrics.Aggregator()
+        # Registered right away, calls made while collecting count too.
+        wapi_metrics.add_hook(self.aggregator.add)
+
+    def pytest_unconfigure(self, config):
+        wapi_metrics.remove_hook(self.aggregator.add)
+
+    def pytest_sessionfinish(self, session):
+        if not self.path or not self.aggregator.overall.count:
+            return
+        with open(self.path, 'w') as report:
+            json.dump(self.aggregator.summary(), report, indent=1, sort_keys=True)
+
+    def table(self, terminalreporter, title, group):
+        terminalreporter.write_line('%s:' % title)
+        terminalreporter.write_line('  %9s %7s %8s %8s %8s %7s  %s' % ('total s', 'calls', 'p50 ms', 'p95 ms',
+                                                                    'p99 ms', 'errors', 'name'))
+        for name, stats in self.aggregator.slowest(group, self.top):
+            summary = stats.summary()
+            terminalreporter.write_line('  %9.2f %7d %8.1f %8.1f %8.1f %7d  %s' % (
+                summary['total'], summary['count'], summary['p50'] * 1000, summary['p95'] * 1000,
+                summary['p99'] * 1000, summary['errors'], name))
+
+    def pytest_terminal_summary(self, terminalreporter):
+        overall = self.aggregator.overall.summary()
+        if not overall['count']:
+            return
+        terminalreporter.write_sep('=', 'WAPI call timing')
+        terminalreporter.write_line('%d calls in %.2fs, p50 %.1fms p95 %.1fms p99 %.1fms, %d errors, '
+                                    '%d bytes in, %d bytes out, %.2fs connecting, %.2fs in TLS handshakes' % (
+                                        overall['count'], overall['total'], overall['p50'] * 1000,
+                                        overall['p95'] * 1000, overall['p99'] * 1000, overall['errors'],
+                                        overall['bytes_in'], overall['bytes_out'], overall['connect'],
+                                        overall['tls']))
+        self.table(terminalreporter, 'Slowest object types', 'object_types')
+        if self.aggregator.groups['functions']:
+            self.table(terminalreporter, 'Slowest functions', 'functions')
+        if self.path:
+            terminalreporter.write_line('WAPI timing report: %s' % self.path)
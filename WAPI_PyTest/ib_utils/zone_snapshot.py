@@ -0,0 +1,186 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: zone_snapshot.py
+#
+# Description:
+#     Pulls a whole zone from a member with one AXFR and keeps it as an
+#     index {(name, type): set of rdata}. The transfer is parsed message
+#     by message while it streams in, only the index is kept. Snapshots
+#     are diffed against the records WAPI holds for the zone or against
+#     another snapshot, e.g. taken before and after an operation.
+#
+#
+# Input Options:
+#        import ib_utils.zone_snapshot as zone_snapshot
+#        before = zone_snapshot.take("dnssec.test.com", config.grid_member1_vip)
+#        ... operation ...
+#        after = zone_snapshot.take("dnssec.test.com", config.grid_member1_vip)
+#        print zone_snapshot.diff(before, after).report()
+#        assert zone_snapshot.diff_wapi(after)
+#  Output:
+#    Snapshot, SnapshotDiff (added, removed), true when nothing differs
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import logging
+import socket
+import time
+import config
+import ib_utils.ib_NIOS as ib_NIOS
+import ib_utils.dns_query as dns_query
+import ib_utils.zone_verify as zone_verify
+
+TIMEOUT = 30
+# Generated by the member, WAPI allrecords does not list them.
+SERVER_TYPES = ('SOA', 'RRSIG', 'NSEC', 'NSEC3', 'NSEC3PARAM', 'DNSKEY')
+
+
+def transfer(server, zone, port=dns_query.PORT, timeout=TIMEOUT):
+    '''
+    Generator over the RRs of an AXFR of zone, the closing SOA excluded.
+    '''
+    sock = socket.create_connection((str(server), port), timeout)
+    try:
+        dns_query.send_tcp(sock, dns_query.make_query(zone, 'AXFR', recursion=False, payload=0))
+        soa_count = 0
+        while soa_count < 2:
+            response = dns_query.Message(dns_query.recv_tcp(sock))
+            if response.rcode != 'NOERROR':
+                raise dns_query.DNSError('AXFR of %s from %s: %s' % (zone, server, response.rcode))
+            for rr in response.answer:
+                if rr.type == 'SOA':
+                    soa_count += 1
+                    if soa_count == 2:
+                        break
+                elif soa_count == 0:
+                    raise dns_query.DNSError('AXFR of %s does not start with the SOA' % zone)
+                yield rr
+    finally:
+        sock.close()
+
+
+def key(name, rtype):
+    return dns_query.absolute(name).lower(), rtype.upper()
+
+
+class Snapshot:
+    '''
+    Content of a zone at one point in time, index[(name, TYPE)] holds the
+    normalized rdata texts (see zone_verify.normalize).
+    '''
+    def __init__(self, zone, server):
+        self.zone = dns_query.absolute(zone).lower()
+        self.server = str(server)
+        self.taken = time.time()
+        self.serial = None
+        self.records = 0
+        self.index = {}
+
+    def add(self, rr):
+        if rr.type == 'SOA' and self.serial is None:
+            self.serial = rr.fields[2]
+        values = self.index.setdefault(key(rr.name, rr.type), set())
+        values.add(zone_verify.normalize(rr.type.lower(), rr.rdata))
+        self.records += 1
+
+    def get(self, name, rtype):
+        return self.index.get(key(name, rtype), set())
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name_type):
+        return key(*name_type) in self.index
+
+    def __repr__(self):
+        return '<Snapshot %s serial %s: %d records, %d RRsets>' % (self.zone, self.serial, self.records, len(self.index))
+
+
+def take(zone, server=None, port=dns_query.PORT, timeout=TIMEOUT):
+    '''
+    Snapshot of zone transferred from server (default config.grid_vip).
+    '''
+    start = time.time()
+    snapshot = Snapshot(zone, server or config.grid_vip)
+    for rr in transfer(snapshot.server, zone, port, timeout):
+        snapshot.add(rr)
+    logging.info('%r in %.1fs' % (snapshot, time.time() - start))
+    return snapshot
+
+
+class SnapshotDiff:
+    '''
+    added and removed map (name, TYPE) to the rdata found only on one
+    side. An empty set means the whole RRset, when its values are not
+    known (allrecords).
+    '''
+    def __init__(self, added, removed):
+        self.added = added
+        self.removed = removed
+
+    @property
+    def ok(self):
+        return not (self.added or self.removed)
+
+    def __nonzero__(self):
+        return self.ok
+    __bool__ = __nonzero__
+
+    def report(self):
+        lines = ['%d RRsets added, %d removed' % (len(self.added), len(self.removed))]
+        for sign, changes in (('+', self.added), ('-', self.removed)):
+            for (name, rtype), values in sorted(changes.items()):
+                lines.extend('%s %s %s %s' % (sign, name, rtype, value) for value in sorted(values) or ['*'])
+        return '\n'.join(lines)
+
+
+def diff_index(before, after):
+    added = {}
+    removed = {}
+    for name_type in set(before) | set(after):
+        old = before.get(name_type)
+        new = after.get(name_type)
+        if old is None:
+            added[name_type] = set(new)
+        elif new is None:
+            removed[name_type] = set(old)
+        elif old and new and old != new:
+            # An empty side only asks for the RRset to exist.
+            if new - old:
+                added[name_type] = new - old
+            if old - new:
+                removed[name_type] = old - new
+    return SnapshotDiff(added, removed)
+
+
+def diff(before, after, exclude=()):
+    '''
+    What changed from snapshot before to snapshot after.
+    '''
+    exclude = set(rtype.upper() for rtype in exclude)
+    return diff_index(dict(item for item in before.index.items() if item[0][1] not in exclude),
+                      dict(item for item in after.index.items() if item[0][1] not in exclude))
+
+
+def diff_wapi(snapshot, records=None, exclude=SERVER_TYPES):
+    '''
+    Snapshot against the WAPI records of its zone (default: the paged
+    allrecords listing). added: served only, removed: in WAPI only.
+    '''
+    zone = snapshot.zone.rstrip('.')
+    if records is None:
+        records = ib_NIOS.iter_objects('allrecords?zone=' + zone)
+    expected = zone_verify.expected_records(records, zone)[0]
+    wapi = {}
+    for (name, rtype), values in expected.items():
+        wapi[key(name, rtype)] = values or set()
+    exclude = set(rtype.upper() for rtype in exclude)
+    served = dict(item for item in snapshot.index.items() if item[0][1] not in exclude)
+    return diff_index(wapi, served)
@@ -0,0 +1,183 @@
+########################################################################
+#                                                                      #
+# Copyright (c) Infoblox Inc., 2019                                    #
+#                                                                      #
+########################################################################
+#
+# File: zone_verify.py
+#
+# Description:
+#     Checks that a DNS member serves the records WAPI holds for a zone.
+#     The WAPI records are grouped by (name, type), all the questions are
+#     sent at once with dns_query.query_many and the served RRsets are
+#     compared with the expected values. Records read from allrecords
+#     carry no value, for them only the presence of the RRset is checked.
+#
+#
+# Input Options:
+#        import ib_utils.zone_verify as zone_verify
+#        diff = zone_verify.verify_zone("zone106.com")
+#        records = ib_NIOS.iter_objects("record:a?zone=zone106.com")
+#        diff = zone_verify.verify_records(records, server=config.grid_member1_vip)
+#        assert diff, diff.report()
+#  Output:
+#    ZoneDiff (missing, unexpected, errors, skipped), true when the
+#    served data matches
+#
+#
+# History:
+#    18/10/2026 - Created
+########################################################################
+
+import logging
+import socket
+import config
+import ib_utils.ib_NIOS as ib_NIOS
+import ib_utils.dns_query as dns_query
+
+# WAPI record type -> expected rdata text, as dns_query prints it.
+RECORD_VALUES = {
+    'a': lambda r: r['ipv4addr'],
+    'aaaa': lambda r: socket.inet_ntop(socket.AF_INET6, socket.inet_pton(socket.AF_INET6, r['ipv6addr'])),
+    'cname': lambda r: dns_query.absolute(r['canonical']),
+    'dname': lambda r: dns_query.absolute(r['target']),
+    'ptr': lambda r: dns_query.absolute(r['ptrdname']),
+    'ns': lambda r: dns_query.absolute(r['nameserver']),
+    'mx': lambda r: '%s %s' % (r['preference'], dns_query.absolute(r['mail_exchanger'])),
+    'srv': lambda r: '%s %s %s %s' % (r['priority'], r['weight'], r['port'], dns_query.absolute(r['target'])),
+    'txt': lambda r: txt_value(r['text']),
+}
+
+# allrecords types which are served under another DNS type.
+DNS_TYPES = {'host_ipv4addr': 'a', 'host_ipv6addr': 'aaaa'}
+
+
+def normalize(rtype, value):
+    # Names compare case insensitively, TXT data does not.
+    return value if rtype == 'txt' else value.lower()
+
+
+def txt_value(text):
+    if text.startswith('"'):
+        return text
+    return ' '.join(dns_query.quote(text[i:i + 255]) for i in range(0, max(len(text), 1), 255))
+
+
+def record_type(record):
+    '''
+    DNS type of a WAPI record:* or allrecords object, e.g. 'a'.
+    '''
+    wapi_type = record.get('type') or record['_ref'].split('/', 1)[0]
+    wapi_type = wapi_type.split(':', 1)[-1].lower()
+    return DNS_TYPES.get(wapi_type, wapi_type)
+
+
+def record_name(record, zone=None):
+    '''
+    Absolute owner name. allrecords names are relative to their zone.
+    '''
+    name = record.get('name', '')
+    zone = record.get('zone') or zone
+    if record.get('_ref', '').startswith('allrecords') and zone:
+        name = '.'.join(label for label in (name, zone) if label and label != '@')
+    return dns_query.absolute(name).lower()
+
+
+def expected_records(records, zone=None):
+    '''
+    ({(name, type): set of expected values, None when unknown}, skipped)
+    '''
+    expected = {}
+    skipped = []
+    for record in records:
+        rtype = record_type(record)
+        try:
+            dns_query.type_code(rtype)
+        except dns_query.DNSError:
+            skipped.append(record)
+            continue
+        values = expected.setdefault((record_name(record, zone), rtype), set())
+        if rtype in RECORD_VALUES and values is not None:
+            try:
+                values.add(normalize(rtype, RECORD_VALUES[rtype](record)))
+                continue
+            except KeyError:
+                pass
+        expected[(record_name(record, zone), rtype)] = None
+    return expected, skipped
+
+
+class ZoneDiff:
+    '''
+    missing: (name, type, value) expected but not served, value None when
+    the whole RRset is absent. unexpected: (name, type, value) served but
+    not in WAPI. errors: (name, type, error) for unanswered queries.
+    '''
+    def __init__(self, checked, missing, unexpected, errors, skipped):
+        self.checked = checked
+        self.missing = missing
+        self.unexpected = unexpected
+        self.errors = errors
+        self.skipped = skipped
+
+    @property
+    def ok(self):
+        return not (self.missing or self.unexpected or self.errors)
+
+    def __nonzero__(self):
+        return self.ok
+    __bool__ = __nonzero__
+
+    def report(self):
+        lines = ['%d RRsets checked, %d missing, %d unexpected, %d errors' %
+                 (self.checked, len(self.missing), len(self.unexpected), len(self.errors))]
+        lines.extend('missing    %s %s %s' % row for row in self.missing)
+        lines.extend('unexpected %s %s %s' % row for row in self.unexpected)
+        lines.extend('error      %s %s %s' % row for row in self.errors)
+        return '\n'.join(lines)
+
+
+def verify_records(records, server=None, zone=None, port=dns_query.PORT, **options):
+    '''
+    Query server (default config.grid_vip) for every (name, type) of the
+    WAPI records at once and diff the answers against them. options go
+    to dns_query.query_many (timeout, retries, sockets, window).
+    '''
+    server = server or config.grid_vip
+    expected, skipped = expected_records(records, zone)
+    questions = sorted(expected)
+    responses = dns_query.query_many(server, questions, port, recursion=False, **options)
+    missing = []
+    unexpected = []
+    errors = []
+    for (name, rtype), response in zip(questions, responses):
+        values = expected[(name, rtype)]
+        if isinstance(response, dns_query.DNSError):
+            errors.append((name, rtype, str(response)))
+            continue
+        if response.rcode not in ('NOERROR', 'NXDOMAIN'):
+            errors.append((name, rtype, response.rcode))
+            continue
+        rrset = response.rrset(name, rtype)
+        if rrset is None:
+            missing.append((name, rtype, None))
+            continue
+        if values is None:
+            continue
+        served = set(normalize(rtype, rdata) for rdata in rrset.rdatas)
+        missing.extend((name, rtype, value) for value in sorted(values - served))
+        unexpected.extend((name, rtype, value) for value in sorted(served - values))
+    diff = ZoneDiff(len(questions), missing, unexpected, errors, skipped)
+    logging.info(diff.report())
+    return diff
+
+
+def verify_zone(zone, server=None, record_types=sorted(RECORD_VALUES), port=dns_query.PORT, **options):
+    '''
+    Read the records of zone from WAPI (paged, one listing per type) and
+    verify them against server.
+    '''
+    records = []
+    for rtype in record_types:
+        records.extend(ib_NIOS.iter_objects('record:%s?zone=%s' % (rtype, zone)))
+    return verify_records(records, server, zone, port, **options)
@@ -10,20 +10,35 @@ from time import sleep
 import ib_utils.ib_papi as papi
 import subprocess
 import ib_utils.ib_conf_gen as conf_gen
+import ib_utils.suite_scheduler as scheduler
+import ib_utils.suite_history as history
 from logger import logger
 os.environ["PYTHONPATH"]=os.getcwd()
 """
    -m : Members separated by ':'  (GridMaster:Member1:Member2:Member3 etc., )
    -v : wapi_version
    -s : clinet_vm:client_ip:client_user:client_user_pw (CLIENT)
+   -j : Number of suites executed in parallel (default 1), see suite_resources.txt
+   --load : WAPI load generation against the grid master instead of the suites (ib_utils/load_gen.py)
+            --rate=<requests/s> (open loop) or --concurrency=<workers>, --ramp=<s>, --duration=<s>,
+            --mix=<operation>=<weight>,... --report=<JSON file>
 """
 args=sys.argv[1:]
-optlist, args = getopt.getopt(args,'m:v:')
+parallel=1
+load=False
+load_options=''
+optlist, args = getopt.getopt(args,'m:v:j:',['load','rate=','concurrency=','ramp=','duration=','mix=','report='])
 for opt, arg in optlist:
     if opt == '-m':
         members=arg
     if opt == '-v':
        wapi_version=arg
+    if opt == '-j':
+       parallel=int(arg)
+    if opt == '--load':
+       load=True
+    if opt in ('--rate','--concurrency','--ramp','--duration','--mix','--report'):
+       load_options+=" "+opt+"="+arg
       #splunk_version,wapi_version=arg.split(':')
 #    if opt == '-s':
 #       client_vm,client_ip,client_user,client_passwd=arg.split(':')
@@ -51,6 +66,12 @@ var_hash["WAPI_VERSION"]=wapi_version
 #logger.info("Generating config.py configuraiotn file")
 rc=conf_gen.config(**var_hash)
 
+if load:
+    # Fresh interpreter, config.py was just regenerated.
+    logger.info("Generating WAPI load on "+master)
+    rc=os.system("python -m ib_utils.load_gen --grid="+master+load_options)
+    sys.exit(1 if rc else 0)
+
 #Addkyes
 logger.info("Adding SSH Keys on Grid Members")
 papi.addkeys(master)
@@ -109,20 +130,21 @@ for line in file:
         lst[i]=line[:-1]
         i = i+1
 print lst
-count = 1
-for item in lst:
+def run_suite(item):
+	count = lst.index(item)+1
 	feature_name = item[5:-3]
 	print feature_name
 	os.system("rm WAPI_Test_Reports/HTML/"+feature_name+".html")
 	os.system("rm WAPI_Test_Reports/XML/"+feature_name+".xml")
 	print "=============== Executing Test Suite : %d ===============" %(count)
-	cmd = "py.test WAPI82_Automation/"+item+" --tb=long --html=WAPI_Test_Reports/HTML/"+feature_name+".html --junit-xml=WAPI_Test_Reports/XML/"+feature_name+".xml -vv"
+	#WAPI call timings and sleep accounting go to WAPI_Test_Reports/XML/<feature>.wapi_timing.json and .sleep.json
+	cmd = "py.test -p ib_utils.wapi_timing_plugin -p ib_utils.sleep_accounting_plugin WAPI82_Automation/"+item+" --tb=long --html=WAPI_Test_Reports/HTML/"+feature_name+".html --junit-xml=WAPI_Test_Reports/XML/"+feature_name+".xml -vv"
 	print cmd 
-	rm = os.system(cmd)
-	count +=1
+	rc = os.system(cmd)
 
 	replace = "sed -i 's/pytest/"+feature_name+"_results/g' WAPI_Test_Reports/XML/"+feature_name+".xml"
 	rm = os.system(replace)
+	history.record_junit(run_id, item, "WAPI_Test_Reports/XML/"+feature_name+".xml")
 	WORKSPACE = os.getenv('WORKSPACE')
 	cp_cmd = "cp  WAPI_Test_Reports/XML/"+feature_name+".xml "+WORKSPACE
         print cp_cmd
@@ -130,3 +152,16 @@ for item in lst:
 	command = '''curl -F "uploadedfile=@%s/%s.xml" -F user=%s -F build="%s" -F tag="WAPI FR" -F product="Core DDI" -F category="NIOS" -F gridip="%s" -F report_url="%s" -F build_url="%s" "http://%s/%s/uploader.php"''' %(WORKSPACE,feature_name,BUILD_USER_ID,Build_Path,Master1_IP,REPORT_URL,BUILD_URL,SERVER_IP,PROJECT_NAME)
 	print command
 	os.system(command) 
+	return rc
+
+#Durations of this run are kept in the suite history database, parallel
+#runs start the longest suites first.
+run_id = history.new_run_id()
+if parallel > 1:
+	lst = history.longest_first(lst)
+
+#Suites sharing a resource from suite_resources.txt never run together,
+#undeclared suites run alone.
+resources = scheduler.load_resources("suite_resources.txt")
+scheduler.run_suites(lst, run_suite, parallel, resources)
+history.print_regressions(run_id)
@@ -25,6 +25,7 @@ from time import sleep
 from scp import SCPClient
 from subprocess import Popen, PIPE
 import ib_utils.ib_NIOS as ib_NIOS
+import ib_utils.wait as wait
 from ib_utils.log_capture import log_action as log
 from ib_utils.log_validation import log_validation as logv
 from ipaddress import ip_address, IPv4Address, IPv6Address
@@ -32,6 +33,11 @@ logging.basicConfig(format='%(asctime)s - %(name)s(%(process)d) - %(levelname)s
 
 global scheduled_time
 
+# Errors is_master may raise while the promoted node reboots (ssh/CLI not up yet).
+PROMOTION_ERRORS = (AssertionError, EnvironmentError, paramiko.SSHException)
+# Seconds the members get to join the new Master.
+MEMBER_JOIN_TIMEOUT = 300
+
 def display_msg(x="",is_dict=False):
     """ 
     This function prints and logs data 'x'.
@@ -77,12 +83,14 @@ def restart_services(grid=config.grid1_master_vip, service=['ALL']):
     get_ref =  ib_NIOS.wapi_request('GET', object_type="grid",grid_vip=grid)
     ref = json.loads(get_ref)[0]['_ref']
     data= {"mode" : "SIMULTANEOUS","restart_option":"FORCE_RESTART","services": service}
+    before = ib_NIOS.restart_status(grid_vip=grid)
     restart = ib_NIOS.wapi_request('POST', object_type = ref + "?_function=restartservices", fields=json.dumps(data),grid_vip=grid)
     if restart != '{}':
         display_msg(restart)
         display_msg("FAIL: Restart services failed, Please debug above error message for root cause")
         assert False
-    sleep(20)
+    elapsed = ib_NIOS.wait_for_restart(grid, before, service)
+    display_msg("Services restarted in %.1f seconds" % elapsed)
 
     
 def generate_token_from_file(filepath, filename,grid=config.grid1_master_vip):
@@ -196,6 +204,7 @@ def is_master(vip=config.grid1_master_vip):
     if status:
         args = "sshpass -p 'infoblox' ssh -o StrictHostKeyChecking=no admin@"+vip
         args=shlex.split(args)
+        child = None
         try:
             child = Popen(args, stdin=PIPE, stdout=PIPE, stderr=PIPE)
             child.stdin.write("show network\n")
@@ -205,7 +214,8 @@ def is_master(vip=config.grid1_master_vip):
             display_msg("FAIL: Debug above exception")
             assert False
         finally:
-            result = child.communicate()
+            if child is not None:
+                result = child.communicate()
         flag = False
         for line in result:
             display_msg(line)
@@ -219,6 +229,17 @@ def is_master(vip=config.grid1_master_vip):
         display_msg("WARNING: Device is not up and running. Please check.")
         return False
 
+def wait_for_master(vip, timeout):
+    """
+    Waits till vip answers ping and reports itself as the Grid Master
+    (is_master checks both), retrying while the node reboots.
+    """
+    display_msg("Waiting till "+vip+" comes up as the new Master")
+    if not wait.wait_until(lambda: is_master(vip), timeout=timeout, initial_interval=30, max_interval=60, \
+                           description="master promotion of "+vip, ignore=PROMOTION_ERRORS, raise_on_timeout=False):
+        display_msg("Giving up after "+str(timeout)+" seconds")
+        assert False
+
 def create_gmc_promotion_group(name,scheduled_time,members=[],gmc_promotion_policy='SIMULTANEOUSLY',grid_master=config.grid1_master_vip):
     """
     Creates GMC Promotion Group with below data
@@ -278,43 +299,57 @@ def get_grid_info(grid=config.grid1_master_vip):
             continue
     return online,offline
 
-def get_online_offline_members(grid=config.grid1_master_vip):
+def is_member_online(member):
+    """
+    True if the NODE_STATUS of the member (node_info) is Running
+    """
+    for node in member["node_info"][:1]:
+        for service in node["service_status"]:
+            if service["service"] == "NODE_STATUS":
+                return service["description"] == "Running"
+    return False
+
+def get_group_members(name, grid=config.grid1_master_vip):
+    """
+    Returns the host names of the members of a GMC group
+    """
+    get_ref = ib_NIOS.wapi_request('GET',object_type="gmcgroup?_return_fields=name,members",grid_vip=grid)
+    if type(get_ref) == tuple:
+        display_msg(get_ref)
+        return []
+    for group in json.loads(get_ref):
+        if group["name"] == name:
+            return [member["member"] for member in group["members"]]
+    return []
+
+def get_online_offline_members(grid=config.grid1_master_vip, group=None, timeout=MEMBER_JOIN_TIMEOUT):
     """
     Returns lists of online and offline members (hostname)
+    Polls the member node_info until WAPI answers on grid and, when group
+    is given, every member of that GMC group is online (or timeout).
     """
-    online = []
-    offline = []
-    sleep(60)
-    try:
+    members = {}
+    def joined():
         response = ib_NIOS.wapi_request('GET',object_type='member?_return_fields=host_name,node_info',grid_vip=grid)
-    except Exception as E:
-        if 'Connection reset by peer' in str(E):
-            display_msg("INFO: Grid is not completely up. Sleeping for 60 seconds.")
-            sleep(60)
-            response = ib_NIOS.wapi_request('GET',object_type='member?_return_fields=host_name,node_info',grid_vip=grid)
-        else:
-            display_msg(E)
-            assert False
-    if type(response) == tuple:
-        display_msg(response)
+        if type(response) == tuple:
+            display_msg(response)
+            return False
+        members['online'] = []
+        members['offline'] = []
+        for member in json.loads(response):
+            members['online' if is_member_online(member) else 'offline'].append(member["host_name"])
+        waiting = [host for host in (get_group_members(group, grid) if group else []) if host not in members['online']]
+        if waiting:
+            display_msg("INFO: Waiting for "+", ".join(waiting)+" to join")
+            return False
+        return True
+    # WAPI resets connections until the new Master is completely up.
+    wait.wait_until(joined, timeout=timeout, initial_interval=10, max_interval=30, \
+                    description="members joining "+grid, ignore=(Exception,), raise_on_timeout=False)
+    if not members:
         display_msg("FAIL: Failed to get member data")
         assert False
-    response = json.loads(response)
-    service_status={}
-    for member in response:
-        if member["node_info"]:
-            for service in member["node_info"][0]["service_status"]:
-                if service["service"] == "NODE_STATUS":
-                    service_status = service
-                    break
-            if service_status:
-                if service_status["description"] == "Running":
-                    online.append(member["host_name"])
-                    flag = True
-                    continue
-            
-        offline.append(member["host_name"])
-    return online,offline
+    return members['online'],members['offline']
 
 class RFE_4753(unittest.TestCase):
 
@@ -626,16 +661,7 @@ class RFE_4753(unittest.TestCase):
             display_msg("FAIL: Failed to start GMC promotion")
             assert False
         
-        count = 0
-        display_msg("Sleeping till Grid comes up")
-        sleep(60)
-        while not is_grid_alive(config.grid1_member1_vip):
-            if count == 4:
-                display_msg("Giving up after 5 tries")
-                assert False
-            display_msg("Sleeping for 1 more minute...")
-            sleep(120)
-            count += 1
+        wait_for_master(config.grid1_member1_vip, 660)
 
         display_msg("---------Test Case 13 Execution Completed----------")
     
@@ -678,7 +704,7 @@ class RFE_4753(unittest.TestCase):
             display_msg("GMC Member "+config.grid_vip+" is not up. Sleeping for 10s ...")
             sleep(10)
             count += 1
-        online,offline = get_online_offline_members(config.grid1_member1_vip)
+        online,offline = get_online_offline_members(config.grid1_member1_vip, "Default")
         display_msg("Online members: ")
         display_msg(online)
         display_msg("Offline members: ")
@@ -863,16 +889,7 @@ class RFE_4753(unittest.TestCase):
             display_msg("FAIL: Failed to start GMC promotion")
             assert False
         
-        count = 0
-        display_msg("Sleeping till Grid comes up")
-        sleep(120)
-        while not is_grid_alive():
-            if count == 4:
-                display_msg("Giving up after 5 tries")
-                assert False
-            display_msg("Sleeping for 1 more minute...")
-            sleep(60)
-            count += 1
+        wait_for_master(config.grid1_master_vip, 360)
 
         display_msg("---------Test Case 19 Execution Completed----------")
 
@@ -915,7 +932,7 @@ class RFE_4753(unittest.TestCase):
             display_msg("GMC Member "+config.grid1_member1_vip+" is not up. Sleeping for 10s ...")
             sleep(10)
             count += 1
-        online,offline = get_online_offline_members(config.grid1_master_vip)
+        online,offline = get_online_offline_members(config.grid1_master_vip, "Default")
         display_msg("Online members: ")
         display_msg(online)
         display_msg("Offline members: ")
@@ -1216,16 +1233,7 @@ class RFE_4753(unittest.TestCase):
             display_msg("FAIL: Failed to start GMC promotion")
             assert False
         
-        count = 0
-        display_msg("Sleeping till Grid comes up")
-        sleep(120)
-        while not is_grid_alive(config.grid1_member1_vip):
-            if count == 4:
-                display_msg("Giving up after 5 tries")
-                assert False
-            display_msg("Sleeping for 1 more minute...")
-            sleep(60)
-            count += 1
+        wait_for_master(config.grid1_member1_vip, 360)
 
         display_msg("---------Test Case 30 Execution Completed----------")
 
@@ -1268,7 +1276,7 @@ class RFE_4753(unittest.TestCase):
             display_msg("GMC Member "+config.grid_vip+" is not up. Sleeping for 10s ...")
             sleep(10)
             count += 1
-        online,offline = get_online_offline_members(config.grid1_member1_vip)
+        online,offline = get_online_offline_members(config.grid1_member1_vip, "Default")
         display_msg("Online members: ")
         display_msg(online)
         display_msg("Offline members: ")
@@ -1748,16 +1756,7 @@ class RFE_4753(unittest.TestCase):
             display_msg("FAIL: Failed to start GMC promotion")
             assert False
         
-        count = 0
-        display_msg("Sleeping till Grid comes up")
-        sleep(120)
-        while not is_grid_alive(config.grid1_master_vip):
-            if count == 4:
-                display_msg("Giving up after 5 tries")
-                assert False
-            display_msg("Sleeping for 1 more minute...")
-            sleep(60)
-            count += 1
+        wait_for_master(config.grid1_master_vip, 360)
 
         display_msg("---------Test Case 50 Execution Completed----------")
 
@@ -1792,8 +1791,7 @@ class RFE_4753(unittest.TestCase):
         display_msg("----------------------------------------------------")
         
         display_msg("Getting the Grid status")
-        sleep(60)
-        online,offline = get_online_offline_members(config.grid1_master_vip)
+        online,offline = get_online_offline_members(config.grid1_master_vip, "Default")
         display_msg("Online members: ")
         display_msg(online)
         display_msg("Offline members: ")
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Offline unit tests of the ib_utils modules, run with "pytest unit_tests"
+# from WAPI_PyTest. They never reach a grid and are not listed in files.txt,
+# so run.py does not run or upload them. ib_utils and config.py live one
+# directory up.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,97 @@
+import json
+import threading
+import time
+import pytest
+import unittest
+import logging
+import config
+import ib_utils.fake_wapi as fake_wapi
+import ib_utils.ib_NIOS as ib_NIOS
+import ib_utils.wapi_pool as wapi_pool
+
+
+class async_wapi_client_fake_wapi(unittest.TestCase):
+
+        @classmethod
+        def setUpClass(cls):
+                logging.info("SETUP METHOD")
+                cls.server = fake_wapi.start(users={config.username: config.password})
+                cls.grid_vip = cls.server.grid_vip
+                cls.in_flight = 0
+                cls.most_in_flight = 0
+                cls.lock = threading.Lock()
+                handle = cls.server.wapi.handle
+                def slow_handle(method, target, args, data):
+                        # Long enough for the client to fill its concurrency.
+                        with cls.lock:
+                                cls.in_flight += 1
+                                cls.most_in_flight = max(cls.most_in_flight, cls.in_flight)
+                        try:
+                                time.sleep(0.05)
+                                return handle(method, target, args, data)
+                        finally:
+                                with cls.lock:
+                                        cls.in_flight -= 1
+                cls.server.wapi.handle = slow_handle
+
+        @classmethod
+        def tearDownClass(cls):
+                cls.server.stop()
+
+        def gather(self, concurrency, count):
+                self.__class__.most_in_flight = 0
+                requests = [{'operation': 'POST', 'object_type': 'networkview',
+                             'fields': json.dumps({'name': 'view%d_%d' % (concurrency, index)})} for index in range(count)]
+                return ib_NIOS.gather_requests(requests, concurrency=concurrency, grid_vip=self.grid_vip)
+
+        @pytest.mark.run(order=1)
+        def test_1_concurrency_bounds_the_requests_in_flight(self):
+                logging.info("Each client gets the concurrency it asked for on the same grid")
+                results = self.gather(3, 12)
+                assert len(results) == 12 and all(ref.startswith('"networkview/') for ref in results)
+                assert self.most_in_flight == 3, self.most_in_flight
+                self.gather(6, 18)
+                assert self.most_in_flight == 6, self.most_in_flight
+
+        @pytest.mark.run(order=2)
+        def test_2_semaphores_per_grid_and_concurrency(self):
+                logging.info("Same limit shares a semaphore, another limit gets its own")
+                assert ib_NIOS.grid_semaphore(self.grid_vip, 3) is ib_NIOS.grid_semaphore(self.grid_vip, 3)
+                assert ib_NIOS.grid_semaphore(self.grid_vip, 3) is not ib_NIOS.grid_semaphore(self.grid_vip, 6)
+                assert ib_NIOS.grid_semaphore("other", 3) is not ib_NIOS.grid_semaphore(self.grid_vip, 3)
+                ib_NIOS.GRID_CONCURRENCY[self.grid_vip] = 5
+                try:
+                        with ib_NIOS.AsyncWapiClient(self.grid_vip) as client:
+                                assert client.concurrency == 5
+                finally:
+                        del ib_NIOS.GRID_CONCURRENCY[self.grid_vip]
+
+        @pytest.mark.run(order=3)
+        def test_3_pool_is_sized_while_the_client_is_open(self):
+                logging.info("Idle connections are kept per open client, not for good")
+                pool = wapi_pool.get_pool(self.grid_vip, config.username)
+                with ib_NIOS.AsyncWapiClient(self.grid_vip, concurrency=6) as client:
+                        assert pool.capacity() == max(pool.maxsize, 6)
+                        client.gather([{'operation': 'GET', 'object_type': 'grid'}] * 12)
+                        assert len(pool.idle) <= 6
+                assert pool.reserved == 0
+                assert pool.capacity() == pool.maxsize == wapi_pool.POOL_SIZE
+                assert len(pool.idle) <= pool.maxsize
+
+        @pytest.mark.run(order=4)
+        def test_4_gather_returns_exceptions_in_order(self):
+                logging.info("return_exceptions keeps failed requests in place")
+                requests = [{'operation': 'GET', 'object_type': 'grid'},
+                            {'operation': 'GET', 'object_type': 'nosuchtype'},
+                            {'operation': 'PUT', 'ref': 'networkview/missing:x', 'fields': '{}'}]
+                results = ib_NIOS.gather_requests(requests, concurrency=2, return_exceptions=True, grid_vip=self.grid_vip)
+                assert json.loads(results[0])[0]['_ref'].startswith('grid/')
+                assert results[1][0] == 400
+                assert results[2][0] == 404
+                # A 401 raises in wapi_request.
+                results = ib_NIOS.gather_requests(requests[:1] * 2, concurrency=2, return_exceptions=True,
+                                                  password="wrong", grid_vip=self.grid_vip)
+                assert [type(result) for result in results] == [Exception, Exception]
+                assert 'Authorization Required' in str(results[0])
+                self.assertRaises(Exception, ib_NIOS.gather_requests, requests[:1], concurrency=2,
+                                  password="wrong", grid_vip=self.grid_vip)
@@ -0,0 +1,103 @@
+import json
+import pytest
+import unittest
+import logging
+import config
+import ib_utils.fake_wapi as fake_wapi
+import ib_utils.ib_NIOS as ib_NIOS
+import ib_utils.ref_cache as ref_cache
+
+FOLDER = 'smartfolder:global'
+
+
+class batch_fake_wapi(unittest.TestCase):
+
+        @classmethod
+        def setUpClass(cls):
+                logging.info("SETUP METHOD")
+                cls.server = fake_wapi.start(users={config.username: config.password})
+                cls.grid_vip = cls.server.grid_vip
+
+        @classmethod
+        def tearDownClass(cls):
+                cls.server.stop()
+
+        def setUp(self):
+                self.bodies = []
+                handle = self.server.wapi.handle
+                def spy(method, target, args, data):
+                        if target == 'request':
+                                self.bodies.append(data)
+                        return handle(method, target, args, data)
+                self.server.wapi.handle = spy
+
+        def tearDown(self):
+                del self.server.wapi.handle
+
+        def folder(self, name):
+                folders = self.server.store.find(FOLDER, name=name)
+                return folders[0] if folders else None
+
+        def create(self, name):
+                return json.loads(ib_NIOS.wapi_request('POST', object_type=FOLDER, fields=json.dumps({'name': name}),
+                                                       grid_vip=self.grid_vip))
+
+        @pytest.mark.run(order=1)
+        def test_1_assign_state_inside_and_across_chunks(self):
+                logging.info("State names are substituted by the server in a chunk, by the client after it")
+                with ib_NIOS.batch(chunk_size=3, grid_vip=self.grid_vip) as b:
+                        created = b.add('POST', object_type=FOLDER, fields=json.dumps({'name': 'sf_state'}),
+                                        assign_state={'folder': '_ref'})
+                        b.add('PUT', ref='##STATE:folder:##', fields=json.dumps({'comment': 'server'}))
+                        b.add('POST', object_type=FOLDER, fields=json.dumps({'name': 'sf_other'}))
+                        updated = b.add('PUT', ref='##STATE:folder:##', fields=json.dumps({'comment': 'client'}))
+                assert not b.errors()
+                assert len(self.bodies) == 2
+                assert self.bodies[0][1]['enable_substitution']
+                assert self.bodies[1][0]['object'] == created.result
+                assert 'enable_substitution' not in self.bodies[1][0]
+                assert updated.result == created.result
+                assert self.folder('sf_state')['comment'] == 'client'
+                assert self.folder('sf_other') is not None
+
+        @pytest.mark.run(order=2)
+        def test_2_error_fails_only_its_chunk(self):
+                logging.info("A failed operation rolls back its chunk and marks every item of it")
+                with ib_NIOS.batch(chunk_size=2, grid_vip=self.grid_vip) as b:
+                        b.add('POST', object_type=FOLDER, fields=json.dumps({'name': 'sf_rolled_back'}))
+                        b.add('PUT', ref=FOLDER + '/missing:x', fields=json.dumps({'comment': 'x'}))
+                        last = b.add('POST', object_type=FOLDER, fields=json.dumps({'name': 'sf_applied'}))
+                errors = b.errors()
+                assert len(errors) == 2
+                assert all('not found' in item.error for item in errors)
+                assert self.folder('sf_rolled_back') is None
+                assert last.status == 'ok'
+                assert self.folder('sf_applied')['_ref'] == last.result
+
+        @pytest.mark.run(order=3)
+        def test_3_cached_refs_invalidated(self):
+                logging.info("Refs deleted by a batch are dropped from ref_cache")
+                ref = self.create('sf_cached')
+                kept = self.create('sf_kept')
+                assert ib_NIOS.resolve(FOLDER, grid_vip=self.grid_vip, name='sf_cached') == ref
+                assert ib_NIOS.resolve(FOLDER, grid_vip=self.grid_vip, name='sf_kept') == kept
+                with ib_NIOS.batch(grid_vip=self.grid_vip) as b:
+                        b.add('DELETE', ref=ref)
+                assert ref_cache.get(self.grid_vip, ref_cache.make_key(FOLDER, {'name': 'sf_cached'})) is None
+                assert ref_cache.get(self.grid_vip, ref_cache.make_key(FOLDER, {'name': 'sf_kept'})) == kept
+                with pytest.raises(Exception):
+                        ib_NIOS.resolve(FOLDER, grid_vip=self.grid_vip, name='sf_cached')
+
+        @pytest.mark.run(order=4)
+        def test_4_substituted_ref_clears_the_grid_cache(self):
+                logging.info("A PUT or DELETE on a state name drops every cached ref of the grid")
+                kept = self.create('sf_other_grid_entry')
+                assert ib_NIOS.resolve(FOLDER, grid_vip=self.grid_vip, name='sf_other_grid_entry') == kept
+                with ib_NIOS.batch(grid_vip=self.grid_vip) as b:
+                        b.add('POST', object_type=FOLDER, fields=json.dumps({'name': 'sf_temp'}),
+                              assign_state={'temp': '_ref'})
+                        b.add('DELETE', ref='##STATE:temp:##')
+                assert not b.errors()
+                assert self.folder('sf_temp') is None
+                key = ref_cache.make_key(FOLDER, {'name': 'sf_other_grid_entry'})
+                assert ref_cache.get(self.grid_vip, key) is None
@@ -0,0 +1,173 @@
+import socket
+import struct
+import threading
+import pytest
+import unittest
+import logging
+import ib_utils.dns_query as dns_query
+
+
+def build_response(query, answers, truncated=False):
+    '''
+    Answer to a query wire message, the owner names of the answers point
+    at the question name (offset 12) to exercise the compression.
+    '''
+    query_id = struct.unpack('!H', query[:2])[0]
+    name, offset = dns_query.decode_name(query, 12)
+    flags = 0x8000 | 0x0400 | (0x0200 if truncated else 0)
+    wire = struct.pack('!6H', query_id, flags, 1, len(answers), 0, 0) + query[12:offset + 4]
+    for rtype, rdata in answers:
+        data = dns_query.rdata_wire(rtype, rdata)
+        wire += '\xc0\x0c' + struct.pack('!HHIH', dns_query.type_code(rtype), 1, 300, len(data)) + data
+    return wire
+
+
+class FakeServer:
+    '''
+    UDP and TCP listener on one local port. UDP answers are truncated
+    (TC flag, no records) when truncate_udp is set.
+    '''
+    def __init__(self, answers, truncate_udp=False):
+        self.answers = answers
+        self.truncate_udp = truncate_udp
+        self.udp_queries = 0
+        self.tcp_queries = 0
+        self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.udp.bind(('127.0.0.1', 0))
+        self.port = self.udp.getsockname()[1]
+        self.tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.tcp.bind(('127.0.0.1', self.port))
+        self.tcp.listen(5)
+        for target in (self.serve_udp, self.serve_tcp):
+            thread = threading.Thread(target=target)
+            thread.daemon = True
+            thread.start()
+
+    def serve_udp(self):
+        while True:
+            try:
+                query, peer = self.udp.recvfrom(65535)
+            except socket.error:
+                # Closed by close().
+                return
+            self.udp_queries += 1
+            if self.truncate_udp:
+                self.udp.sendto(build_response(query, [], truncated=True), peer)
+            else:
+                self.udp.sendto(build_response(query, self.answers), peer)
+
+    def serve_tcp(self):
+        while True:
+            try:
+                conn, peer = self.tcp.accept()
+            except socket.error:
+                return
+            try:
+                query = dns_query.recv_tcp(conn)
+                self.tcp_queries += 1
+                dns_query.send_tcp(conn, build_response(query, self.answers))
+            finally:
+                conn.close()
+
+    def close(self):
+        self.udp.close()
+        self.tcp.close()
+
+
+class dns_query_codec(unittest.TestCase):
+
+        @classmethod
+        def setup_class(cls):
+                logging.info("SETUP METHOD")
+
+        @pytest.mark.run(order=1)
+        def test_1_encode_and_decode_names(self):
+                logging.info("Name wire format round trip")
+                wire = dns_query.encode_name("www.Zone106.com")
+                assert wire == "\x03www\x07Zone106\x03com\x00"
+                assert dns_query.decode_name(wire, 0) == ("www.Zone106.com.", len(wire))
+                assert dns_query.encode_name(".") == "\x00"
+                # A label followed by a pointer to the name at offset 0.
+                message = wire + "\x04mail\xc0\x04"
+                assert dns_query.decode_name(message, len(wire)) == ("mail.Zone106.com.", len(message))
+                self.assertRaises(dns_query.DNSError, dns_query.encode_name, "a..com")
+                self.assertRaises(dns_query.DNSError, dns_query.decode_name, "\xc0\x00", 0)
+
+        @pytest.mark.run(order=2)
+        def test_2_rdata_round_trip(self):
+                logging.info("Presentation -> wire -> presentation for every codec kind")
+                for rtype, text in [("A", "10.0.0.1"),
+                                    ("AAAA", "2001:db8::1"),
+                                    ("MX", "10 mail.zone106.com."),
+                                    ("TXT", '"hello world" "a \\"quoted\\" word"'),
+                                    ("SOA", "ns1.zone106.com. admin.zone106.com. 2019 10800 3600 2419200 900"),
+                                    ("SRV", "0 5 5060 sip.zone106.com."),
+                                    ("CAA", '0 issue "CAA_Authority.com"'),
+                                    ("DS", "60485 5 1 2BB183AF5F22588179A53B0A98631FAD1A292118"),
+                                    ("NSEC", "b.zone106.com. A NS SOA RRSIG NSEC"),
+                                    ("NSEC3PARAM", "1 0 10 AABBCCDD")]:
+                        wire = dns_query.rdata_wire(rtype, text)
+                        fields = dns_query.decode_rdata(wire, 0, len(wire), rtype)
+                        assert dns_query.rdata_text(rtype, fields, wire) == text, rtype
+                        assert dns_query.encode_rdata(rtype, fields) == wire, rtype
+
+        @pytest.mark.run(order=3)
+        def test_3_unknown_type_uses_rfc3597_form(self):
+                logging.info("Types without a codec are kept as \\# <length> <hex>")
+                wire = dns_query.rdata_wire("TYPE65280", "\\# 3 ABCDEF")
+                assert wire == "\xab\xcd\xef"
+                rr = dns_query.RR("x.zone106.com.", "TYPE65280", "IN", 60, wire)
+                assert rr.rdata == "\\# 3 ABCDEF"
+                assert dns_query.type_code("TYPE65280") == 65280
+                self.assertRaises(dns_query.DNSError, dns_query.type_code, "BOGUS")
+
+        @pytest.mark.run(order=4)
+        def test_4_parse_response_message(self):
+                logging.info("Parse a response with compressed owner names and an EDNS query")
+                query = dns_query.make_query("arec.zone106.com", "A", dnssec=True, query_id=4660)
+                assert struct.unpack('!H', query[:2])[0] == 4660
+                response = dns_query.Message(build_response(query, [("A", "10.0.0.1"), ("A", "10.0.0.2")]))
+                assert response.id == 4660
+                assert response.rcode == "NOERROR"
+                assert "qr" in response.flags and "aa" in response.flags and "tc" not in response.flags
+                assert response.question == [("arec.zone106.com.", "A", "IN")]
+                assert response.rrset("ARec.zone106.com", "A").rdatas == ["10.0.0.1", "10.0.0.2"]
+                assert response.rrset("arec.zone106.com", "AAAA") is None
+
+        @pytest.mark.run(order=5)
+        def test_5_truncated_udp_answer_is_retried_over_tcp(self):
+                logging.info("TC fallback of query()")
+                server = FakeServer([("TXT", '"' + "x" * 200 + '"')] * 4, truncate_udp=True)
+                try:
+                        response = dns_query.query("127.0.0.1", "big.zone106.com", "TXT", port=server.port, timeout=2)
+                finally:
+                        server.close()
+                assert server.udp_queries == 1 and server.tcp_queries == 1
+                assert "tc" not in response.flags
+                assert len(response.rrset("big.zone106.com", "TXT")) == 4
+
+        @pytest.mark.run(order=6)
+        def test_6_udp_answer_and_tcp_on_request(self):
+                logging.info("Untruncated UDP answers are used as is, tcp=True skips UDP")
+                server = FakeServer([("A", "10.0.0.1")])
+                try:
+                        response = dns_query.query("127.0.0.1", "arec.zone106.com", port=server.port, timeout=2)
+                        assert response.rrset("arec.zone106.com", "A").rdatas == ["10.0.0.1"]
+                        assert (server.udp_queries, server.tcp_queries) == (1, 0)
+                        dns_query.query("127.0.0.1", "arec.zone106.com", port=server.port, timeout=2, tcp=True)
+                        assert (server.udp_queries, server.tcp_queries) == (1, 1)
+                finally:
+                        server.close()
+
+        @pytest.mark.run(order=7)
+        def test_7_query_many_retries_truncated_answers_over_tcp(self):
+                logging.info("TC fallback of query_many()")
+                server = FakeServer([("A", "10.0.0.1")], truncate_udp=True)
+                try:
+                        responses = dns_query.query_many("127.0.0.1", [("a%d.zone106.com" % i, "A") for i in range(5)],
+                                                         port=server.port, timeout=2)
+                finally:
+                        server.close()
+                assert server.tcp_queries == 5
+                assert [response.rrset(response.question[0][0], "A").rdatas for response in responses] == [["10.0.0.1"]] * 5
@@ -0,0 +1,124 @@
+import hashlib
+import pytest
+import unittest
+import logging
+import ib_utils.dns_query as dns_query
+import ib_utils.dnssec_validate as dnssec_validate
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec, utils
+
+ZONE = 'example.test.'
+NOW = 1700000000
+INCEPTION = NOW - 3600
+EXPIRATION = NOW + 86400
+
+
+def make_rr(name, rtype, fields, ttl=300):
+        return dns_query.RR(name, rtype, 'IN', ttl, dns_query.encode_rdata(rtype, fields), fields)
+
+
+def to_bytes(value, size=32):
+        return ('%0*x' % (size * 2, value)).decode('hex')
+
+
+class Key:
+        '''
+        ECDSA P-256 (algorithm 13) signing key and its DNSKEY record.
+        '''
+        def __init__(self, flags):
+                self.private = ec.generate_private_key(ec.SECP256R1(), default_backend())
+                numbers = self.private.public_key().public_numbers()
+                self.rr = make_rr(ZONE, 'DNSKEY', [flags, 3, 13, to_bytes(numbers.x) + to_bytes(numbers.y)])
+                self.tag = dnssec_validate.key_tag(self.rr.wire)
+
+        def ds(self):
+                digest = hashlib.sha256(dnssec_validate.canonical_name(ZONE) + self.rr.wire).hexdigest()
+                return '%d 13 2 %s' % (self.tag, digest)
+
+        def sign(self, rrs):
+                fields = [rrs[0].type, 13, len(dnssec_validate.labels(rrs[0].name)), rrs[0].ttl,
+                          EXPIRATION, INCEPTION, self.tag, ZONE, '']
+                data = dnssec_validate.signed_data(make_rr(rrs[0].name, 'RRSIG', fields), rrs)
+                r, s = utils.decode_dss_signature(self.private.sign(data, ec.ECDSA(hashes.SHA256())))
+                return make_rr(rrs[0].name, 'RRSIG', fields[:8] + [to_bytes(r) + to_bytes(s)])
+
+
+def nsec(name, following, types):
+        return make_rr(name, 'NSEC', [following, dns_query.encode_bitmap(types)])
+
+
+def signed_zone(ksks, zsk, tamper=False):
+        '''
+        Records of ZONE: www and the apex signed, a delegation to sub with
+        glue, NSEC chain apex -> sub -> www.
+        '''
+        rrsets = [[make_rr(ZONE, 'A', ['192.0.2.1'])],
+                  [make_rr('www.' + ZONE, 'A', ['192.0.2.2']), make_rr('www.' + ZONE, 'A', ['192.0.2.3'])],
+                  [nsec(ZONE, 'sub.' + ZONE, ['A', 'DNSKEY', 'RRSIG', 'NSEC'])],
+                  [nsec('sub.' + ZONE, 'www.' + ZONE, ['NS', 'RRSIG', 'NSEC'])],
+                  [nsec('www.' + ZONE, ZONE, ['A', 'RRSIG', 'NSEC'])]]
+        keys = [key.rr for key in ksks + [zsk]]
+        rrs = keys + [ksk.sign(keys) for ksk in ksks]
+        for rrset in rrsets:
+                rrs.extend(rrset + [zsk.sign(rrset)])
+        rrs.append(make_rr('sub.' + ZONE, 'NS', ['ns.sub.' + ZONE]))
+        rrs.append(make_rr('ns.sub.' + ZONE, 'A', ['192.0.2.53']))
+        if tamper:
+                rrs[rrs.index(rrsets[1][0])] = make_rr('www.' + ZONE, 'A', ['192.0.2.99'])
+        return rrs
+
+
+class dnssec_validate_signed_zone(unittest.TestCase):
+
+        @classmethod
+        def setUpClass(cls):
+                logging.info("SETUP METHOD")
+                cls.ksk = Key(257)
+                cls.zsk = Key(256)
+
+        @pytest.mark.run(order=1)
+        def test_1_valid_zone_and_ds_chain(self):
+                logging.info("A correctly signed zone validates against the DS of its KSK")
+                result = dnssec_validate.validate_rrs(ZONE, signed_zone([self.ksk], self.zsk), [self.ksk.ds()], NOW)
+                assert result, result.report()
+                assert result.chain and result.trusted == [self.ksk.tag]
+                # DNSKEY, apex A, www A and three NSEC; delegation NS and glue are not signed.
+                assert result.rrsets == 6
+
+        @pytest.mark.run(order=2)
+        def test_2_bad_signature_and_expired_signatures(self):
+                logging.info("Changed data and signatures outside their validity are reported")
+                result = dnssec_validate.validate_rrs(ZONE, signed_zone([self.ksk], self.zsk, tamper=True),
+                                                      [self.ksk.ds()], NOW)
+                assert not result
+                assert [(name, rtype) for name, rtype, reason in result.errors] == [('www.' + ZONE, 'A')]
+                assert 'bad signature' in result.errors[0][2]
+                result = dnssec_validate.validate_rrs(ZONE, signed_zone([self.ksk], self.zsk), [self.ksk.ds()],
+                                                      EXPIRATION + 1)
+                assert not result and all('outside' in reason for name, rtype, reason in result.errors)
+
+        @pytest.mark.run(order=3)
+        def test_3_ds_of_another_key(self):
+                logging.info("A DS matching no DNSKEY breaks the chain of trust")
+                result = dnssec_validate.validate_rrs(ZONE, signed_zone([self.ksk], self.zsk), [Key(257).ds()], NOW)
+                assert not result
+                assert result.errors == [(ZONE, 'DS', 'no DNSKEY matches the DS records')]
+
+        @pytest.mark.run(order=4)
+        def test_4_ksk_rollover(self):
+                logging.info("During a rollover either KSK may be the one in the parent DS")
+                new = Key(257)
+                rrs = signed_zone([self.ksk, new], self.zsk)
+                for ds in ([new.ds()], [self.ksk.ds(), new.ds()]):
+                        result = dnssec_validate.validate_rrs(ZONE, rrs, ds, NOW)
+                        assert result, result.report()
+
+        @pytest.mark.run(order=5)
+        def test_5_broken_nsec_chain(self):
+                logging.info("A missing NSEC record is reported and breaks the chain")
+                rrs = [rr for rr in signed_zone([self.ksk], self.zsk)
+                       if not (rr.name == 'sub.' + ZONE and rr.type in ('NSEC', 'RRSIG'))]
+                result = dnssec_validate.validate_rrs(ZONE, rrs, [self.ksk.ds()], NOW)
+                errors = [(name, rtype) for name, rtype, reason in result.errors]
+                assert ('sub.' + ZONE, 'NSEC') in errors and (ZONE, 'NSEC') in errors
@@ -0,0 +1,80 @@
+import json
+import types
+import pytest
+import unittest
+import logging
+import config
+import ib_utils.fake_wapi as fake_wapi
+import ib_utils.ib_NIOS as ib_NIOS
+
+FOLDER = 'smartfolder:global'
+COUNT = 25
+
+
+class iter_objects_fake_wapi(unittest.TestCase):
+
+        @classmethod
+        def setUpClass(cls):
+                logging.info("SETUP METHOD")
+                cls.server = fake_wapi.start(users={config.username: config.password})
+                cls.grid_vip = cls.server.grid_vip
+                for number in range(COUNT):
+                        cls.server.store.create(FOLDER, {'name': 'sf%02d' % number,
+                                                         'comment': 'even' if number % 2 == 0 else 'odd'})
+
+        @classmethod
+        def tearDownClass(cls):
+                cls.server.stop()
+
+        def setUp(self):
+                self.reads = []
+                handle = self.server.wapi.handle
+                def spy(method, target, args, data):
+                        self.reads.append(dict(args))
+                        return handle(method, target, args, data)
+                self.server.wapi.handle = spy
+
+        def tearDown(self):
+                del self.server.wapi.handle
+
+        @pytest.mark.run(order=1)
+        def test_1_pages_smaller_than_the_result(self):
+                logging.info("Every object is returned once, one GET per page")
+                objects = ib_NIOS.iter_objects(FOLDER, page_size=10, grid_vip=self.grid_vip)
+                assert isinstance(objects, types.GeneratorType)
+                names = [obj['name'] for obj in objects]
+                assert names == ['sf%02d' % number for number in range(COUNT)]
+                assert len(self.reads) == 3
+                assert self.reads[0]['_max_results'] == '10' and self.reads[0]['_paging'] == '1'
+                assert '_page_id' in self.reads[1] and '_page_id' in self.reads[2]
+
+        @pytest.mark.run(order=2)
+        def test_2_only_pages_consumed_are_read(self):
+                logging.info("The next page is read only when the generator gets there")
+                objects = ib_NIOS.iter_objects(FOLDER, page_size=10, grid_vip=self.grid_vip)
+                for i in range(10):
+                        next(objects)
+                assert len(self.reads) == 1
+                next(objects)
+                assert len(self.reads) == 2
+
+        @pytest.mark.run(order=3)
+        def test_3_return_fields(self):
+                logging.info("A list replaces the default fields, '+' adds to them")
+                obj = next(ib_NIOS.iter_objects(FOLDER, return_fields=['comment'], grid_vip=self.grid_vip))
+                assert sorted(obj) == ['_ref', 'comment']
+                obj = next(ib_NIOS.iter_objects(FOLDER, return_fields='name,comment', grid_vip=self.grid_vip))
+                assert sorted(obj) == ['_ref', 'comment', 'name']
+                obj = next(ib_NIOS.iter_objects(FOLDER, return_fields='+comment', grid_vip=self.grid_vip))
+                assert self.reads[-1]['_return_fields+'] == 'comment'
+                assert sorted(obj) == ['_ref', 'comment', 'name']
+
+        @pytest.mark.run(order=4)
+        def test_4_search_arguments_in_object_type_and_params(self):
+                logging.info("'?' in object_type and params both filter, across pages")
+                even = list(ib_NIOS.iter_objects(FOLDER + '?comment=even', page_size=5, grid_vip=self.grid_vip))
+                assert len(even) == 13 and all(obj['comment'] == 'even' for obj in even)
+                one = list(ib_NIOS.iter_objects(FOLDER + '?comment=even', params='?name=sf04',
+                                                return_fields='comment', grid_vip=self.grid_vip))
+                assert [obj['comment'] for obj in one] == ['even']
+                assert list(ib_NIOS.iter_objects(FOLDER, params='?name=none', grid_vip=self.grid_vip)) == []
@@ -0,0 +1,95 @@
+import os
+import shutil
+import pytest
+import unittest
+import logging
+import tempfile
+import subprocess
+import ib_utils.ssh_pool as ssh_pool
+import ib_utils.log_offset as log_offset
+
+IP = '10.0.0.1'
+
+
+class LocalFile:
+        '''
+        SFTP file handle of a local file.
+        '''
+        def __init__(self, path):
+                self.fobj = open(path, 'rb')
+
+        def seek(self, offset):
+                self.fobj.seek(offset)
+
+        def read(self, size=-1):
+                return self.fobj.read(size)
+
+        def stat(self):
+                return os.fstat(self.fobj.fileno())
+
+        def close(self):
+                self.fobj.close()
+
+
+class LocalSftp:
+        def open(self, path, mode='r'):
+                return LocalFile(path)
+
+
+def local_stat(IP, command):
+        path = command.split()[-2]
+        if not os.path.exists(path):
+                return ''
+        stat = os.stat(path)
+        return '%d %d\n' % (stat.st_ino, stat.st_size)
+
+
+class log_offset_capture(unittest.TestCase):
+
+        @classmethod
+        def setup_class(cls):
+                logging.info("SETUP METHOD")
+
+        def setUp(self):
+                self.directory = tempfile.mkdtemp()
+                self.path = os.path.join(self.directory, 'syslog')
+                self.saved = ssh_pool.exec_command, ssh_pool.get_sftp
+                ssh_pool.exec_command = local_stat
+                ssh_pool.get_sftp = lambda IP: LocalSftp()
+
+        def tearDown(self):
+                ssh_pool.exec_command, ssh_pool.get_sftp = self.saved
+                log_offset._captures.clear()
+                shutil.rmtree(self.directory)
+
+        def write(self, text, mode='a'):
+                with open(self.path, mode) as fobj:
+                        fobj.write(text)
+
+        def capture(self, before, after, pre_start_lines):
+                self.write(before, 'w')
+                log_offset.start_capture(IP, self.path, pre_start_lines=pre_start_lines)
+                self.write(after)
+                return log_offset.stop_capture(IP, self.path).buffer.text().split('\n')
+
+        @pytest.mark.run(order=1)
+        def test_1_pre_start_lines_as_tail(self):
+                logging.info("The capture starts with the lines 'tail -n 10' printed")
+                before = ''.join('line %d\n' % number for number in range(15))
+                self.write(before, 'w')
+                tail = subprocess.check_output(['tail', '-n', '10', self.path]).splitlines()
+                lines = self.capture(before, 'new 1\nnew 2\n', 10)
+                assert lines == tail + ['new 1', 'new 2']
+
+        @pytest.mark.run(order=2)
+        def test_2_without_pre_start_lines(self):
+                logging.info("pre_start_lines=0 captures only the new lines")
+                before = ''.join('line %d\n' % number for number in range(15))
+                assert self.capture(before, 'new 1\n', 0) == ['new 1']
+
+        @pytest.mark.run(order=3)
+        def test_3_short_file_and_partial_line(self):
+                logging.info("Fewer lines than requested and a last line without newline")
+                assert self.capture('one\ntwo\n', 'three\n', 10) == ['one', 'two', 'three']
+                assert self.capture('one\ntwo\npart', 'ial\n', 2) == ['two', 'partial']
+                assert self.capture('', 'first\n', 10) == ['first']
@@ -0,0 +1,71 @@
+import re
+import pytest
+import unittest
+import logging
+import subprocess
+import ib_utils.log_stream as log_stream
+import ib_utils.log_validation as log_validation
+
+IP = '10.0.0.1'
+PATH = '/var/log/syslog'
+LINES = ["client: ADD for 'arec' in zone106.com", "a|b(c)+ literal", "serial 2019 abbc",
+         "named[1234]: zone loaded", "*star at start", "cost $5 ^ up"]
+
+
+def grep(pattern):
+        regex = log_stream.grep_pattern(pattern)
+        return [line for line in LINES if regex.search(line)]
+
+
+class log_validation_grep(unittest.TestCase):
+
+        @classmethod
+        def setup_class(cls):
+                logging.info("SETUP METHOD")
+
+        def setUp(self):
+                capture = log_stream.StreamCapture(IP, PATH)
+                capture.buffer = log_stream.LogBuffer()
+                capture.buffer.feed('\n'.join(LINES) + '\n')
+                log_stream._captures[(IP, PATH)] = capture
+
+        def tearDown(self):
+                log_stream._captures.pop((IP, PATH), None)
+
+        @pytest.mark.run(order=1)
+        def test_1_bre_special_characters_are_literal(self):
+                logging.info("( ) | + ? { } match themselves unless escaped")
+                assert grep("'a|b(c)+'") == [LINES[1]]
+                assert grep("'b\\+c'") == [LINES[2]]
+                assert grep("'b+c'") == []
+                assert grep("'\\(zone\\|star\\)'") == [LINES[0], LINES[3], LINES[4]]
+                assert grep("'b\\{2\\}c'") == [LINES[2]]
+                assert grep("'b{2}c'") == []
+
+        @pytest.mark.run(order=2)
+        def test_2_anchors_star_and_brackets(self):
+                logging.info("Leading * and inner ^ $ are literal, POSIX classes work")
+                assert grep("'*star'") == [LINES[4]]
+                assert grep("'^client'") == [LINES[0]]
+                assert grep("'$5 ^'") == [LINES[5]]
+                assert grep("'literal$'") == [LINES[1]]
+                assert grep("'named\\[[[:digit:]]*\\]'") == [LINES[3]]
+                assert grep("'[]x]:'") == [LINES[3]]
+                assert grep("'[(]c'") == [LINES[1]]
+
+        @pytest.mark.run(order=3)
+        def test_3_shell_quoting_and_invalid_patterns(self):
+                logging.info("Shell quotes are removed, invalid BRE is matched literally")
+                assert grep("\"ADD for 'arec'\"") == [LINES[0]]
+                assert grep("'ADD for '\"'\"'arec'\"'\"''") == [LINES[0]]
+                assert grep("zone106\\.com") == [LINES[0]]
+                assert grep("'.*ADD.*zone.*'") == [LINES[0]]
+                assert log_stream.grep_pattern("'a\\{2'").pattern == re.escape("a\\{2")
+
+        @pytest.mark.run(order=4)
+        def test_4_log_validation_on_capture(self):
+                logging.info("A match returns None, a miss raises CalledProcessError as grep did")
+                assert log_validation.log_validation("'a|b(c)+'", PATH, IP) is None
+                assert log_validation.log_validation("\"ADD for 'arec'\"", PATH, IP) is None
+                with pytest.raises(subprocess.CalledProcessError):
+                        log_validation.log_validation("'b+c'", PATH, IP)
@@ -0,0 +1,74 @@
+import random
+import re
+import pytest
+import unittest
+import logging
+import ib_utils.multi_match as multi_match
+
+
+def brute_force(patterns, line, flags=re.I):
+        return set(index for index, pattern in enumerate(patterns) if re.search(pattern, line, flags))
+
+
+class multi_match_patterns(unittest.TestCase):
+
+        @classmethod
+        def setup_class(cls):
+                logging.info("SETUP METHOD")
+
+        @pytest.mark.run(order=1)
+        def test_1_aho_corasick_overlapping_words(self):
+                logging.info("Overlapping and nested literals")
+                automaton = multi_match.AhoCorasick(["he", "she", "his", "hers"])
+                assert automaton.search("ushers") == set([0, 1, 3])
+                assert automaton.search("this") == set([2])
+                assert automaton.search("xyz") == set()
+                assert multi_match.AhoCorasick(["aa", "a"]).search("aaa") == set([0, 1])
+
+        @pytest.mark.run(order=2)
+        def test_2_literals_and_regexes_in_one_matcher(self):
+                logging.info("Literal and regex patterns report their own indexes")
+                patterns = ["ADD for 'arec'", ".*DLV.*", "zone106.com", "serial [0-9]+"]
+                matcher = multi_match.MultiMatcher(patterns)
+                assert matcher.match("client: add for 'ArEc' in zone106.com") == set([0, 2])
+                assert matcher.match("DLV lookup, serial 2019") == set([1, 3])
+                assert matcher.match("nothing to see") == set()
+                assert multi_match.MultiMatcher([]).match("anything") == set()
+
+        @pytest.mark.run(order=3)
+        def test_3_case_sensitive_matching(self):
+                logging.info("flags=0 keeps the case of literals and regexes")
+                matcher = multi_match.MultiMatcher(["Zone", "^ERR.*"], 0)
+                assert matcher.match("Zone loaded") == set([0])
+                assert matcher.match("zone loaded") == set()
+                assert matcher.match("err: failed") == set()
+                assert matcher.match("ERR: failed") == set([1])
+
+        @pytest.mark.run(order=4)
+        def test_4_backreferences_and_group_names(self):
+                logging.info("Patterns which cannot be combined are tried one by one")
+                patterns = [r"(\w+) \1", "(?P<a>x)", "(?P<a>y)", r"(?P<n>z)(?P=n)"]
+                matcher = multi_match.MultiMatcher(patterns)
+                assert matcher.match("again again") == set([0])
+                assert matcher.match("y zz") == set([2, 3])
+                assert matcher.match("x") == set([1])
+
+        @pytest.mark.run(order=5)
+        def test_5_same_result_as_one_search_per_pattern(self):
+                logging.info("Random lines, MultiMatcher versus re.search of every pattern")
+                patterns = ["named", "ADD", "dlv", "a.b", "^client", "[0-9]{3}", "zone$", "x|y", "add for"]
+                rand = random.Random(4537)
+                words = ["named", "client", "ADD", "add", "for", "dlv", "a.b", "axb", "123", "zone", "x", "q"]
+                for flags in (re.I, 0):
+                        matcher = multi_match.MultiMatcher(patterns, flags)
+                        for i in range(500):
+                                line = " ".join(rand.choice(words) for j in range(rand.randint(0, 6)))
+                                assert matcher.match(line) == brute_force(patterns, line, flags), line
+
+        @pytest.mark.run(order=6)
+        def test_6_alternatives_matching_at_the_same_place(self):
+                logging.info("Every regex found in the line is reported, not only the leftmost one")
+                patterns = ["ab+", "a.", "b+c$", "^q?", "(?<=a)b", "x*"]
+                matcher = multi_match.MultiMatcher(patterns)
+                for line in ["abbc", "zzz", "ac", "qab", ""]:
+                        assert matcher.match(line) == brute_force(patterns, line), line
@@ -0,0 +1,82 @@
+import socket
+import struct
+import pytest
+import unittest
+import logging
+import threading
+import ib_utils.dns_query as dns_query
+import ib_utils.dns_update as dns_update
+import ib_utils.nsupdate_util as nsupdate_util
+
+
+class UpdateResponder(threading.Thread):
+        '''
+        Answers one UPDATE with NOERROR and keeps the address it came from.
+        '''
+        def __init__(self):
+                threading.Thread.__init__(self)
+                self.daemon = True
+                self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                self.sock.bind(('127.0.0.1', 0))
+                self.sock.settimeout(5)
+                self.port = self.sock.getsockname()[1]
+                self.peer = None
+
+        def run(self):
+                try:
+                        wire, self.peer = self.sock.recvfrom(65535)
+                        flags = 0x8000 | (dns_query.OPCODES['UPDATE'] << 11)
+                        self.sock.sendto(wire[:2] + struct.pack('!5H', flags, 0, 0, 0, 0), self.peer)
+                finally:
+                        self.sock.close()
+
+
+class nsupdate_source(unittest.TestCase):
+
+        @classmethod
+        def setup_class(cls):
+                logging.info("SETUP METHOD")
+
+        @pytest.mark.run(order=1)
+        def test_1_update_sent_from_source(self):
+                logging.info("The server sees the update coming from the source address")
+                responder = UpdateResponder()
+                responder.start()
+                update = dns_update.Update('zone106.com').add('arec', 300, 'A', '10.0.0.1')
+                response = dns_update.send('127.0.0.1', update, port=responder.port, source='127.0.0.2')
+                responder.join()
+                assert response.rcode == 'NOERROR'
+                assert responder.peer[0] == '127.0.0.2'
+
+        @pytest.mark.run(order=2)
+        def test_2_local_addresses(self):
+                logging.info("Only addresses of this host can be the source of an in-process update")
+                assert dns_query.is_local_address('127.0.0.1')
+                assert not dns_query.is_local_address('192.0.2.1')
+
+        @pytest.mark.run(order=3)
+        def test_3_remote_nsupdate_when_source_is_not_local(self):
+                logging.info("A client address of another host keeps the nsupdate session over ssh")
+                sessions = []
+                saved = nsupdate_util.NSUPDATE_SOURCE, nsupdate_util.remote_nsupdate
+                nsupdate_util.NSUPDATE_SOURCE = '192.0.2.1'
+                nsupdate_util.remote_nsupdate = lambda commands: sessions.append(commands) or ['NOERROR']
+                try:
+                        assert nsupdate_util.nsupdate_add('arec', 300, 'A', 'zone106.com', '10.0.0.1') is None
+                        changes = [('add', 'h1', 300, 'A', '10.1.0.1'), ('delete', 'old', 'A'), ('delete', 'gone')]
+                        assert nsupdate_util.nsupdate_batch('zone106.com', changes) == ['NOERROR']
+                finally:
+                        nsupdate_util.NSUPDATE_SOURCE, nsupdate_util.remote_nsupdate = saved
+                assert sessions[0] == ['update add arec.zone106.com 300 A 10.0.0.1', 'send']
+                assert sessions[1] == ['zone zone106.com.', 'update add h1.zone106.com. 300 A 10.1.0.1',
+                                       'update delete old.zone106.com. A', 'update delete gone.zone106.com.', 'send']
+
+        @pytest.mark.run(order=4)
+        def test_4_nsupdate_commands_split_and_key(self):
+                logging.info("One send per message of dns_update.batch, TSIG key passed to nsupdate")
+                changes = [('add', 'h%d' % number, 300, 'A', '10.1.0.%d' % number) for number in range(3)]
+                key = dns_update.Key('tsig-key', 'c2VjcmV0', 'hmac-md5')
+                commands = nsupdate_util.nsupdate_commands(dns_update.batch('zone106.com', changes, 2), changes, key)
+                assert commands[0] == 'key hmac-md5:tsig-key c2VjcmV0'
+                assert commands.count('send') == 2
+                assert commands[-2] == 'update add h2.zone106.com. 300 A 10.1.0.2'
@@ -0,0 +1,93 @@
+import pytest
+import unittest
+import logging
+import ib_utils.ref_cache as ref_cache
+
+GRID = "10.0.0.1"
+OTHER_GRID = "10.0.0.2"
+
+
+class ref_cache_lru(unittest.TestCase):
+
+        def setUp(self):
+                ref_cache.clear()
+                self.cache_size = ref_cache.CACHE_SIZE
+
+        def tearDown(self):
+                ref_cache.CACHE_SIZE = self.cache_size
+                ref_cache.clear()
+
+        @pytest.mark.run(order=1)
+        def test_1_keys(self):
+                logging.info("Keys do not depend on the order of the search fields and accept JSON values")
+                assert ref_cache.make_key("record:a", {"name": "a.test.com", "view": "default"}) == \
+                        ref_cache.make_key("record:a", {"view": "default", "name": "a.test.com"})
+                key = ref_cache.make_key("record:a", {"extattrs": {"Site": {"value": "Bangalore"}}, "aliases": ["b"]})
+                ref_cache.put(GRID, key, "record:a/X:a.test.com/default")
+                assert ref_cache.get(GRID, key) == "record:a/X:a.test.com/default"
+                assert ref_cache.make_key("grid", {}) != ref_cache.make_key("member", {})
+
+        @pytest.mark.run(order=2)
+        def test_2_entries_are_per_grid(self):
+                logging.info("The same key on two grids")
+                key = ref_cache.make_key("grid", {})
+                ref_cache.put(GRID, key, "grid/one")
+                ref_cache.put(OTHER_GRID, key, "grid/two")
+                assert ref_cache.get(GRID, key) == "grid/one"
+                assert ref_cache.get(OTHER_GRID, key) == "grid/two"
+                ref_cache.clear(GRID)
+                assert ref_cache.get(GRID, key) is None
+                assert ref_cache.get(OTHER_GRID, key) == "grid/two"
+
+        @pytest.mark.run(order=3)
+        def test_3_least_recently_used_entry_is_evicted(self):
+                logging.info("LRU eviction at CACHE_SIZE entries")
+                ref_cache.CACHE_SIZE = 3
+                keys = [ref_cache.make_key("member", {"host_name": "m%d" % i}) for i in range(4)]
+                for i, key in enumerate(keys[:3]):
+                        ref_cache.put(GRID, key, "member/m%d" % i)
+                # m0 becomes the most recently used, m1 is evicted next.
+                assert ref_cache.get(GRID, keys[0]) == "member/m0"
+                ref_cache.put(GRID, keys[3], "member/m3")
+                assert ref_cache.get(GRID, keys[1]) is None
+                assert [ref_cache.get(GRID, key) for key in (keys[0], keys[2], keys[3])] == \
+                        ["member/m0", "member/m2", "member/m3"]
+                # An evicted entry no longer resolves its ref on invalidation.
+                ref_cache.invalidate(GRID, "member/m1")
+                assert ref_cache.get(GRID, keys[0]) == "member/m0"
+
+        @pytest.mark.run(order=4)
+        def test_4_invalidate_drops_every_key_of_a_ref(self):
+                logging.info("invalidate removes the keys resolving to the ref only")
+                by_name = ref_cache.make_key("record:a", {"name": "a.test.com"})
+                by_address = ref_cache.make_key("record:a", {"ipv4addr": "10.0.0.10"})
+                other = ref_cache.make_key("record:a", {"name": "b.test.com"})
+                ref_cache.put(GRID, by_name, "record:a/A:a.test.com/default")
+                ref_cache.put(GRID, by_address, "record:a/A:a.test.com/default")
+                ref_cache.put(GRID, other, "record:a/B:b.test.com/default")
+                ref_cache.invalidate(GRID, "record:a/A:a.test.com/default")
+                assert ref_cache.get(GRID, by_name) is None
+                assert ref_cache.get(GRID, by_address) is None
+                assert ref_cache.get(GRID, other) == "record:a/B:b.test.com/default"
+                # A key put again points at the new ref only.
+                ref_cache.put(GRID, other, "record:a/C:b.test.com/default")
+                ref_cache.invalidate(GRID, "record:a/B:b.test.com/default")
+                assert ref_cache.get(GRID, other) == "record:a/C:b.test.com/default"
+
+        @pytest.mark.run(order=5)
+        def test_5_container_change_clears_the_grid(self):
+                logging.info("Zones, views and networks cascade, their change drops the grid entries")
+                for container in ["zone_auth/Z:test.com/default", "view/V:default/true",
+                                  "networkview/N:default/true", "network/W:10.0.0.0/8/default",
+                                  "ipv6network/W6:2001%3Adb8%3A%3A/64/default"]:
+                        record = ref_cache.make_key("record:a", {"name": "a.test.com"})
+                        ref_cache.put(GRID, record, "record:a/A:a.test.com/default")
+                        ref_cache.put(OTHER_GRID, record, "record:a/A:a.test.com/default")
+                        ref_cache.invalidate(GRID, container)
+                        assert ref_cache.get(GRID, record) is None, container
+                        assert ref_cache.get(OTHER_GRID, record) == "record:a/A:a.test.com/default", container
+                # A record change only drops that record.
+                grid = ref_cache.make_key("grid", {})
+                ref_cache.put(GRID, grid, "grid/G")
+                ref_cache.invalidate(GRID, "record:a/A:a.test.com/default")
+                assert ref_cache.get(GRID, grid) == "grid/G"
@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+import pytest
+import unittest
+import logging
+import ib_utils.suite_history as history
+
+JUNIT = '''<?xml version="1.0" encoding="utf-8"?>
+<testsuites>
+<testsuite name="pytest" tests="3" failures="1" errors="0" skipped="1" time="12.5">
+<testcase classname="test_natgroup.NatGroup" name="test_001_create" time="10.0"/>
+<testcase classname="test_natgroup.NatGroup" name="test_002_get" time="2.0"><failure message="x"/></testcase>
+<testcase classname="test_natgroup.NatGroup" name="test_003_delete" time="0.5"><skipped/></testcase>
+</testsuite>
+</testsuites>
+'''
+
+
+class suite_history_shards(unittest.TestCase):
+
+        def setUp(self):
+                self.directory = tempfile.mkdtemp()
+                self.db = os.path.join(self.directory, "durations.db")
+                self.recorded = 0
+
+        def tearDown(self):
+                shutil.rmtree(self.directory)
+
+        def add(self, run_id, suite, duration):
+                # Explicit, increasing recorded times keep the "last runs" order exact.
+                self.recorded += 1
+                conn = history.connect(self.db)
+                with conn:
+                        conn.execute('INSERT INTO suite_durations VALUES (?, ?, ?, 0, 0, ?)',
+                                     (run_id, suite, duration, self.recorded))
+                conn.close()
+
+        @pytest.mark.run(order=1)
+        def test_1_record_junit_report(self):
+                logging.info("Suite and test case durations of a JUnit report")
+                path = os.path.join(self.directory, "natgroup.xml")
+                with open(path, "w") as report:
+                        report.write(JUNIT)
+                assert history.record_junit("r1", "test_natgroup.py", path, db_path=self.db) == 12.5
+                assert history.record_junit("r1", "test_missing.py", path + ".missing", db_path=self.db) is None
+                conn = history.connect(self.db)
+                try:
+                        assert conn.execute('SELECT suite, duration, tests, failures FROM suite_durations').fetchall() == \
+                                [("test_natgroup.py", 12.5, 3, 1)]
+                        assert conn.execute('SELECT name, outcome FROM test_durations ORDER BY name').fetchall() == \
+                                [("test_001_create", "passed"), ("test_002_get", "failure"), ("test_003_delete", "skipped")]
+                finally:
+                        conn.close()
+
+        @pytest.mark.run(order=2)
+        def test_2_trailing_median_of_the_last_runs(self):
+                logging.info("Median of the last WINDOW runs of each suite")
+                assert history.median([]) is None
+                assert history.median([3, 1, 2]) == 2
+                assert history.median([4, 1, 3, 2]) == 2.5
+                for run, duration in enumerate([1000, 1000, 10, 20, 30, 40, 50]):
+                        self.add("r%d" % run, "a.py", duration)
+                # The two oldest runs are out of the window until r6 is excluded.
+                assert history.trailing_medians(window=5, db_path=self.db) == {"a.py": 30}
+                assert history.trailing_medians(window=3, db_path=self.db) == {"a.py": 40}
+                assert history.trailing_medians(window=5, exclude_run="r6", db_path=self.db) == {"a.py": 30}
+                assert history.trailing_medians(window=6, exclude_run="r6", db_path=self.db) == {"a.py": 35}
+
+        @pytest.mark.run(order=3)
+        def test_3_longest_first_and_shards(self):
+                logging.info("LPT order, unknown suites first, balanced shards")
+                for suite, duration in [("a.py", 100), ("b.py", 60), ("c.py", 50), ("d.py", 40), ("e.py", 10)]:
+                        self.add("r1", suite, duration)
+                suites = ["e.py", "d.py", "new.py", "c.py", "b.py", "a.py"]
+                assert history.longest_first(suites, db_path=self.db) == ["new.py", "a.py", "b.py", "c.py", "d.py", "e.py"]
+                # new.py counts as the median duration (50): loads 160 and 150.
+                shards = history.shard(suites, 2, db_path=self.db)
+                assert shards == [["new.py", "b.py", "d.py", "e.py"], ["a.py", "c.py"]]
+                assert sorted(sum(shards, [])) == sorted(suites)
+                assert history.shard(["x.py", "y.py"], 3, db_path=self.db) == [["x.py"], ["y.py"], []]
+
+        @pytest.mark.run(order=4)
+        def test_4_shards_without_history(self):
+                logging.info("Round robin when no suite has a recorded duration")
+                assert history.shard(["a.py", "b.py", "c.py", "d.py"], 2, db_path=self.db) == \
+                        [["a.py", "c.py"], ["b.py", "d.py"]]
+
+        @pytest.mark.run(order=5)
+        def test_5_regressions_against_previous_runs(self):
+                logging.info("Suites slower than REGRESSION_FACTOR times their median")
+                for run in range(3):
+                        self.add("r%d" % run, "slow.py", 100)
+                        self.add("r%d" % run, "same.py", 100)
+                        self.add("r%d" % run, "slower.py", 10)
+                self.add("now", "slow.py", 130)
+                self.add("now", "same.py", 120)
+                self.add("now", "slower.py", 50)
+                self.add("now", "new.py", 500)
+                # Largest increase first, same.py is within 25%, new.py has no history.
+                assert history.regressions("now", db_path=self.db) == [("slower.py", 50, 10), ("slow.py", 130, 100)]
+                assert history.regressions("now", factor=1.1, db_path=self.db) == \
+                        [("slower.py", 50, 10), ("slow.py", 130, 100), ("same.py", 120, 100)]
+                assert history.print_regressions("r0", db_path=self.db) == []
@@ -0,0 +1,88 @@
+import os
+import time
+import pytest
+import unittest
+import logging
+import tempfile
+import threading
+import ib_utils.suite_scheduler as scheduler
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+class Recorder:
+        '''
+        run_suite stand-in keeping the (start, end) time of every suite.
+        '''
+        def __init__(self, duration=0.05):
+                self.duration = duration
+                self.times = {}
+                self.lock = threading.Lock()
+
+        def __call__(self, suite):
+                start = time.time()
+                time.sleep(self.duration)
+                if suite.startswith('fail'):
+                        raise RuntimeError('suite crashed')
+                with self.lock:
+                        self.times[suite] = (start, time.time())
+                return suite.upper()
+
+        def overlap(self, first, second):
+                (start1, end1), (start2, end2) = self.times[first], self.times[second]
+                return start1 < end2 and start2 < end1
+
+
+class suite_scheduler_locks(unittest.TestCase):
+
+        @classmethod
+        def setup_class(cls):
+                logging.info("SETUP METHOD")
+
+        @pytest.mark.run(order=1)
+        def test_1_shared_resources_never_overlap(self):
+                logging.info("Suites sharing a resource run one after the other, others in parallel")
+                resources = {'a': set(['zone_auth']), 'b': set(['zone_auth', 'grid:services']),
+                             'c': set(['networkview']), 'd': set()}
+                run = Recorder()
+                results = scheduler.run_suites(['a', 'b', 'c', 'd'], run, workers=4, resources=resources)
+                assert results == {'a': 'A', 'b': 'B', 'c': 'C', 'd': 'D'}
+                assert not run.overlap('a', 'b')
+                assert run.overlap('a', 'c') and run.overlap('a', 'd')
+
+        @pytest.mark.run(order=2)
+        def test_2_undeclared_suites_run_alone(self):
+                logging.info("A suite missing from the resource file locks everything")
+                resources = {'a': set(['zone_auth']), 'c': set()}
+                run = Recorder()
+                scheduler.run_suites(['a', 'x', 'c'], run, workers=3, resources=resources)
+                assert not run.overlap('x', 'a') and not run.overlap('x', 'c')
+                run = Recorder()
+                scheduler.run_suites(['a', 'c'], run, workers=1, resources=resources)
+                assert not run.overlap('a', 'c')
+
+        @pytest.mark.run(order=3)
+        def test_3_failures_and_blank_names(self):
+                logging.info("A crashing suite gives its exception, trailing blanks are ignored")
+                run = Recorder(0)
+                results = scheduler.run_suites(['fail.py', 'ok.py '], run, workers=2,
+                                               resources={'fail.py': set(), 'ok.py': set()})
+                assert isinstance(results['fail.py'], RuntimeError)
+                assert results['ok.py '] == 'OK.PY '
+
+        @pytest.mark.run(order=4)
+        def test_4_resource_file(self):
+                logging.info("Comments and read-only suites in the resource file, every listed suite declared")
+                fobj = tempfile.NamedTemporaryFile(suffix='.txt', delete=False)
+                fobj.write('# comment\nt1.py: zone_auth record:a  # dns\nt2.py:\nnot a suite line\n')
+                fobj.close()
+                try:
+                        assert scheduler.load_resources(fobj.name) == {'t1.py': set(['zone_auth', 'record:a']),
+                                                                       't2.py': set()}
+                finally:
+                        os.remove(fobj.name)
+                assert scheduler.load_resources(fobj.name) == {}
+                resources = scheduler.load_resources(os.path.join(ROOT, 'suite_resources.txt'))
+                with open(os.path.join(ROOT, 'files.txt')) as files:
+                        suites = [line.strip() for line in files if line.strip() and not line.startswith('#')]
+                assert [suite for suite in suites if suite not in resources] == []
@@ -0,0 +1,72 @@
+import json
+import pytest
+import unittest
+import logging
+import config
+import ib_utils.fake_wapi as fake_wapi
+import ib_utils.ib_NIOS as ib_NIOS
+import ib_utils.wait as wait
+
+
+class wait_for_restart_fake_wapi(unittest.TestCase):
+
+        @classmethod
+        def setUpClass(cls):
+                logging.info("SETUP METHOD")
+                cls.server = fake_wapi.start(users={config.username: config.password})
+                cls.server.restart_time = 0.5
+                cls.grid_vip = cls.server.grid_vip
+                cls.grid = json.loads(ib_NIOS.wapi_request('GET', object_type="grid", grid_vip=cls.grid_vip))[0]['_ref']
+
+        @classmethod
+        def tearDownClass(cls):
+                cls.server.stop()
+
+        def restart(self):
+                before = ib_NIOS.restart_status(grid_vip=self.grid_vip)
+                response = ib_NIOS.wapi_request('POST', object_type=self.grid + "?_function=restartservices",
+                                                fields=json.dumps({"services": ["ALL"]}), grid_vip=self.grid_vip)
+                assert response == '{}'
+                return before
+
+        def set_status(self, service, status):
+                member = self.server.store.find('member')[0]
+                statuses = [dict(entry) for entry in member['service_status']]
+                for entry in statuses:
+                        if entry['service'] == service:
+                                entry['status'] = status
+                self.server.store.update(member['_ref'], {'service_status': statuses})
+
+        @pytest.mark.run(order=1)
+        def test_1_waits_for_the_restart_to_start_and_finish(self):
+                logging.info("The idle state before the restart is not taken as converged")
+                for attempt in range(2):
+                        before = self.restart()
+                        elapsed = ib_NIOS.wait_for_restart(self.grid_vip, before, initial_interval=0.05, max_interval=0.1)
+                        assert elapsed >= 0.4, elapsed
+                        assert ib_NIOS.restart_in_progress(grid_vip=self.grid_vip) == 0
+
+        @pytest.mark.run(order=2)
+        def test_2_times_out_without_a_restart(self):
+                logging.info("A restart which never starts times out")
+                before = ib_NIOS.restart_status(grid_vip=self.grid_vip)
+                self.assertRaises(wait.WaitTimeout, ib_NIOS.wait_for_restart, self.grid_vip, before,
+                                  timeout=0.5, initial_interval=0.05, max_interval=0.1)
+                self.assertRaises(ValueError, ib_NIOS.wait_for_restart, self.grid_vip)
+
+        @pytest.mark.run(order=3)
+        def test_3_waits_for_member_services(self):
+                logging.info("A failed service blocks the wait, WARNING counts as running")
+                self.set_status('DNS', 'FAILED')
+                try:
+                        assert ib_NIOS.services_not_running(grid_vip=self.grid_vip) == \
+                                [(config.grid_fqdn, 'DNS', 'FAILED')]
+                        assert ib_NIOS.services_not_running(['DHCPV4'], grid_vip=self.grid_vip) == []
+                        before = self.restart()
+                        self.assertRaises(wait.WaitTimeout, ib_NIOS.wait_for_restart, self.grid_vip, before,
+                                          timeout=1.5, initial_interval=0.05, max_interval=0.1)
+                        self.set_status('DNS', 'WARNING')
+                        before = self.restart()
+                        ib_NIOS.wait_for_restart(self.grid_vip, before, initial_interval=0.05, max_interval=0.1)
+                finally:
+                        self.set_status('DNS', 'WORKING')
@@ -0,0 +1,83 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import pytest
+import unittest
+import logging
+import ib_utils.wapi_cassette as wapi_cassette
+
+
+class Response:
+        def __init__(self, status, body):
+                self.status = status
+                self.reason = 'OK'
+                self.body = body
+
+        def read(self):
+                return self.body
+
+
+class wapi_cassette_sessions(unittest.TestCase):
+
+        def setUp(self):
+                self.directory = tempfile.mkdtemp()
+                self.path = os.path.join(self.directory, "run.jsonl.gz")
+
+        def tearDown(self):
+                shutil.rmtree(self.directory)
+
+        def record(self, interactions):
+                cassette = wapi_cassette.Cassette(self.path)
+                for operation, url, body, response in interactions:
+                        cassette.record(operation, url, body, "admin", Response(200, response))
+                cassette.save()
+
+        def replay(self, operation, url, body=''):
+                return self.cassette.replay(operation, url, body, "admin").read()
+
+        @pytest.mark.run(order=1)
+        def test_1_keys_are_normalized(self):
+                logging.info("Query argument and JSON key order do not change the key")
+                assert wapi_cassette.make_key("get", "/wapi/v2/grid?b=1&a=2", '{"x": 1, "y": 2}', "admin", "t") == \
+                        wapi_cassette.make_key("GET", "/wapi/v2/grid?a=2&b=1", '{"y":2,"x":1}', "admin", "t")
+                assert wapi_cassette.make_key("GET", "/wapi/v2/grid", "", "admin", "t1") != \
+                        wapi_cassette.make_key("GET", "/wapi/v2/grid", "", "admin", "t2")
+
+        @pytest.mark.run(order=2)
+        def test_2_repeated_requests_replay_in_order(self):
+                logging.info("A request made twice gets its two responses, then the last one")
+                self.record([("GET", "/wapi/v2/zone_auth", "", "[]"),
+                             ("POST", "/wapi/v2/zone_auth", '{"fqdn": "a.com"}', '"zone_auth/1"'),
+                             ("GET", "/wapi/v2/zone_auth", "", '[{"fqdn": "a.com"}]')])
+                self.cassette = wapi_cassette.Cassette(self.path).load()
+                assert self.replay("GET", "/wapi/v2/zone_auth") == "[]"
+                assert self.replay("POST", "/wapi/v2/zone_auth", '{"fqdn":"a.com"}') == '"zone_auth/1"'
+                assert self.replay("GET", "/wapi/v2/zone_auth") == '[{"fqdn": "a.com"}]'
+                assert self.replay("GET", "/wapi/v2/zone_auth") == '[{"fqdn": "a.com"}]'
+                self.assertRaises(wapi_cassette.CassetteMiss, self.replay, "GET", "/wapi/v2/grid")
+
+        @pytest.mark.run(order=3)
+        def test_3_rerecorded_requests_use_the_latest_session(self):
+                logging.info("A second recording of a request replaces the first one")
+                self.record([("GET", "/wapi/v2/zone_auth", "", "old 1"),
+                             ("GET", "/wapi/v2/zone_auth", "", "old 2"),
+                             ("GET", "/wapi/v2/grid", "", "grid")])
+                self.record([("GET", "/wapi/v2/zone_auth", "", "new 1"),
+                             ("GET", "/wapi/v2/zone_auth", "", "new 2")])
+                self.cassette = wapi_cassette.Cassette(self.path).load()
+                assert [self.replay("GET", "/wapi/v2/zone_auth") for i in range(3)] == ["new 1", "new 2", "new 2"]
+                # Requests of the first session not recorded again are kept.
+                assert self.replay("GET", "/wapi/v2/grid") == "grid"
+
+        @pytest.mark.run(order=4)
+        def test_4_entries_without_session(self):
+                logging.info("Cassettes recorded before sessions are replayed as one session")
+                key = wapi_cassette.make_key("GET", "/wapi/v2/grid", "", "admin")
+                with gzip.open(self.path, "wb") as cassette:
+                        for body in ("first", "second"):
+                                cassette.write(json.dumps({"key": key, "method": "GET", "url": "/wapi/v2/grid",
+                                                           "status": 200, "reason": "OK", "body": body}) + "\n")
+                self.cassette = wapi_cassette.Cassette(self.path).load()
+                assert [self.replay("GET", "/wapi/v2/grid") for i in range(2)] == ["first", "second"]
@@ -0,0 +1,109 @@
+import json
+import socket
+import time
+import pytest
+import unittest
+import logging
+import config
+import ib_utils.fake_wapi as fake_wapi
+import ib_utils.ib_NIOS as ib_NIOS
+import ib_utils.wapi_pool as wapi_pool
+
+
+class wapi_pool_fake_wapi(unittest.TestCase):
+
+        @classmethod
+        def setUpClass(cls):
+                logging.info("SETUP METHOD")
+                cls.server = fake_wapi.start(users={config.username: config.password})
+                # Connections dropped on purpose below are not errors.
+                cls.server.handle_error = lambda request, client_address: None
+                cls.grid_vip = cls.server.grid_vip
+                cls.pool = wapi_pool.get_pool(cls.grid_vip, config.username)
+
+        @classmethod
+        def tearDownClass(cls):
+                cls.pool.close()
+                cls.server.stop()
+
+        def setUp(self):
+                self.opened = []
+                new_connection = wapi_pool.ConnectionPool.new_connection
+                self.pool.new_connection = lambda: self.opened.append(1) or new_connection(self.pool)
+                self.handle = self.server.wapi.handle
+                self.calls = []
+
+        def tearDown(self):
+                del self.pool.new_connection
+                self.server.wapi.handle = self.handle
+
+        def request(self, operation, object_type, fields=''):
+                return ib_NIOS.wapi_request(operation, object_type=object_type, fields=fields, grid_vip=self.grid_vip)
+
+        def prime(self):
+                # One idle connection in the pool, not counted as opened.
+                self.request('GET', 'grid')
+                del self.opened[:]
+
+        def drop_first_request(self):
+                # The server reads the next request, then closes the connection without answering.
+                def handle(method, target, args, data):
+                        self.calls.append(method)
+                        if len(self.calls) == 1:
+                                raise RuntimeError('connection dropped')
+                        return self.handle(method, target, args, data)
+                self.server.wapi.handle = handle
+
+        @pytest.mark.run(order=1)
+        def test_1_connection_reused(self):
+                logging.info("Sequential calls share one keep-alive connection")
+                self.pool.close()
+                for i in range(3):
+                        assert json.loads(self.request('GET', 'grid'))
+                assert len(self.opened) == 1
+                assert len(self.pool.idle) == 1
+
+        @pytest.mark.run(order=2)
+        def test_2_connection_closed_by_the_server(self):
+                logging.info("An idle connection closed by the server is detected and replaced")
+                self.prime()
+                with self.server.connections_lock:
+                        requests = list(self.server.connections.values())
+                for request in requests:
+                        socket.socket.shutdown(request, socket.SHUT_RDWR)
+                conn = self.pool.idle[-1][0]
+                time.sleep(0.1)
+                assert wapi_pool.is_dropped(conn)
+                assert json.loads(self.request('GET', 'grid'))
+                assert len(self.opened) == 1
+
+        @pytest.mark.run(order=3)
+        def test_3_get_retried_on_a_broken_reused_connection(self):
+                logging.info("A GET whose response was lost is sent again on a new connection")
+                self.prime()
+                self.drop_first_request()
+                assert json.loads(self.request('GET', 'grid'))
+                assert self.calls == ['GET', 'GET']
+                assert len(self.opened) == 1
+
+        @pytest.mark.run(order=4)
+        def test_4_post_not_retried_once_sent(self):
+                logging.info("A POST which reached the server is not replayed")
+                self.prime()
+                self.drop_first_request()
+                data = json.dumps({'name': 'pool_retry'})
+                with pytest.raises(wapi_pool.CONNECTION_ERRORS):
+                        self.request('POST', 'smartfolder:global', data)
+                assert self.calls == ['POST']
+                assert len(self.opened) == 0
+                assert self.server.store.find('smartfolder:global', name='pool_retry') == []
+
+        @pytest.mark.run(order=5)
+        def test_5_new_connection_not_retried(self):
+                logging.info("A failure on a new connection is raised, even for a GET")
+                self.pool.close()
+                self.drop_first_request()
+                with pytest.raises(wapi_pool.CONNECTION_ERRORS):
+                        self.request('GET', 'grid')
+                assert self.calls == ['GET']
+                assert len(self.opened) == 1
@@ -0,0 +1,70 @@
+import json
+import pytest
+import unittest
+import logging
+import config
+import ib_utils.fake_wapi as fake_wapi
+import ib_utils.ib_NIOS as ib_NIOS
+import ib_utils.wapi_session as wapi_session
+
+
+class wapi_session_fake_wapi(unittest.TestCase):
+
+        @classmethod
+        def setUpClass(cls):
+                logging.info("SETUP METHOD")
+                cls.server = fake_wapi.start(users={config.username: config.password})
+                cls.grid_vip = cls.server.grid_vip
+
+        @classmethod
+        def tearDownClass(cls):
+                cls.server.stop()
+
+        def setUp(self):
+                wapi_session.clear_sessions()
+                self.server.cookies.clear()
+                self.logins = []
+                self.server.login = lambda: self.logins.append(1) or fake_wapi.FakeWapi.login(self.server)
+
+        def tearDown(self):
+                del self.server.login
+
+        def request(self, password=config.password):
+                return ib_NIOS.wapi_request('GET', object_type='grid', password=password, grid_vip=self.grid_vip)
+
+        @pytest.mark.run(order=1)
+        def test_1_cookie_reused(self):
+                logging.info("Only the first call logs in, the next ones send the ibapauth cookie")
+                for i in range(3):
+                        assert json.loads(self.request())
+                assert len(self.logins) == 1
+                session = wapi_session.get_session(self.grid_vip, config.username, config.password)
+                assert session.cookie.startswith('ibapauth=')
+                assert session.cookie.split('=', 1)[1].strip('"') in self.server.cookies
+
+        @pytest.mark.run(order=2)
+        def test_2_expired_cookie_logs_in_again(self):
+                logging.info("A 401 on the cached cookie falls back to Basic auth once")
+                self.request()
+                self.server.cookies.clear()
+                assert json.loads(self.request())
+                assert len(self.logins) == 2
+                assert json.loads(self.request())
+                assert len(self.logins) == 2
+
+        @pytest.mark.run(order=3)
+        def test_3_wrong_password_has_its_own_session(self):
+                logging.info("A wrong password is rejected even when the right one has a session")
+                self.request()
+                with pytest.raises(Exception):
+                        self.request(password='wrong')
+                assert wapi_session.get_session(self.grid_vip, config.username, 'wrong').cookie is None
+                assert len(self.logins) == 1
+
+        @pytest.mark.run(order=4)
+        def test_4_logout(self):
+                logging.info("logout_all ends the server side sessions")
+                self.request()
+                assert len(self.server.cookies) == 1
+                wapi_session.logout_all()
+                assert len(self.server.cookies) == 0